@@ -3,20 +3,43 @@
 """
 
 
+import argparse
 import ast
 import cmd
 import re
 import shlex
+import sys
+import time
 import models
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
 from models.place import Place
+from models.relationships import RestrictError
 from models.review import Review
 from models.state import State
 from models.user import User
 
 
+# A condition of the where command, Eg: price_by_night<=100. The longer
+# operators come first so that "<=" is not read as "<"
+CONDITION = re.compile(r"^(\w+)\s*(==|!=|<=|>=|=|<|>)\s*(.*)$", re.DOTALL)
+
+# Query operators of the comparison operators of the where command
+COMPARISONS = {
+    "=": "eq",
+    "==": "eq",
+    "!=": "ne",
+    "<": "lt",
+    "<=": "le",
+    ">": "gt",
+    ">=": "ge",
+}
+
+# Options of the where command, given as <option>=<value>
+WHERE_OPTIONS = ("order_by", "limit", "offset")
+
+
 class HBNBCommand(cmd.Cmd):
     """The HBNBCommand class
     """
@@ -122,12 +145,8 @@ class HBNBCommand(cmd.Cmd):
         argv = shlex.split(arg)
         # Validate the command arguments
         if self.validate_argv(argv):
-            # Construct the key
-            key = "{}.{}".format(argv[0], argv[1])
-            # Retrieve all objects from storage
-            obj_data = models.storage.all()
-            # Retrieve the object using its key
-            obj = obj_data.get(key)
+            # Retrieve the object from storage
+            obj = models.storage.get(argv[0], argv[1])
             # Check if object exists and print
             print(obj if obj else "** no instance found **")
 
@@ -144,16 +163,15 @@ class HBNBCommand(cmd.Cmd):
         argv = shlex.split(arg)
         # Validate the command arguments
         if self.validate_argv(argv):
-            # Construct the key
-            key = "{}.{}".format(argv[0], argv[1])
-            # Retrieve all objects from storage
-            obj_data = models.storage.all()
+            # Retrieve the object from storage
+            obj = models.storage.get(argv[0], argv[1])
             # Check if object exists
-            if key in obj_data:
-                # Delete the object
-                del obj_data[key]
-                # Save the changes onto the JSON file
-                models.storage.save()
+            if obj:
+                # Delete the object with its dependents and save
+                try:
+                    obj.delete()
+                except RestrictError as error:
+                    print("** {} **".format(error))
             else:
                 # Print error message if object does not exist
                 print("** no instance found **")
@@ -177,16 +195,240 @@ class HBNBCommand(cmd.Cmd):
             if argv[0] not in self.__all_classes:
                 print("** class doesn't exist **")
                 return
-            # Create a list to contain all instances of the class
-            new_list = []
-            # Iterate over the instances dictionary
-            for obj in models.storage.all().values():
-                # If an instance is found, append to new_list
-                if argv[0] == type(obj).__name__:
-                    new_list.append(str(obj))
+            # Create a list of the instances of the class only
+            new_list = [str(obj) for obj in
+                        models.storage.all(argv[0]).values()]
             # print list
             print(new_list)
 
+    def do_query(self, arg):
+        """Prints the string representation of the instances of a class
+        whose attributes match every predicate. A predicate is
+        <attribute>=<value> or <attribute>__<op>=<value> where <op> is
+        one of eq, ne, lt, le, gt or ge.
+
+        Args:
+            arg (str): Command arguments
+
+        Usage example: $ query Place city_id=1234 price_by_night__lt=100
+        """
+        # Store various command arguments in a list
+        argv = shlex.split(arg)
+        # Handle no argument
+        if not argv:
+            print("** class name missing **")
+            return
+        # Handle invalid class
+        if argv[0] not in self.__all_classes:
+            print("** class doesn't exist **")
+            return
+        # Build the predicates from the remaining arguments
+        predicates = {}
+        for predicate in argv[1:]:
+            name, sep, value = predicate.partition("=")
+            if not sep or not name:
+                print("** invalid predicate: {} **".format(predicate))
+                return
+            predicates[name] = self.parse_value(value)
+        try:
+            result = models.storage.query(argv[0], **predicates)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        # print list
+        print([str(obj) for obj in result.values()])
+
+    def do_where(self, arg):
+        """Prints the string representation of the instances of a class
+        matching every condition, separated by commas. A condition is
+        <attribute><op><value> where <op> is one of =, ==, !=, <, <=, >
+        or >=. The options order_by=<attribute> (prefixed with - for
+        descending order), limit=<number> and offset=<number> select a
+        page of the result.
+
+        Args:
+            arg (str): Command arguments
+
+        Usage example: $ where Place city_id=1234, price_by_night<100,
+                       order_by=-price_by_night, limit=10
+        Or: $ Place.where(city_id=1234, order_by=name, limit=10)
+        """
+        # Split the class name from the conditions
+        argv = arg.split(maxsplit=1)
+        # Handle no argument
+        if not argv:
+            print("** class name missing **")
+            return
+        # Handle invalid class
+        if argv[0] not in self.__all_classes:
+            print("** class doesn't exist **")
+            return
+        # Split the conditions at the commas outside quotes
+        lexer = shlex.shlex(argv[1] if len(argv) > 1 else "", posix=True)
+        lexer.whitespace, lexer.whitespace_split = ",", True
+        try:
+            conditions = [condition.strip() for condition in lexer]
+        except ValueError as error:
+            print("** {} **".format(str(error).lower()))
+            return
+        predicates, options = {}, {}
+        for condition in filter(None, conditions):
+            match = CONDITION.match(condition)
+            if not match:
+                print("** invalid condition: {} **".format(condition))
+                return
+            name, comparison, value = match.groups()
+            if name in WHERE_OPTIONS and comparison == "=":
+                options[name] = self.parse_value(value.strip())
+                continue
+            operator = COMPARISONS[comparison]
+            if operator != "eq":
+                name = "{}__{}".format(name, operator)
+            predicates[name] = self.parse_value(value.strip())
+        if "order_by" in options:
+            options["order_by"] = str(options["order_by"])
+        try:
+            result = models.storage.where(argv[0], predicates, **options)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        # print list
+        print([str(obj) for obj in result])
+
+    def do_search(self, arg):
+        """Prints the string representation of the instances of a class
+        whose text holds every search term, best match first. A term
+        ending with * matches every word it starts.
+
+        Args:
+            arg (str): Command arguments
+
+        Usage example: $ search Review quiet pool*
+        """
+        # Keep the terms as typed, quotes included
+        argv = arg.split(maxsplit=1)
+        # Handle no argument
+        if not argv:
+            print("** class name missing **")
+            return
+        # Handle invalid class
+        if argv[0] not in self.__all_classes:
+            print("** class doesn't exist **")
+            return
+        if len(argv) < 2:
+            print("** search terms missing **")
+            return
+        try:
+            result = models.storage.search(argv[0], argv[1])
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        # print list
+        print([str(obj) for obj in result])
+
+    def do_near(self, arg):
+        """Prints the string representation of the instances of a class
+        within a distance, in kilometres, of a latitude and longitude,
+        nearest first, optionally only the nearest ones
+
+        Args:
+            arg (str): Command arguments
+
+        Usage example: $ near Place 48.8566 2.3522 10 5
+        """
+        numbers = self.parse_coordinates(arg, 3, 4)
+        if numbers is None:
+            return
+        argv = shlex.split(arg)
+        limit = None
+        if len(numbers) == 4:
+            if not numbers[3].is_integer():
+                print("** invalid number: {} **".format(argv[4]))
+                return
+            limit = int(numbers[3])
+        try:
+            result = models.storage.near(argv[0], *numbers[:3], limit=limit)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        # print list
+        print([str(obj) for obj in result])
+
+    def do_within(self, arg):
+        """Prints the string representation of the instances of a class
+        inside a bounding box given by its south, west, north and east
+        bounds
+
+        Args:
+            arg (str): Command arguments
+
+        Usage example: $ within Place 48.8 2.2 48.9 2.4
+        """
+        numbers = self.parse_coordinates(arg, 4, 4)
+        if numbers is None:
+            return
+        try:
+            result = models.storage.within(shlex.split(arg)[0], *numbers)
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        # print list
+        print([str(obj) for obj in result.values()])
+
+    def parse_coordinates(self, arg, least, most):
+        """Validates the class name and the numbers of the near and
+        within commands, printing the error if any
+
+        Args:
+            arg (str): Command arguments
+            least (int): Number of numbers required
+            most (int): Number of numbers accepted
+
+        Returns:
+            list: The numbers as floats, or None if the arguments are
+            invalid
+        """
+        # Store various command arguments in a list
+        argv = shlex.split(arg)
+        # Handle no argument
+        if not argv:
+            print("** class name missing **")
+            return None
+        # Handle invalid class
+        if argv[0] not in self.__all_classes:
+            print("** class doesn't exist **")
+            return None
+        if len(argv) - 1 < least:
+            print("** coordinates missing **")
+            return None
+        if len(argv) - 1 > most:
+            print("** too many arguments **")
+            return None
+        numbers = []
+        for value in argv[1:]:
+            try:
+                numbers.append(float(value))
+            except ValueError:
+                print("** invalid number: {} **".format(value))
+                return None
+        return numbers
+
+    @staticmethod
+    def parse_value(value):
+        """Converts a command argument into a Python value when it is
+        a literal such as a number, and keeps it as a string otherwise
+
+        Args:
+            value (str): The argument
+
+        Returns:
+            The converted value
+        """
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
+
     def do_update(self, arg):
         """Updates an instance based on the class name and id
         by adding or updating attribute and then saves the changes to
@@ -221,12 +463,10 @@ class HBNBCommand(cmd.Cmd):
             # argv = [class_name, id, attribute name, attribute value]
         # Validate the command arguments
         if self.validate_argv(argv):
-            # Construct the key
-            key = "{}.{}".format(argv[0], argv[1])
-            # Retrieve all instances from storage
-            all_instances = models.storage.all()
+            # Retrieve the instance from storage
+            instance = models.storage.get(argv[0], argv[1])
             # Check if instance exists
-            if key not in all_instances:
+            if not instance:
                 print("** no instance found **")
                 return
             # Check if attribute name is provided
@@ -238,9 +478,14 @@ class HBNBCommand(cmd.Cmd):
                 print("** value missing **")
                 return
             # Set the new attribute in the right instance
-            setattr(all_instances[key], argv[2], argv[3])
+            try:
+                setattr(instance, argv[2], argv[3])
+            except ValueError as error:
+                # Eg: a timestamp that is not in ISO format
+                print("** {} **".format(error))
+                return
             # Save the changes into JSON file
-            all_instances[key].save()
+            instance.save()
 
     @staticmethod
     def number_of_instances(class_name):
@@ -252,15 +497,8 @@ class HBNBCommand(cmd.Cmd):
         Returns:
             int: Number of instances of the specified class
         """
-        # Intialise count variable to 0
-        count = 0
-        # Iterate over storage dictionary
-        for _, value in models.storage.all().items():
-            # If the specified class is encountered increment count
-            if type(value).__name__ == class_name:
-                count += 1
-        # Return number of instances found
-        return count
+        # Count the instances of the class only
+        return models.storage.count(class_name)
 
     def default(self, line):
         """Handles the default behaviour of the command-line interpreter
@@ -284,6 +522,7 @@ class HBNBCommand(cmd.Cmd):
             $ <class name>.destroy(<id>)
             $ <class name>.update(<id>, <attribute name>, <attribute value>)
             $ <class name>.update(<id>, <dictionary representation>)
+            $ <class name>.where(<condition>, ..., limit=<number>)
         """
         # Split command line into a list of class name and command
         arg = line.split(".", 1)
@@ -302,6 +541,13 @@ class HBNBCommand(cmd.Cmd):
         if not self.all_count_helper(command):
             print("*** Unknown syntax: {}".format(line))
             return
+        # Execute do_where if command is "where"
+        if command[0] == "where":
+            if not command[1].endswith(")"):
+                print("*** Unknown syntax: {}".format(line))
+                return
+            self.do_where(arg[0] + " " + command[1][:-1])
+            return
         # Execute do_all if command is "all"
         if command[0] == "all":
             self.do_all(arg[0])
@@ -349,14 +595,18 @@ class HBNBCommand(cmd.Cmd):
                     obj_id = str(matchdata.group(1))
                     # Convert string representation of dictionary to a dict
                     attribute_dict = ast.literal_eval(matchdata.group(2))
-                    # Iterate over dictionary of attribute names and values
-                    for attribute_name, attribute_value in\
-                            attribute_dict.items():
-                        # Construct class_name and cmd arguments as a string
-                        arguments = arg[0] + " " + obj_id + " " +\
-                            str(attribute_name) + " " + str(attribute_value)
-                        # arguments = "class_name id attr_name attr_value"
-                        self.do_update(arguments)
+                    # Write the file once for all the attributes
+                    with models.storage.batch():
+                        # Iterate over dictionary of attribute names
+                        # and values
+                        for attribute_name, attribute_value in\
+                                attribute_dict.items():
+                            # Construct class_name and cmd arguments
+                            arguments = arg[0] + " " + obj_id + " " +\
+                                str(attribute_name) + " " +\
+                                str(attribute_value)
+                            # arguments = "class_name id attr_name attr_value"
+                            self.do_update(arguments)
                 except (ValueError, SyntaxError):
                     # If literal_eval fails, print syntax error
                     print("*** Unknown syntax: {}".format(line))
@@ -375,6 +625,42 @@ class HBNBCommand(cmd.Cmd):
                 self.do_update(arguments)
             return
 
+    def run_batch(self, file, flush_every=0, flush_interval=0):
+        """Runs the commands of a file, one per line, without a prompt.
+        Saves are deferred and the storage is written once at the end,
+        or after every flush_every commands or flush_interval seconds.
+        The commands print the same output as in the interactive loop.
+
+        Args:
+            file: A file opened in text mode, Eg: sys.stdin
+            flush_every (int): Commands run between writes, 0 for no limit
+            flush_interval (float): Seconds between writes, 0 for no limit
+
+        Returns:
+            tuple: The number of commands run and the seconds they took
+        """
+        lines = iter(file)
+        commands = 0
+        start = time.perf_counter()
+        stop = False
+        while not stop:
+            # Each block ends with one write of the storage
+            with models.storage.batch():
+                flushed = time.monotonic()
+                count = 0
+                for line in lines:
+                    line = self.precmd(line.rstrip("\r\n"))
+                    stop = self.postcmd(self.onecmd(line), line)
+                    count += 1
+                    if stop or count == flush_every or flush_interval and\
+                            time.monotonic() - flushed >= flush_interval:
+                        break
+                else:
+                    # No lines left
+                    stop = True
+            commands += count
+        return commands, time.perf_counter() - start
+
     @staticmethod
     def all_count_helper(command):
         """Helper function for validating arguments for calling
@@ -391,8 +677,8 @@ class HBNBCommand(cmd.Cmd):
         if len(command) < 2:
             return False
 
-        if command[0] not in\
-                ["all", "create", "show", "destroy", "update", "count"]:
+        if command[0] not in ["all", "create", "show", "destroy", "update",
+                              "count", "where"]:
             return False
 
         if command[0] in ["all", "count"] and not command[1].startswith(")"):
@@ -400,5 +686,33 @@ class HBNBCommand(cmd.Cmd):
         return True
 
 
+def main():
+    """Starts the interactive loop, or runs the commands of a file (or
+    of stdin when it is not a terminal) in batch mode and reports the
+    throughput on stderr
+    """
+    parser = argparse.ArgumentParser(description="HBNB command interpreter")
+    parser.add_argument("--batch", metavar="FILE", nargs="?", const="-",
+                        help="run the commands of FILE (default: stdin)")
+    parser.add_argument("--flush-every", metavar="N", type=int, default=0,
+                        help="write the storage every N commands")
+    parser.add_argument("--flush-interval", metavar="SECONDS", type=float,
+                        default=0, help="write the storage every SECONDS")
+    args = parser.parse_args()
+    if args.batch is None and sys.stdin.isatty():
+        HBNBCommand().cmdloop()
+        return
+    if args.batch in (None, "-"):
+        commands, seconds = HBNBCommand().run_batch(
+            sys.stdin, args.flush_every, args.flush_interval)
+    else:
+        with open(args.batch, "r", encoding="utf-8") as file:
+            commands, seconds = HBNBCommand().run_batch(
+                file, args.flush_every, args.flush_interval)
+    print("{} commands in {:.3f}s ({:.0f} commands/s)".format(
+        commands, seconds, commands / seconds if seconds else 0),
+        file=sys.stderr)
+
+
 if __name__ == "__main__":
-    HBNBCommand().cmdloop()
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/python3
+"""Converts a JSON snapshot of FileStorage to a binary one, or a binary
+snapshot to JSON, without reading or writing the live storage
+
+Usage:
+    ./convert_snapshot.py SOURCE DESTINATION
+"""
+
+import argparse
+from models.engine.binary_snapshot import convert
+
+
+def main(argv=None):
+    """Writes DESTINATION in the format SOURCE is not in
+
+    Args:
+        argv (list): The arguments, sys.argv[1:] by default
+    """
+    parser = argparse.ArgumentParser(
+        description="convert a FileStorage snapshot between JSON and "
+                    "binary")
+    parser.add_argument("source", metavar="SOURCE",
+                        help="snapshot to read")
+    parser.add_argument("destination", metavar="DESTINATION",
+                        help="snapshot to write")
+    args = parser.parse_args(argv)
+    print("wrote {} snapshot {}".format(
+        convert(args.source, args.destination), args.destination))
+
+
+if __name__ == "__main__":
+    main()
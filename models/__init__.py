@@ -3,11 +3,74 @@
 """
 
 
+import os
+import threading
 from models.engine.file_storage import FileStorage
 
 
-# Create an instance of FileStorage
-storage = FileStorage()
+# Held while the storage engine is created on first access
+_storage_lock = threading.Lock()
 
-# Call reload() method on storage
-storage.reload()
+
+def create_storage():
+    """Creates the storage engine selected by the environment and
+    reloads the objects it holds
+
+    Returns:
+        FileStorage or SQLiteStorage: The storage engine
+    """
+    # Create the storage engine selected by HBNB_TYPE_STORAGE:
+    # "file" (the default) for FileStorage, "sqlite" for SQLiteStorage
+    # using the database file HBNB_SQLITE_PATH (hbnb.db by default)
+    # HBNB_STORAGE_JOURNAL=1 appends changes to a log instead of
+    # rewriting the whole JSON file on every save
+    # HBNB_STORAGE_LAZY=1 builds objects read from the file on first
+    # access
+    # HBNB_STORAGE_BACKGROUND=1 writes the JSON file in a writer thread
+    # HBNB_STORAGE_FORMAT=binary or indexed writes a binary snapshot, or
+    # an indexed one read on demand, instead of JSON
+    # HBNB_STORAGE_SHARDS=N keeps N files per class in file.json.d
+    # instead
+    # HBNB_STORAGE_SHARED=1 lets several processes use file.json at once
+    # HBNB_STORAGE_THREADSAFE=1 lets several threads use the storage at
+    # once
+    if os.getenv("HBNB_TYPE_STORAGE") == "sqlite":
+        from models.engine.sqlite_storage import SQLiteStorage
+        engine = SQLiteStorage(os.getenv("HBNB_SQLITE_PATH", "hbnb.db"))
+    else:
+        engine = FileStorage(
+            journal=os.getenv("HBNB_STORAGE_JOURNAL") == "1",
+            lazy=os.getenv("HBNB_STORAGE_LAZY") == "1",
+            background=os.getenv("HBNB_STORAGE_BACKGROUND") == "1",
+            file_format=os.getenv("HBNB_STORAGE_FORMAT", "json"),
+            shards=int(os.getenv("HBNB_STORAGE_SHARDS", "0")),
+            shared=os.getenv("HBNB_STORAGE_SHARED") == "1",
+            threadsafe=os.getenv("HBNB_STORAGE_THREADSAFE") == "1")
+
+    # Call reload() method on storage
+    engine.reload()
+    return engine
+
+
+def __getattr__(name):
+    """Creates models.storage on first access, so that importing a
+    module of the package, Eg: the snapshot converter, does not read
+    or migrate the files of the storage
+
+    Args:
+        name (str): Name of the attribute
+
+    Returns:
+        FileStorage or SQLiteStorage: The storage engine
+
+    Raises:
+        AttributeError: If name is not "storage"
+    """
+    global storage
+    if name != "storage":
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+    with _storage_lock:
+        if "storage" not in globals():
+            storage = create_storage()
+    return storage
@@ -3,14 +3,439 @@
 """
 
 
+import os
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timedelta
 import models
+from models import relationships
 
 
-class BaseModel:
+# Value of the declared attributes a compact instance has not set
+MISSING = object()
+
+# Attribute orders shared by compact instances: {names: names}
+SHAPES = {}
+
+# Attributes holding the timestamps of an instance
+TIMESTAMPS = ("created_at", "updated_at")
+
+# Timestamps given as integers count microseconds since EPOCH
+EPOCH = datetime(1970, 1, 1)
+
+
+def compact_enabled():
+    """Tells whether models are built as compact models, which is the
+    case when the HBNB_COMPACT_MODELS environment variable is "1"
+
+    Returns:
+        bool: True for compact models
+    """
+    return os.getenv("HBNB_COMPACT_MODELS") == "1"
+
+
+def to_datetime(value):
+    """Turns the stored form of a timestamp into a datetime
+
+    Args:
+        value: A datetime, its ISO format or microseconds since EPOCH
+
+    Returns:
+        datetime: The timestamp
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return EPOCH + timedelta(microseconds=value)
+
+
+def check_timestamp(value):
+    """Turns a timestamp assigned to an instance into a datetime
+
+    Args:
+        value: A datetime, its ISO format or microseconds since EPOCH
+
+    Raises:
+        ValueError: If value is none of these
+
+    Returns:
+        datetime: The timestamp
+    """
+    if isinstance(value, (datetime, str)) or type(value) is int:
+        try:
+            return to_datetime(value)
+        except (ValueError, OverflowError):
+            pass
+    raise ValueError("invalid timestamp: {}".format(value))
+
+
+def to_iso(value):
+    """Turns the stored form of a timestamp into its ISO format,
+    without converting ISO strings read from storage
+
+    Args:
+        value: A datetime, its ISO format or microseconds since EPOCH
+
+    Returns:
+        str: The ISO format of the timestamp
+    """
+    if isinstance(value, str):
+        return value
+    return to_datetime(value).isoformat()
+
+
+def set_shape(obj, shape):
+    """Sets the order of the attributes of a compact instance, sharing
+    one tuple between all instances with the same order
+
+    Args:
+        obj: The compact instance
+        shape (tuple): Names of the attributes it has set
+    """
+    object.__setattr__(obj, "_shape", SHAPES.setdefault(shape, shape))
+
+
+def fill_compact(obj, attributes):
+    """Sets the attributes of a new compact instance at once, setting
+    its shape a single time
+
+    Args:
+        obj: The compact instance, with no attribute set
+        attributes (dict): The attributes, in order
+    """
+    fields = type(obj).__fields__
+    extras = None
+    for name, value in attributes.items():
+        field = fields.get(name)
+        if field is not None:
+            field.member.__set__(obj, value)
+        elif extras is None:
+            extras = {name: value}
+        else:
+            extras[name] = value
+    object.__setattr__(obj, "_extras", extras)
+    set_shape(obj, tuple(attributes))
+
+
+class Field:
+    """Descriptor storing a declared attribute of a compact model in a
+    slot. Reading it from the class returns the declared default.
+    """
+    __slots__ = ("name", "member", "default")
+
+    def __init__(self, name, default):
+        """Initializes a Field instance
+
+        Args:
+            name (str): Name of the attribute
+            default: Declared default value, or MISSING
+        """
+        self.name = name
+        self.default = default
+        # Slot descriptor, set once the class is created
+        self.member = None
+
+    def __get__(self, obj, owner=None):
+        """Returns the value of the attribute
+
+        Args:
+            obj: The instance, or None when read from the class
+            owner (type): The class
+
+        Raises:
+            AttributeError: If the attribute has no value
+
+        Returns:
+            The value of the attribute
+        """
+        value = self.default if obj is None else self.member.__get__(obj)
+        if value is MISSING:
+            raise AttributeError(self.name)
+        return value
+
+    def __set__(self, obj, value):
+        """Sets the value of the attribute
+
+        Args:
+            obj: The instance
+            value: The new value
+        """
+        self.member.__set__(obj, value)
+        if self.name not in obj._shape:
+            set_shape(obj, obj._shape + (self.name,))
+
+    def __delete__(self, obj):
+        """Deletes the value of the attribute, so the declared default
+        shows through again
+
+        Args:
+            obj: The instance
+
+        Raises:
+            AttributeError: If the attribute was never set
+        """
+        if self.name not in obj._shape:
+            raise AttributeError(self.name)
+        self.member.__set__(obj, self.default)
+        set_shape(obj, tuple(n for n in obj._shape if n != self.name))
+
+
+class TimestampField(Field):
+    """Field of a timestamp of a compact model. Like Timestamp, it
+    keeps the value read from storage in the form it was stored and
+    turns it into a datetime the first time it is read.
+    """
+    __slots__ = ()
+
+    def __set__(self, obj, value):
+        """Sets the timestamp as a datetime
+
+        Args:
+            obj: The instance
+            value: A datetime, its ISO format or microseconds since EPOCH
+
+        Raises:
+            ValueError: If value is not a timestamp
+        """
+        super().__set__(obj, check_timestamp(value))
+
+    def __get__(self, obj, owner=None):
+        """Returns the timestamp as a datetime
+
+        Args:
+            obj: The instance, or None when read from the class
+            owner (type): The class
+
+        Raises:
+            AttributeError: If the timestamp has no value
+
+        Returns:
+            datetime: The timestamp
+        """
+        value = super().__get__(obj, owner)
+        if obj is not None and type(value) is not datetime:
+            value = to_datetime(value)
+            self.member.__set__(obj, value)
+        return value
+
+
+class Timestamp:
+    """Descriptor of a timestamp of a regular model. The value is kept
+    in the instance `__dict__` in the form it was set, Eg: the ISO
+    string read from file.json, and turned into a datetime the first
+    time it is read, so objects loaded and saved again without reading
+    their timestamps never parse or format them. Only from_dict() keeps
+    the stored form: an assignment is checked and converted at once.
+    """
+    __slots__ = ("name",)
+
+    def __set_name__(self, owner, name):
+        """Records the name of the attribute
+
+        Args:
+            owner (type): The class
+            name (str): Name of the attribute
+        """
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        """Returns the timestamp as a datetime
+
+        Args:
+            obj: The instance, or None when read from the class
+            owner (type): The class
+
+        Raises:
+            AttributeError: If the timestamp has no value, or when
+                read from the class, which has no default
+
+        Returns:
+            datetime: The timestamp
+        """
+        if obj is None:
+            raise AttributeError(self.name)
+        try:
+            value = obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+        if type(value) is not datetime:
+            value = obj.__dict__[self.name] = to_datetime(value)
+        return value
+
+    def __set__(self, obj, value):
+        """Sets the timestamp as a datetime
+
+        Args:
+            obj: The instance
+            value: A datetime, its ISO format or microseconds since EPOCH
+
+        Raises:
+            ValueError: If value is not a timestamp
+        """
+        obj.__dict__[self.name] = check_timestamp(value)
+
+    def __delete__(self, obj):
+        """Deletes the timestamp
+
+        Args:
+            obj: The instance
+
+        Raises:
+            AttributeError: If the timestamp has no value
+        """
+        try:
+            del obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+
+class CompactModel:
+    """Methods given to compact models. The declared attributes of a
+    compact instance live in slots, other attributes in a dictionary
+    created on first use, and the order in which attributes were set is
+    kept in a tuple shared with every instance that set them in the
+    same order, so `__dict__` can be rebuilt exactly as a regular
+    instance would hold it.
+    """
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs):
+        """Creates an instance with every declared attribute unset
+
+        Args:
+            args: Ignored
+            kwargs: Ignored
+
+        Returns:
+            The new instance
+        """
+        obj = object.__new__(cls)
+        for field in cls.__fields__.values():
+            field.member.__set__(obj, field.default)
+        object.__setattr__(obj, "_shape", ())
+        object.__setattr__(obj, "_extras", None)
+        return obj
+
+    def __setattr__(self, name, value):
+        """Sets an attribute
+
+        Args:
+            name (str): Name of the attribute
+            value: Value of the attribute
+        """
+        if name in self.__fields__ or\
+                hasattr(type(getattr(type(self), name, None)), "__set__"):
+            # Declared attributes and data descriptors of the class
+            object.__setattr__(self, name, value)
+            return
+        if self._extras is None:
+            object.__setattr__(self, "_extras", {})
+        self._extras[name] = value
+        if name not in self._shape:
+            set_shape(self, self._shape + (name,))
+
+    def __getattr__(self, name):
+        """Returns an attribute that is not declared by the class
+
+        Args:
+            name (str): Name of the attribute
+
+        Raises:
+            AttributeError: If the instance has no such attribute
+
+        Returns:
+            The value of the attribute
+        """
+        if self._extras is not None and name in self._extras:
+            return self._extras[name]
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+
+    def __delattr__(self, name):
+        """Deletes an attribute
+
+        Args:
+            name (str): Name of the attribute
+        """
+        if name in self.__fields__:
+            object.__delattr__(self, name)
+            return
+        if self._extras is None or name not in self._extras:
+            raise AttributeError(name)
+        del self._extras[name]
+        set_shape(self, tuple(n for n in self._shape if n != name))
+
+    @property
+    def __dict__(self):
+        """A new dictionary of the attributes set on the instance, in
+        the order they were set. Like the `__dict__` of a regular
+        instance, it holds timestamps in the form they were set.
+
+        Returns:
+            dict: The attributes
+        """
+        fields, extras = self.__fields__, self._extras
+        return {name: fields[name].member.__get__(self) if name in fields
+                else extras[name] for name in self._shape}
+
+
+class ModelMeta(type):
+    """Metaclass of the models. When compact models are enabled, models
+    have no per-instance `__dict__`: BaseModel and every subclass keep
+    their declared attributes in slots.
+    """
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        """Creates a model class
+
+        Args:
+            name (str): Name of the class
+            bases (tuple): Base classes
+            namespace (dict): Class body
+            kwargs: Passed on to type
+
+        Returns:
+            type: The new class
+        """
+        # Fields declared by the compact base classes
+        inherited = {}
+        for base in reversed(bases):
+            inherited.update(getattr(base, "__fields__", {}))
+        if not inherited and not compact_enabled():
+            return super().__new__(mcs, name, bases, namespace, **kwargs)
+        fields = {}
+        for field in ("id",) + TIMESTAMPS:
+            if field not in inherited:
+                kind = TimestampField if field in TIMESTAMPS else Field
+                fields[field] = kind(field, MISSING)
+        for field, default in list(namespace.items()):
+            # Methods and descriptors, Eg: properties, timestamps or
+            # relationships, stay on the class
+            if field.startswith("_") or callable(default) or\
+                    hasattr(type(default), "__get__"):
+                continue
+            fields[field] = Field(field, namespace.pop(field))
+        namespace.update(fields)
+        namespace["__fields__"] = dict(inherited, **fields)
+        # Shadow the __dict__ a regular base class may provide
+        namespace["__dict__"] = CompactModel.__dict__["__dict__"]
+        slots = tuple("_v_" + field for field in fields)
+        if not inherited:
+            bases = bases + (CompactModel,)
+            slots += ("_shape", "_extras")
+        namespace["__slots__"] = slots
+        cls = super().__new__(mcs, name, bases, namespace, **kwargs)
+        for field in fields.values():
+            field.member = cls.__dict__["_v_" + field.name]
+        return cls
+
+
+class BaseModel(metaclass=ModelMeta):
     """The super class
     """
+    # Converted to datetime when first read
+    created_at = Timestamp()
+    updated_at = Timestamp()
+
     def __init__(self, *args, **kwargs):
         """Initializes a BaseModel instance
         """
@@ -18,21 +443,57 @@ class BaseModel:
             for key, value in kwargs.items():
                 if key == "__class__":
                     continue
-                if key in ["created_at", "updated_at"]:
-                    value = datetime.fromisoformat(value)
                 setattr(self, key, value)
         else:
             self.id = str(uuid4())
-            self.created_at = datetime.now()
-            self.updated_at = datetime.now()
+            self.created_at = self.updated_at = datetime.now()
             models.storage.new(self)
 
+    @classmethod
+    def from_dict(cls, data):
+        """Builds an instance from a dictionary made by to_dict(). The
+        attributes are assigned at once, without going through
+        __init__ and __setattr__, so this is the constructor used when
+        reading objects from storage.
+
+        Args:
+            data (dict): The dictionary of the instance. Its timestamps
+                may be ISO strings, datetime instances or microseconds
+                since EPOCH, and are converted when first read.
+
+        Returns:
+            The new instance, not added to the storage
+        """
+        obj = cls.__new__(cls)
+        attributes = dict(data)
+        attributes.pop("__class__", None)
+        if "__fields__" in cls.__dict__:
+            fill_compact(obj, attributes)
+        else:
+            obj.__dict__.update(attributes)
+        return obj
+
+    def __setattr__(self, name, value):
+        """Sets an attribute and marks the instance as changed in the
+        storage, so the next save persists it. Changing a list or dict
+        attribute in place is not seen: call models.storage.touch().
+
+        Args:
+            name (str): Name of the attribute
+            value: Value of the attribute
+        """
+        super().__setattr__(name, value)
+        models.storage.touch(self)
+
     def __str__(self):
         """String representation of instance object
 
         Returns:
             str: string representation of instance object
         """
+        # Show the timestamps as datetime instances
+        for key in TIMESTAMPS:
+            getattr(self, key, None)
         return "[{}] ({}) {}".format(self.__class__.__name__,
                                      self.id, self.__dict__)
 
@@ -43,6 +504,26 @@ class BaseModel:
         self.updated_at = datetime.now()
         models.storage.save()
 
+    async def asave(self):
+        """Like save(), without blocking the event loop (see the
+        asave() method of the storage)
+        """
+        self.updated_at = datetime.now()
+        await models.storage.asave()
+
+    def delete(self):
+        """Deletes the instance from storage with its dependents and
+        saves, following the on_delete policies of its relationships
+        (see models/relationships.py)
+
+        Raises:
+            RestrictError: If a "restrict" relationship has dependents
+
+        Returns:
+            int: Number of objects deleted
+        """
+        return relationships.delete(self)
+
     def to_dict(self):
         """A dictionary containing all keys/values of __dict__
         of the instance.
@@ -52,6 +533,9 @@ class BaseModel:
         """
         instance_dict = self.__dict__.copy()
         instance_dict["__class__"] = self.__class__.__name__
-        instance_dict["created_at"] = self.created_at.isoformat()
-        instance_dict["updated_at"] = self.updated_at.isoformat()
+        for key in TIMESTAMPS:
+            # ISO strings read from storage are written back as they are
+            value = instance_dict[key] if key in instance_dict else\
+                getattr(self, key)
+            instance_dict[key] = to_iso(value)
         return instance_dict
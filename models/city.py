@@ -4,6 +4,7 @@
 
 
 from models.base_model import BaseModel
+from models.relationships import HasMany
 
 
 class City(BaseModel):
@@ -15,3 +16,4 @@ class City(BaseModel):
     """
     state_id = ""
     name = ""
+    places = HasMany("Place", "city_id", on_delete="cascade")
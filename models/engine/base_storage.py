@@ -0,0 +1,426 @@
+#!/usr/bin/python3
+"""BaseStorage class, the interface of the storage engines
+"""
+
+from abc import ABC, abstractmethod
+import asyncio
+from contextlib import contextmanager
+from heapq import nsmallest
+import threading
+from models.engine import geo, query
+
+
+class BaseStorage(ABC):
+    """The super class of the storage engines. The console and the
+    models only use the methods declared here, so any engine can be
+    selected in models/__init__.py. An engine missing one of the
+    abstract methods can not be created.
+    """
+    # batch() blocks open in each thread, kept per thread so that one
+    # thread's block does not defer the saves of the others,
+    # Eg: __batches.open = {storage: [number of open blocks, True if
+    # save() was called inside them]}
+    __batches = threading.local()
+
+    # Futures of the asave() calls waiting for the next save
+    __save_waiters = None
+
+    # Task running the saves requested by asave()
+    __saver = None
+
+    @abstractmethod
+    def all(self, cls=None):
+        """Returns the objects of the storage
+
+        Args:
+            cls (type or str): Only return the objects of this class
+
+        Returns:
+            dict: A dictionary of {<class name>.<id>: object}
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def new(self, obj):
+        """Adds a new object to the storage
+
+        Args:
+            obj: The new object
+        """
+        raise NotImplementedError
+
+    def touch(self, obj):
+        """Marks an object as modified so the next save persists it
+
+        Args:
+            obj: The modified object
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, obj=None):
+        """Deletes an object from the storage
+
+        Args:
+            obj: The object to be deleted. Nothing happens if it is None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, cls, id):
+        """Returns one object
+
+        Args:
+            cls (type or str): The class or name of the class
+            id (str): Id of the object
+
+        Returns:
+            The object, or None if it does not exist
+        """
+        raise NotImplementedError
+
+    def count(self, cls=None):
+        """Counts all objects, or only the objects of a class
+
+        Args:
+            cls (type or str): The class or name of the class
+
+        Returns:
+            int: Number of objects
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def query(self, cls, **predicates):
+        """Returns the objects of a class matching every predicate
+
+        Args:
+            cls (type or str): The class or name of the class
+            predicates: Eg: city_id="1234", price_by_night__ge=100
+
+        Returns:
+            dict: A dictionary of the matching objects
+        """
+        raise NotImplementedError
+
+    def where(self, cls, predicates=None, order_by=None, limit=None,
+              offset=0):
+        """Returns one page of the objects of a class matching every
+        predicate, Eg: the 10 cheapest places of a city. By default the
+        objects found by query() are sorted and sliced: engines able to
+        stop reading at the end of the page override it.
+
+        Args:
+            cls (type or str): The class or name of the class
+            predicates (dict): The predicates of query(),
+                Eg: {"city_id": "1234", "price_by_night__lt": 100}
+            order_by (str): Attribute ordering the page, prefixed with
+                "-" for descending order, Eg: "-price_by_night". Ties
+                are ordered by id.
+            limit (int): Number of objects of the page, or None for all
+            offset (int): Number of matching objects skipped first
+
+        Raises:
+            ValueError: If a predicate uses an unknown operator, or the
+                limit or offset is not a non-negative integer
+
+        Returns:
+            list: The objects of the page
+        """
+        self.check_page(limit, offset)
+        found = list(self.query(cls, **(predicates or {})).values())
+        order, descending = query.parse_order(order_by)
+        if order is not None:
+            found.sort(key=lambda obj: (query.sort_key(obj, order), obj.id),
+                       reverse=descending)
+        return found[offset:None if limit is None else offset + limit]
+
+    @staticmethod
+    def check_page(limit, offset):
+        """Validates the limit and offset of where()
+
+        Args:
+            limit (int): Number of objects of the page, or None
+            offset (int): Number of matching objects skipped first
+
+        Raises:
+            ValueError: If one is not a non-negative integer
+        """
+        if limit is not None and (type(limit) is not int or limit < 0):
+            raise ValueError("invalid limit: {}".format(limit))
+        if type(offset) is not int or offset < 0:
+            raise ValueError("invalid offset: {}".format(offset))
+
+    def search(self, cls, text, limit=None):
+        """Returns the objects of a class whose text attributes hold
+        every term of a search, best match first
+
+        Args:
+            cls (type or str): The class or name of the class
+            text (str): The search, Eg: "quiet pool*"
+            limit (int): Only return this many of the best matches
+
+        Returns:
+            list: The matching objects, best match first
+        """
+        raise NotImplementedError
+
+    def within(self, cls, south, west, north, east):
+        """Returns the objects of a class whose latitude and longitude
+        lie inside a bounding box, bounds included. By default it runs
+        range queries on both attributes: engines with a spatial index
+        override it.
+
+        Args:
+            cls (type or str): The class or name of the class
+            south (float): Lowest latitude
+            west (float): Western longitude. A box whose west is greater
+                than its east crosses the antimeridian.
+            north (float): Highest latitude
+            east (float): Eastern longitude
+
+        Raises:
+            ValueError: If a bound is not a valid coordinate
+
+        Returns:
+            dict: A dictionary of the matching objects
+        """
+        geo.check_point(south, west)
+        geo.check_point(north, east)
+        result = {}
+        for south, west, north, east in geo.split_box(south, west, north,
+                                                      east):
+            result.update(self.query(
+                cls, latitude__ge=south, latitude__le=north,
+                longitude__ge=west, longitude__le=east))
+        return result
+
+    def near(self, cls, latitude, longitude, radius_km, limit=None):
+        """Returns the objects of a class whose latitude and longitude
+        lie within a distance of a point, nearest first. By default the
+        objects of the bounding boxes of the circle are read with
+        within() and their distance is checked.
+
+        Args:
+            cls (type or str): The class or name of the class
+            latitude (float): Latitude of the point
+            longitude (float): Longitude of the point
+            radius_km (float): The distance in kilometres
+            limit (int): Only return this many of the nearest objects
+
+        Raises:
+            ValueError: If the point, the distance or the limit is
+                invalid
+
+        Returns:
+            list: The matching objects, nearest first
+        """
+        self.check_near(latitude, longitude, radius_km, limit)
+        found = []
+        for box in geo.boxes_around(latitude, longitude, radius_km):
+            for obj in self.within(cls, *box).values():
+                distance = geo.distance_km(
+                    latitude, longitude, float(obj.latitude),
+                    geo.wrap_longitude(float(obj.longitude)))
+                if distance <= radius_km:
+                    found.append((distance, id(obj), obj))
+        found = sorted(found) if limit is None else nsmallest(limit, found)
+        return [obj for _, _, obj in found]
+
+    def places_near(self, latitude, longitude, radius_km, limit=None):
+        """Returns the places within a distance of a point, nearest
+        first, see near()
+
+        Args:
+            latitude (float): Latitude of the point
+            longitude (float): Longitude of the point
+            radius_km (float): The distance in kilometres
+            limit (int): Only return this many of the nearest places
+
+        Returns:
+            list: The places, nearest first
+        """
+        return self.near("Place", latitude, longitude, radius_km, limit)
+
+    def places_within(self, south, west, north, east):
+        """Returns the places inside a bounding box, see within()
+
+        Args:
+            south (float): Lowest latitude
+            west (float): Western longitude
+            north (float): Highest latitude
+            east (float): Eastern longitude
+
+        Returns:
+            dict: A dictionary of the places
+        """
+        return self.within("Place", south, west, north, east)
+
+    @staticmethod
+    def check_near(latitude, longitude, radius_km, limit):
+        """Validates the arguments of near()
+
+        Args:
+            latitude (float): Latitude of the point
+            longitude (float): Longitude of the point
+            radius_km (float): The distance in kilometres
+            limit (int): The number of objects, or None
+
+        Raises:
+            ValueError: If an argument is invalid
+        """
+        geo.check_point(latitude, longitude)
+        if not radius_km >= 0:
+            raise ValueError("invalid radius: {}".format(radius_km))
+        if limit is not None and limit < 0:
+            raise ValueError("invalid limit: {}".format(limit))
+
+    @abstractmethod
+    def save(self):
+        """Persists the changes made since the last save
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def reload(self):
+        """Loads the storage from disk
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """Waits until the saves made so far are durable. Engines that
+        write in the background override it.
+        """
+
+    def sync(self):
+        """Picks up the changes other processes saved since the storage
+        was last read or written. Engines whose files can be shared by
+        several processes override it.
+        """
+
+    @contextmanager
+    def batch(self):
+        """Defers persistence until the end of the block: save() calls
+        made inside it only record that a save is needed, and a single
+        save runs when the outermost block exits (even if it raised,
+        since the changes are already applied in memory).
+
+        Usage example:
+            with storage.batch():
+                for obj in objects:
+                    obj.save()
+
+        Yields:
+            BaseStorage: The storage
+        """
+        blocks = self.__open_batches()
+        state = blocks.setdefault(self, [0, False])
+        state[0] += 1
+        try:
+            yield self
+        finally:
+            state[0] -= 1
+            if not state[0]:
+                del blocks[self]
+                if state[1]:
+                    self.save()
+
+    def defer_save(self):
+        """Called at the start of save(): inside a batch() block opened
+        by the same thread it records that a save is needed so save()
+        can return at once
+
+        Returns:
+            bool: True if the save is deferred to the end of the batch
+        """
+        state = self.__open_batches().get(self)
+        if state:
+            state[1] = True
+            return True
+        return False
+
+    @staticmethod
+    def __open_batches():
+        """Returns the batch() blocks open in the current thread
+
+        Returns:
+            dict: {storage: [number of open blocks, True if save() was
+            called inside them]}
+        """
+        try:
+            return BaseStorage.__batches.open
+        except AttributeError:
+            BaseStorage.__batches.open = {}
+            return BaseStorage.__batches.open
+
+    async def asave(self):
+        """Persists the changes made so far without blocking the event
+        loop longer than the engine needs (see persist()). Calls made
+        while a save runs wait for the next one, so a burst of calls
+        from many tasks writes at most twice.
+
+        Usage example:
+            await storage.asave()
+
+        Raises:
+            Exception: The error raised by the save
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        if self.__save_waiters is None:
+            self.__save_waiters = []
+        self.__save_waiters.append(waiter)
+        if self.__saver is None:
+            self.__saver = loop.create_task(self.__run_saves())
+        await waiter
+
+    async def __run_saves(self):
+        """Runs saves until no asave() call is waiting
+        """
+        try:
+            while self.__save_waiters:
+                waiters, self.__save_waiters = self.__save_waiters, []
+                try:
+                    await self.persist()
+                except Exception as error:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(error)
+                else:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+        finally:
+            self.__saver = None
+
+    async def persist(self):
+        """Runs one save for asave(). By default save() runs in the event
+        loop: engines whose saves take long override it to save a slice
+        at a time or in another thread.
+        """
+        self.save()
+
+    async def aget(self, cls, id):
+        """Returns one object without blocking the event loop longer
+        than the engine needs. By default get() runs in the event loop.
+
+        Args:
+            cls (type or str): The class or name of the class
+            id (str): Id of the object
+
+        Returns:
+            The object, or None if it does not exist
+        """
+        return self.get(cls, id)
+
+    @staticmethod
+    def class_name(cls):
+        """Returns the name of a class
+
+        Args:
+            cls (type or str): The class or name of the class
+
+        Returns:
+            str: Name of the class
+        """
+        return cls if isinstance(cls, str) else cls.__name__
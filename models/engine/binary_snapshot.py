@@ -0,0 +1,189 @@
+#!/usr/bin/python3
+"""Binary snapshot format of FileStorage, and a converter between it
+and the JSON file
+
+A binary snapshot is MAGIC followed by one marshal-encoded tuple:
+    (VERSION, [class name, ...], [(attribute names, timestamp
+     positions), ...], [(class index, id, shape index, values), ...])
+Class names and the attribute names of each shape are stored once in
+the tables, and created_at/updated_at are stored as integer
+microseconds since the epoch, so loading decodes no ISO strings.
+
+convert() is run by the convert_snapshot.py script at the root of
+the repository.
+"""
+
+from datetime import datetime, timedelta
+import io
+import json
+import marshal
+import sys
+from models.engine.json_stream import JSONObjectStream
+from models.engine.snapshot import atomic_write
+
+
+# First bytes of a binary snapshot, never found at the start of JSON
+MAGIC = b"\x89HBNB\n"
+
+# Version of the layout following MAGIC
+VERSION = 1
+
+# Attributes stored as microseconds since EPOCH
+TIMESTAMPS = ("created_at", "updated_at")
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(value):
+    """Returns a timestamp as microseconds since EPOCH, if it can be
+    turned back into the same value
+
+    Args:
+        value: A naive datetime or its ISO format
+
+    Returns:
+        int: The microseconds, or None if value is not a timestamp
+    """
+    if isinstance(value, str):
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        # Keep other spellings of the time as strings
+        if moment.isoformat() != value:
+            return None
+        value = moment
+    if not isinstance(value, datetime) or value.tzinfo is not None:
+        return None
+    return (value - EPOCH) // MICROSECOND
+
+
+def dump(pairs, file):
+    """Writes objects as a binary snapshot
+
+    Args:
+        pairs: (key, dictionary of the object) pairs
+        file: A file opened in binary mode
+    """
+    classes, shapes, records = {}, {}, []
+    for key, data in pairs:
+        name, id = key.split(".", 1)
+        # Equal strings sharing one object are stored once by marshal
+        name = sys.intern(name)
+        names = tuple(map(sys.intern, data))
+        values = list(data.values())
+        stamps = []
+        for position, attribute in enumerate(names):
+            if attribute == "__class__" and values[position] == name:
+                values[position] = name
+            elif attribute in TIMESTAMPS:
+                micros = to_micros(values[position])
+                if micros is not None:
+                    values[position] = micros
+                    stamps.append(position)
+        shape = (names, tuple(stamps))
+        records.append((classes.setdefault(name, len(classes)), id,
+                        shapes.setdefault(shape, len(shapes)),
+                        tuple(values)))
+    file.write(MAGIC)
+    marshal.dump((VERSION, list(classes), list(shapes), records), file)
+
+
+def load(file):
+    """Reads the objects of a binary snapshot, in the order they were
+    written. Only load files written by dump(): marshal data is trusted.
+
+    Args:
+        file: A file opened in binary mode
+
+    Raises:
+        ValueError: If the file is not a binary snapshot of VERSION
+
+    Yields:
+        tuple: The key and the dictionary of an object, whose
+        timestamps are datetime instances
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a binary snapshot")
+    try:
+        # marshal.load() reads a file object a few bytes at a time
+        version, classes, shapes, records = marshal.loads(file.read())
+    except (EOFError, TypeError) as error:
+        raise ValueError("corrupt binary snapshot") from error
+    if version != VERSION:
+        raise ValueError("unknown snapshot version: {}".format(version))
+    for class_index, id, shape_index, values in records:
+        names, stamps = shapes[shape_index]
+        data = dict(zip(names, values))
+        for position in stamps:
+            data[names[position]] = EPOCH + values[position] * MICROSECOND
+        yield "{}.{}".format(classes[class_index], id), data
+
+
+def is_binary(file):
+    """Tells whether a file holds a binary snapshot, leaving the file
+    at its start
+
+    Args:
+        file: A seekable file opened in binary mode
+
+    Returns:
+        bool: True for a binary snapshot, False for anything else
+    """
+    start = file.read(len(MAGIC))
+    file.seek(0)
+    return start == MAGIC
+
+
+def read(file):
+    """Reads the objects of a snapshot in either format
+
+    Args:
+        file: A seekable file opened in binary mode
+
+    Yields:
+        tuple: The key and the dictionary of an object
+    """
+    if is_binary(file):
+        yield from load(file)
+        return
+    text = io.TextIOWrapper(file, encoding="utf-8")
+    try:
+        yield from JSONObjectStream(text)
+    finally:
+        # Leave the binary file to its owner
+        text.detach()
+
+
+def dump_json(pairs, file):
+    """Writes objects as the JSON file of FileStorage
+
+    Args:
+        pairs: (key, dictionary of the object) pairs
+        file: A file opened in text mode
+    """
+    json.dump(dict(pairs), file, default=datetime.isoformat)
+
+
+def convert(source, destination):
+    """Converts a JSON snapshot to a binary one, or a binary snapshot
+    to JSON
+
+    Args:
+        source (str): Path of the snapshot to read
+        destination (str): Path of the snapshot to write
+
+    Returns:
+        str: The format written, "binary" or "json"
+    """
+    with open(source, "rb") as file:
+        binary = is_binary(file)
+        pairs = list(read(file))
+    if binary:
+        with atomic_write(destination) as file:
+            dump_json(pairs, file)
+        return "json"
+    with atomic_write(destination, "wb") as file:
+        dump(pairs, file)
+    return "binary"
+
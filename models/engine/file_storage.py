@@ -2,17 +2,32 @@
 """FileStorage class
 """
 
+import asyncio
+import atexit
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
 import json
+import os
+import threading
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
+from models.engine import binary_snapshot, geo, indexed_snapshot, query
+from models.engine.base_storage import BaseStorage
+from models.engine.indexed_snapshot import IndexedSnapshot
+from models.engine.indexes import INDEX_KINDS, GridIndex, TextIndex
+from models.engine.journal import Journal
+from models.engine.locking import FileLock, generation
+from models.engine.object_store import ObjectStore, RawRecord
+from models.engine.shards import ShardLayout
+from models.engine.snapshot import BackgroundWriter, atomic_write
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 
 
-class FileStorage:
+class FileStorage(BaseStorage):
     """This class serializes instances to a JSON file
     and deserializes JSON files to instances
     """
@@ -21,6 +36,29 @@ class FileStorage:
     # Eg: __objects = {class.id: "address of BaseModel Instance"}
     __objects = {}
 
+    # Keys changed since the last save: {class.id: "set" or "del"}
+    __pending = {}
+
+    # Indexed snapshot whose objects are not all loaded yet
+    __snapshot = None
+
+    # Shard files not loaded yet: {path: (class name, bucket)}
+    __unloaded = {}
+
+    # Generation of the file when the objects were last read from or
+    # written to it, in shared mode
+    __generation = None
+
+    # Lock of the objects of thread-safe instances
+    __threads_lock = threading.RLock()
+
+    # Number of objects persist() encodes between two yields to the
+    # event loop
+    __slice = 500
+
+    # Formats of the file written by save()
+    __file_formats = ("json", "binary", "indexed")
+
     # Create all available classes
     __all_classes = {
         "Amenity": Amenity,
@@ -32,13 +70,336 @@ class FileStorage:
         "User": User,
     }
 
-    def all(self):
-        """Returns the dictionary `__objects`
+    # Attribute indexes of each class: {class name: {attribute: kind}}
+    # The indexes of a class are built at once by its first query rather
+    # than one object at a time on load, text indexes by its first search
+    __indexes = {
+        "Amenity": {"name": "text"},
+        "City": {"state_id": "hash"},
+        "Place": {
+            "city_id": "hash",
+            "user_id": "hash",
+            "price_by_night": "sorted",
+            "latitude": "sorted",
+            "longitude": "sorted",
+            "latitude,longitude": "grid",
+            "name,description": "text",
+        },
+        "Review": {"place_id": "hash", "user_id": "hash", "text": "text"},
+    }
+
+    def __init__(self, journal=False, compact_threshold=1000, lazy=False,
+                 background=False, file_format="json", shards=0,
+                 shared=False, threadsafe=False):
+        """Initializes a FileStorage instance
+
+        Args:
+            journal (bool): If True, save() appends the changes made since
+                the last save to a log next to the JSON file instead of
+                rewriting the whole file
+            compact_threshold (int): Number of log records after which the
+                log is folded back into a fresh JSON file
+            lazy (bool): If True, reload() keeps the dictionaries read from
+                the file and only builds an object the first time it is
+                accessed
+            background (bool): If True, the JSON file is written by a
+                writer thread and save() returns at once; flush() waits
+                for the write. Not used in journal mode, where the log
+                must be cleared right after the JSON file is written.
+            file_format (str): Format of the file written by save():
+                "json", "binary" (see models/engine/binary_snapshot.py)
+                or "indexed" (see models/engine/indexed_snapshot.py).
+                reload() reads any of them.
+            shards (int): If not 0, the objects are kept in a directory
+                next to the file (__file_path + ".d") holding one file
+                per class, or `shards` files per class partitioned by a
+                hash of the id. save() only rewrites the files holding
+                changed objects and the files of a class are only read
+                when the class is used. The single file is migrated the
+                first time the directory is missing.
+            shared (bool): If True, several processes can use the file
+                at once. save() holds an fcntl lock on __file_path +
+                ".lock" and first merges the objects other processes
+                saved, and the read methods pick up their changes when
+                the generation of the file changed (see sync()).
+            threadsafe (bool): If True, several threads can use the
+                storage at once. Every method holds a lock while it
+                reads or changes the objects, all() returns a copy of
+                the dictionary of objects made again only after it
+                changed, and save() hands the file to the writer thread
+                so the lock is not held while it is written, then waits
+                for the write unless background is also set. A batch()
+                block only defers the saves of the thread that opened
+                it. Reads hold the lock too, so they run one at a time.
+
+        Raises:
+            ValueError: If file_format is not a known format, shards
+                is used with journal mode or the indexed format, or
+                shared is used with journal, background, shards or the
+                indexed format
+        """
+        if file_format not in self.__file_formats:
+            raise ValueError("unknown file format: {}".format(file_format))
+        if shards and (journal or file_format == "indexed"):
+            raise ValueError("shards can not be used with journal mode or "
+                             "the indexed format")
+        if shared and (journal or background or shards or
+                       file_format == "indexed"):
+            raise ValueError("shared can not be used with journal mode, "
+                             "background writes, shards or the indexed "
+                             "format")
+        self.__shared = shared
+        self.__threadsafe = threadsafe
+        self.__mutex = self.__threads_lock if threadsafe else nullcontext()
+        # The lock of the file while save() or compact() holds it
+        self.__lock = None
+        self.__shards = shards
+        self.__journal = journal
+        self.__format = file_format
+        self.__lazy = lazy
+        self.__compact_threshold = compact_threshold
+        # Number of records currently held in the log
+        self.__log_records = 0
+        self.__writer = None
+        # save() waits for the writer thread in thread-safe mode only
+        self.__wait = threadsafe and not background
+        # In shared mode the file is written while its lock is held
+        if (background or threadsafe) and not journal and not shared:
+            self.__writer = BackgroundWriter(self.__write, self.__merge)
+            # Do not exit before the last save is written
+            atexit.register(self.flush)
+
+    def all(self, cls=None):
+        """Returns the dictionary `__objects`, or only the objects of
+        a class if cls is given
+
+        Args:
+            cls (type or str): The class or name of the class
+
+        Returns:
+            dict: A dictionary of all objects. In thread-safe mode it is
+            a copy shared by the callers until the objects change, so it
+            can be iterated while other threads change the storage but
+            must not be changed.
+        """
+        with self.__mutex:
+            self.sync()
+            if cls is None:
+                if self.__threadsafe:
+                    return self.__store().snapshot()
+                return self.__store()
+            name = self.class_name(cls)
+            return self.__class_store(name).of_class(name)
+
+    def count(self, cls=None):
+        """Counts all objects, or only the objects of a class if cls
+        is given
+
+        Args:
+            cls (type or str): The class or name of the class
+
+        Returns:
+            int: Number of objects
+        """
+        with self.__mutex:
+            self.sync()
+            if cls is None:
+                return len(self.__store())
+            name = self.class_name(cls)
+            return self.__class_store(name).count(name)
+
+    def get(self, cls, id):
+        """Returns one object
+
+        Args:
+            cls (type or str): The class or name of the class
+            id (str): Id of the object
+
+        Returns:
+            The object, or None if it does not exist
+        """
+        with self.__mutex:
+            self.sync()
+            name = self.class_name(cls)
+            key = "{}.{}".format(name, id)
+            objects = self.__class_store(name, id)
+            # Read only this object of an indexed snapshot, unless it
+            # was deleted since
+            if key not in objects and FileStorage.__snapshot is not None\
+                    and self.__pending.get(key) != "del":
+                text = FileStorage.__snapshot.get(key)
+                if text is not None:
+                    self.__add_loaded(key, text)
+            return objects.get(key)
+
+    def query(self, cls, **predicates):
+        """Returns the objects of a class matching every predicate.
+        A predicate is either `attribute=value` for equality or
+        `attribute__<op>=value` where <op> is one of eq, ne, lt, le,
+        gt or ge. Indexed attributes are looked up in their index.
+
+        Args:
+            cls (type or str): The class or name of the class
+            predicates: The predicates, Eg: price_by_night__ge=100
+
+        Raises:
+            ValueError: If a predicate uses an unknown operator
+
+        Returns:
+            dict: A dictionary of the matching objects
+        """
+        with self.__mutex:
+            self.sync()
+            name = self.class_name(cls)
+            return query.select(self.__indexed(name), name, predicates)
+
+    def within(self, cls, south, west, north, east):
+        """Returns the objects of a class whose latitude and longitude
+        lie inside a bounding box, reading only the cells of the grid
+        index covering it when the class has one
+
+        Args:
+            cls (type or str): The class or name of the class
+            south (float): Lowest latitude
+            west (float): Western longitude. A box whose west is greater
+                than its east crosses the antimeridian.
+            north (float): Highest latitude
+            east (float): Eastern longitude
+
+        Raises:
+            ValueError: If a bound is not a valid coordinate
 
         Returns:
-            dict: A dictionary of all objects
+            dict: A dictionary of the matching objects
         """
-        return self.__objects
+        with self.__mutex:
+            self.sync()
+            name = self.class_name(cls)
+            objects = self.__indexed(name)
+            index = self.__grid(objects, name)
+            if index is None:
+                return super().within(name, south, west, north, east)
+            geo.check_point(south, west)
+            geo.check_point(north, east)
+            return {key: objects[key]
+                    for key in index.within(south, west, north, east)}
+
+    def near(self, cls, latitude, longitude, radius_km, limit=None):
+        """Returns the objects of a class whose latitude and longitude
+        lie within a distance of a point, nearest first, reading only
+        the cells of the grid index covering the circle when the class
+        has one
+
+        Args:
+            cls (type or str): The class or name of the class
+            latitude (float): Latitude of the point
+            longitude (float): Longitude of the point
+            radius_km (float): The distance in kilometres
+            limit (int): Only return this many of the nearest objects
+
+        Raises:
+            ValueError: If the point, the distance or the limit is
+                invalid
+
+        Returns:
+            list: The matching objects, nearest first
+        """
+        with self.__mutex:
+            self.sync()
+            name = self.class_name(cls)
+            objects = self.__indexed(name)
+            index = self.__grid(objects, name)
+            if index is None:
+                return super().near(name, latitude, longitude, radius_km,
+                                    limit)
+            self.check_near(latitude, longitude, radius_km, limit)
+            return [objects[key] for _, key in
+                    index.near(latitude, longitude, radius_km, limit)]
+
+    def where(self, cls, predicates=None, order_by=None, limit=None,
+              offset=0):
+        """Returns one page of the objects of a class matching every
+        predicate. The query planner of models/engine/query.py reads
+        the candidates of the most selective index, the objects in the
+        order of the sorted index of order_by, or the objects of the
+        class, filtering them as they are read and stopping at the end
+        of the page.
+
+        Args:
+            cls (type or str): The class or name of the class
+            predicates (dict): The predicates of query(),
+                Eg: {"city_id": "1234", "price_by_night__lt": 100}
+            order_by (str): Attribute ordering the page, prefixed with
+                "-" for descending order, Eg: "-price_by_night". Ties
+                are ordered by id.
+            limit (int): Number of objects of the page, or None for all
+            offset (int): Number of matching objects skipped first
+
+        Raises:
+            ValueError: If a predicate uses an unknown operator, or the
+                limit or offset is not a non-negative integer
+
+        Returns:
+            list: The objects of the page
+        """
+        self.check_page(limit, offset)
+        with self.__mutex:
+            self.sync()
+            name = self.class_name(cls)
+            return query.execute(self.__indexed(name), name,
+                                 predicates or {}, order_by, limit, offset)
+
+    def search(self, cls, text, limit=None):
+        """Returns the objects of a class whose text attributes hold
+        every term of a search, best match first. A term ending with *,
+        Eg: "pool*", matches every word it starts. The text index of the
+        class is built by the first search, then kept up to date like
+        the other indexes.
+
+        Args:
+            cls (type or str): The class or name of the class
+            text (str): The search, Eg: "quiet pool*"
+            limit (int): Only return this many of the best matches
+
+        Raises:
+            ValueError: If the class has no text index or the limit is
+                negative
+
+        Returns:
+            list: The matching objects, best match first
+        """
+        if limit is not None and limit < 0:
+            raise ValueError("invalid limit: {}".format(limit))
+        with self.__mutex:
+            self.sync()
+            name = self.class_name(cls)
+            objects = self.__class_store(name)
+            index = self.__text(objects, name)
+            return [objects[key] for _, key in index.search(text, limit)]
+
+    def add_index(self, cls, attribute, kind="hash"):
+        """Declares an attribute index on a class. Hash indexes serve
+        equality predicates, sorted indexes serve equality and range
+        predicates on numeric attributes, grid indexes, declared on
+        "latitude,longitude", serve within() and near(), and text
+        indexes, Eg: on "name,description", serve search().
+
+        Args:
+            cls (type or str): The class or name of the class
+            attribute (str): Name of the attribute
+            kind (str): "hash", "sorted", "grid" or "text"
+
+        Raises:
+            ValueError: If kind is not a known kind of index, or the
+                attributes of a grid index are not two names
+        """
+        with self.__mutex:
+            if kind not in INDEX_KINDS:
+                raise ValueError("unknown index kind: {}".format(kind))
+            index = INDEX_KINDS[kind](attribute)
+            name = self.class_name(cls)
+            self.__indexes.setdefault(name, {})[attribute] = kind
+            self.__store().add_index(name, index)
 
     def new(self, obj):
         """Updates the dictionary objects with a new object
@@ -46,30 +407,618 @@ class FileStorage:
         Args:
             obj: The new object to be added
         """
-        # Construct key
-        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        with self.__mutex:
+            # Construct key
+            key = "{}.{}".format(obj.__class__.__name__, obj.id)
+
+            # Assign Value to key, once the shard it goes to is read
+            self.__class_store(obj.__class__.__name__, obj.id)[key] = obj
 
-        # Assign Value to key
-        self.__objects[key] = obj
+            # Remember the change for the next save
+            self.__pending[key] = "set"
+
+    def touch(self, obj):
+        """Marks an object as modified so the next save persists it
+
+        Args:
+            obj: The modified object
+        """
+        with self.__mutex:
+            key = "{}.{}".format(obj.__class__.__name__,
+                                 getattr(obj, "id", ""))
+            objects = self.__store(load=False)
+            # Objects being built or not stored are not tracked
+            if key in objects and objects.peek(key) is obj:
+                self.__pending[key] = "set"
+                # Keep the attribute indexes and the JSON cache in step
+                objects.refresh(key)
+
+    def delete(self, obj=None):
+        """Deletes an object from the dictionary objects
+
+        Args:
+            obj: The object to be deleted. Nothing happens if it is None
+        """
+        with self.__mutex:
+            if obj is None:
+                return
+            name = obj.__class__.__name__
+            key = "{}.{}".format(name, obj.id)
+            if self.__class_store(name, obj.id).pop(key, None) is not None:
+                self.__pending[key] = "del"
 
     def save(self):
         """Serializes `__objects` to a JSON file(__file_path)
+
+        In journal mode only the changes made since the last save are
+        appended to the log, until the log grows past the compaction
+        threshold and is folded into a new JSON file. With shards only
+        the files holding changed objects are rewritten. In background
+        mode the file is written by the writer thread. Inside a batch()
+        block the save is deferred to the end of the block. In shared
+        mode the objects other processes saved are merged first.
         """
-        new_dict = {}
-        for key, obj in self.__objects.items():
-            new_dict[key] = obj.to_dict()
-        with open(self.__file_path, "w", encoding="utf-8") as file:
-            json.dump(new_dict, file)
+        if self.defer_save():
+            return
+        rewrite = False
+        with self.__mutex, self.__exclusive():
+            if self.__shards and self.__layout().current():
+                self.__submit(*self.__files(False))
+            elif self.__journal and\
+                    self.__log_records + len(self.__pending) <=\
+                    self.__compact_threshold:
+                self.__append_pending()
+            elif self.__writer is None:
+                self.compact()
+            else:
+                # Let compact() wait for the writer without the lock
+                rewrite = True
+        if rewrite:
+            self.compact()
+        elif self.__wait:
+            self.flush()
+
+    def compact(self):
+        """Writes every object to the JSON file (__file_path), or to
+        every shard, and empties the log. The JSON of objects unchanged
+        since the last write is reused, so only changed objects are
+        encoded again. In background mode the write is left to the
+        writer thread.
+        """
+        with self.__mutex, self.__exclusive():
+            # Log the pending changes first: if the process dies before
+            # the log is cleared, replaying it then ends on the state
+            # of the new file rather than on older records
+            if self.__journal and self.__pending:
+                self.__append_pending()
+            self.__submit(*self.__files(True))
+            # The snapshot now holds every change, so drop the log
+            if self.__journal:
+                self.__log().clear()
+                self.__log_records = 0
+        if self.__wait:
+            self.flush()
+
+    def flush(self):
+        """Waits until the saves made so far are written to disk
+
+        Raises:
+            OSError: If the background write failed
+        """
+        if self.__writer is not None:
+            self.__writer.flush()
+
+    async def persist(self):
+        """Runs one save for asave() without blocking the event loop for
+        longer than encoding a slice of objects. The objects without
+        cached JSON are encoded a slice at a time, yielding to the loop
+        in between, then the files are assembled from the cached JSON
+        and written by the writer thread while the loop waits. Changes
+        made during the slices are still saved, since the files are
+        assembled last. Journal and shared modes write small logs or
+        hold the lock of the file, so their save() runs in the loop, or
+        in another thread in thread-safe mode.
+        """
+        loop = asyncio.get_running_loop()
+        if self.__journal or self.__shared:
+            if self.__threadsafe:
+                await loop.run_in_executor(None, self.save)
+            else:
+                self.save()
+            return
+        if self.defer_save():
+            return
+        if self.__writer is None:
+            # Write in the order saves are made, so a save() made in the
+            # meantime is not overwritten by an older snapshot
+            self.__writer = BackgroundWriter(self.__write, self.__merge)
+            self.__wait = True
+            atexit.register(self.flush)
+        if self.__format != "binary":
+            with self.__mutex:
+                objects = self.__store(load=False)
+                keys = [key for key in objects
+                        if key not in objects.fragments]
+            for start in range(0, len(keys), self.__slice):
+                with self.__mutex:
+                    objects = FileStorage.__objects
+                    for key in keys[start:start + self.__slice]:
+                        if key in objects:
+                            objects.fragment(key)
+                await asyncio.sleep(0)
+        with self.__mutex:
+            self.__submit(*self.__files(
+                not (self.__shards and self.__layout().current())))
+        await loop.run_in_executor(None, self.flush)
+
+    async def aget(self, cls, id):
+        """Returns one object without blocking the event loop on file
+        reads: objects in memory are returned at once, others may have
+        to be read from a shard or the indexed snapshot, which happens
+        in another thread in thread-safe mode
+
+        Args:
+            cls (type or str): The class or name of the class
+            id (str): Id of the object
+
+        Returns:
+            The object, or None if it does not exist
+        """
+        key = "{}.{}".format(self.class_name(cls), id)
+        with self.__mutex:
+            objects = self.__store(load=False)
+            if key in objects and not self.__shared:
+                return objects[key]
+        if not self.__threadsafe:
+            return self.get(cls, id)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.get, cls, id)
+
+    def sync(self):
+        """Merges the objects other processes saved to the file since
+        it was last read or written, in shared mode. Nothing is read if
+        the generation of the file did not change. Objects changed here
+        and not saved yet keep their version, other objects are
+        replaced if their JSON differs, so unchanged objects keep their
+        instance, and are removed if the file no longer has them.
+        """
+        if not self.__shared:
+            return
+        with self.__mutex:
+            current = generation(self.__file_path)
+            if current == FileStorage.__generation:
+                return
+            objects = self.__store()
+            found = set()
+            try:
+                with open(self.__file_path, "rb") as file:
+                    for key, obj in binary_snapshot.read(file):
+                        found.add(key)
+                        if key in self.__pending:
+                            continue
+                        # Records of binary snapshots hold datetimes
+                        text = json.dumps(obj, default=datetime.isoformat)
+                        if key not in objects or\
+                                objects.fragment(key) != text:
+                            objects[key] = self.__load(key, obj)
+                            objects.fragments[key] = text
+            except FileNotFoundError:
+                pass
+            for key in [key for key in objects
+                        if key not in found and key not in self.__pending]:
+                del objects[key]
+            FileStorage.__generation = current
 
     def reload(self):
         """Deserializes the JSON file (__file_path) to update the objects.
         If the JSON file (__file_path) doesn't exist, it does nothing
+
+        The format of the file, JSON, binary or indexed, is detected.
+        JSON is parsed one object at a time, so only the objects and a
+        chunk of the text are held in memory. An indexed snapshot is
+        mapped into memory and its objects are only read when get()
+        asks for one, or all of them when any other method needs them.
+        In journal mode the changes recorded in the log are replayed on
+        top of the objects loaded from the JSON file.
+        """
+        with self.__mutex:
+            # Let a background write finish before reading the file
+            self.flush()
+            self.__close_snapshot()
+            FileStorage.__unloaded = {}
+            objects = self.__store()
+            if self.__shared:
+                # Read before the file, so a write in between is seen
+                FileStorage.__generation = generation(self.__file_path)
+            if self.__shards:
+                self.__reload_shards()
+                return
+            try:
+                with open(self.__file_path, "rb") as file:
+                    indexed = indexed_snapshot.is_indexed(file)
+                    if not indexed:
+                        for key, obj in binary_snapshot.read(file):
+                            objects[key] = self.__load(key, obj)
+                if indexed:
+                    FileStorage.__snapshot = IndexedSnapshot(
+                        self.__file_path)
+            except (FileNotFoundError, PermissionError, TypeError):
+                pass
+            if self.__journal:
+                self.__replay()
+
+    def __store(self, load=True):
+        """Returns `__objects`, turning it into an ObjectStore with the
+        declared indexes if it is a plain dictionary
+
+        Args:
+            load (bool): If True, first load the objects of the indexed
+                snapshot and the shards that were not read yet
+
+        Returns:
+            ObjectStore: The dictionary of all objects
+        """
+        if type(FileStorage.__objects) is not ObjectStore:
+            # A new dictionary replaces the objects of the files
+            self.__close_snapshot()
+            FileStorage.__unloaded = {}
+            FileStorage.__objects = ObjectStore(FileStorage.__objects)
+        if load:
+            self.__load_snapshot()
+            self.__load_shards(list(FileStorage.__unloaded))
+        return FileStorage.__objects
+
+    @staticmethod
+    def __grid(objects, name):
+        """Returns the grid index of the positions of a class
+
+        Args:
+            objects (ObjectStore): The dictionary of all objects
+            name (str): Name of the class
+
+        Returns:
+            GridIndex: The index, or None if the class has none
+        """
+        for index in objects.indexes.get(name, {}).values():
+            if isinstance(index, GridIndex) and\
+                    (index.latitude, index.longitude) ==\
+                    ("latitude", "longitude"):
+                return index
+        return None
+
+    def __text(self, objects, name):
+        """Returns the text index of a class, building the first one
+        declared if needed
+
+        Args:
+            objects (ObjectStore): The dictionary of all objects
+            name (str): Name of the class
+
+        Raises:
+            ValueError: If the class has no text index
+
+        Returns:
+            TextIndex: The index
+        """
+        indexes = objects.indexes.get(name, {})
+        for attribute, kind in self.__indexes.get(name, {}).items():
+            if kind != "text":
+                continue
+            index = indexes.get(attribute)
+            if not isinstance(index, TextIndex):
+                index = TextIndex(attribute)
+                objects.add_index(name, index)
+            return index
+        raise ValueError("no text index on {}".format(name))
+
+    def __class_store(self, name, id=None):
+        """Returns `__objects` once the shards of a class are read
+
+        Args:
+            name (str): Name of the class
+            id (str): Only read the shard of this id, and leave the
+                indexed snapshot to be read by get()
+
+        Returns:
+            ObjectStore: The dictionary of all objects
         """
+        objects = self.__store(load=False)
+        if id is None:
+            self.__load_snapshot()
+        if FileStorage.__unloaded:
+            bucket = None if id is None else self.__layout().bucket(id)
+            self.__load_shards([
+                path for path, shard in FileStorage.__unloaded.items()
+                if shard[0] == name and bucket in (None, shard[1])])
+        return objects
+
+    def __indexed(self, name):
+        """Returns `__objects` once the shards of a class are read and
+        the indexes declared on it are built
+
+        Args:
+            name (str): Name of the class
+
+        Returns:
+            ObjectStore: The dictionary of all objects
+        """
+        objects = self.__class_store(name)
+        built = objects.indexes.get(name, {})
+        for attribute, kind in self.__indexes.get(name, {}).items():
+            if kind != "text" and attribute not in built:
+                objects.add_index(name, INDEX_KINDS[kind](attribute))
+        return objects
+
+    @contextmanager
+    def __exclusive(self):
+        """Holds the lock of the file in shared mode while the objects
+        other processes saved are merged and the file is rewritten.
+        Other modes do not lock, and neither does a save() calling
+        compact() with the lock held.
+        """
+        if not self.__shared or self.__lock is not None:
+            yield
+            return
+        with FileLock(self.__file_path + ".lock") as lock:
+            self.__lock = lock
+            try:
+                self.sync()
+                yield
+                lock.bump()
+                FileStorage.__generation = generation(self.__file_path)
+            finally:
+                self.__lock = None
+
+    def __layout(self):
+        """Returns the layout of the shards of the file (__file_path)
+
+        Returns:
+            ShardLayout: The layout
+        """
+        return ShardLayout(self.__file_path + ".d", self.__shards)
+
+    def __reload_shards(self):
+        """Finds the shards to read on demand. Shards written with
+        another number of buckets are read at once and rewritten by the
+        next save, and without shards the single file is migrated.
+        """
+        layout = self.__layout()
+        paths = layout.existing()
+        if layout.current():
+            for path in paths:
+                name, bucket = os.path.basename(path).split(".")[:2]
+                FileStorage.__unloaded[path] = (name, int(bucket))
+        elif paths:
+            for path in paths:
+                self.__read_file(path)
+        else:
+            self.__read_file(self.__file_path)
+            if len(FileStorage.__objects):
+                self.compact()
+
+    def __load_shards(self, paths):
+        """Reads shard files, keeping the objects already in memory
+
+        Args:
+            paths (list): Paths to the files
+        """
+        for path in paths:
+            del FileStorage.__unloaded[path]
+            self.__read_file(path)
+
+    def __read_file(self, path):
+        """Reads the objects of a file in any format, keeping the
+        objects already in memory
+
+        Args:
+            path (str): Path to the file
+        """
+        objects = FileStorage.__objects
         try:
-            with open(self.__file_path, "r", encoding="utf-8") as file:
-                load_obj = json.load(file)
-                for key, obj in load_obj.items():
-                    clsname = key.split(".")
-                    self.__objects[key] = self.__all_classes[clsname[0]](**obj)
+            with open(path, "rb") as file:
+                indexed = indexed_snapshot.is_indexed(file)
+                if not indexed:
+                    for key, obj in binary_snapshot.read(file):
+                        if key not in objects:
+                            objects[key] = self.__load(key, obj)
+            if indexed:
+                snapshot = IndexedSnapshot(path)
+                try:
+                    for key, text in snapshot:
+                        if key not in objects:
+                            self.__add_loaded(key, text)
+                finally:
+                    snapshot.close()
         except (FileNotFoundError, PermissionError, TypeError):
             pass
+
+    def __load_snapshot(self):
+        """Reads the objects of the indexed snapshot not read yet
+        """
+        snapshot = FileStorage.__snapshot
+        if snapshot is None:
+            return
+        FileStorage.__snapshot = None
+        try:
+            for key, text in snapshot:
+                # Objects read by get() may have changed or been
+                # deleted since
+                if key not in FileStorage.__objects and\
+                        self.__pending.get(key) != "del":
+                    self.__add_loaded(key, text)
+        finally:
+            snapshot.close()
+
+    def __add_loaded(self, key, text):
+        """Adds an object read from the indexed snapshot
+
+        Args:
+            key (str): Key of the object
+            text (str): JSON of the object
+        """
+        objects = FileStorage.__objects
+        objects[key] = self.__load(key, json.loads(text))
+        # The object is unchanged, so its JSON can be written back as is
+        objects.fragments[key] = text
+
+    @staticmethod
+    def __close_snapshot():
+        """Forgets the indexed snapshot without loading its objects
+        """
+        if FileStorage.__snapshot is not None:
+            FileStorage.__snapshot.close()
+            FileStorage.__snapshot = None
+
+    def __pairs(self, keys):
+        """Returns what is written for some objects
+
+        Args:
+            keys: Keys of the objects
+
+        Returns:
+            list: (key, JSON of the object) pairs, or (key, dictionary of
+            the object) pairs for the binary format
+        """
+        objects = FileStorage.__objects
+        if self.__format == "binary":
+            return [(key, objects.record(key)) for key in keys]
+        return [(key, objects.fragment(key)) for key in keys]
+
+    def __files(self, full):
+        """Returns the files written by a save with what is written to
+        them, and clears the pending changes
+
+        Args:
+            full (bool): If True every file, else only the shards holding
+                changed objects
+
+        Returns:
+            tuple: {path: pairs of the objects written to it} and True if
+            the paths are every shard
+        """
+        if not full:
+            layout = self.__layout()
+            changed = {layout.shard(key) for key in self.__pending}
+            self.__pending.clear()
+            return {layout.path(shard): self.__pairs(
+                key for key in self.__store(load=False).by_class.get(
+                    shard[0], {}) if layout.shard(key) == shard)
+                for shard in changed}, False
+        objects = self.__store()
+        self.__pending.clear()
+        if not self.__shards:
+            return {self.__file_path: self.__pairs(objects)}, False
+        layout = self.__layout()
+        shards = {}
+        for key in objects:
+            shards.setdefault(layout.path(layout.shard(key)), []).append(key)
+        return {path: self.__pairs(keys)
+                for path, keys in shards.items()}, True
+
+    def __submit(self, files, complete):
+        """Writes files, or hands them to the writer thread
+
+        Args:
+            files (dict): {path: pairs of the objects written to it}
+            complete (bool): True if files are every shard
+        """
+        if self.__writer is not None:
+            self.__writer.submit((files, complete))
+        else:
+            self.__write((files, complete))
+
+    @staticmethod
+    def __merge(old, new):
+        """Folds two snapshots waiting for the writer thread into one
+
+        Args:
+            old (tuple): The snapshot submitted first
+            new (tuple): The snapshot submitted next
+
+        Returns:
+            tuple: The files of both, the newest winning, and whether
+            they are every shard
+        """
+        return {**old[0], **new[0]}, old[1] or new[1]
+
+    def __write(self, snapshot):
+        """Replaces files with their objects, each through a synced
+        temporary file so a crash never leaves it truncated
+
+        Args:
+            snapshot (tuple): {path: pairs of the objects} and True if
+                the paths are every shard, in which case other shard
+                files are removed and the manifest is written
+        """
+        files, complete = snapshot
+        if self.__shards:
+            os.makedirs(self.__layout().directory, exist_ok=True)
+        for path, pairs in files.items():
+            if self.__format == "binary":
+                with atomic_write(path, "wb") as file:
+                    binary_snapshot.dump(pairs, file)
+            elif self.__format == "indexed":
+                with atomic_write(path, "wb") as file:
+                    indexed_snapshot.dump(pairs, file)
+            else:
+                with atomic_write(path) as file:
+                    file.write("{")
+                    file.writelines("{}{}: {}".format(", " if i else "",
+                                                      json.dumps(key), text)
+                                    for i, (key, text) in enumerate(pairs))
+                    file.write("}")
+        if complete:
+            layout = self.__layout()
+            layout.remove_stale(set(files))
+            layout.write_manifest()
+
+    def __load(self, key, obj):
+        """Turns the dictionary of an object read from a file into the
+        object, or into a RawRecord in lazy mode
+
+        Args:
+            key (str): Key of the object
+            obj (dict): Dictionary of the object
+
+        Returns:
+            The object or its RawRecord
+        """
+        cls = self.__all_classes[key.split(".")[0]]
+        if self.__lazy:
+            return RawRecord(cls, obj)
+        return cls.from_dict(obj)
+
+    def __log(self):
+        """Returns the journal kept next to the JSON file
+
+        Returns:
+            Journal: The journal of the JSON file
+        """
+        return Journal(self.__file_path + ".log")
+
+    def __append_pending(self):
+        """Appends a change record for every pending key to the log
+        """
+        objects = self.__store()
+        records = []
+        for key, operation in self.__pending.items():
+            obj = objects.get(key)
+            if operation == "set" and obj is not None:
+                records.append(["set", key, obj.to_dict()])
+            elif operation == "del":
+                records.append(["del", key])
+        self.__log().append(records)
+        self.__log_records += len(records)
+        self.__pending.clear()
+
+    def __replay(self):
+        """Applies the change records of the log to `__objects`
+        """
+        objects = self.__store()
+        self.__log_records = 0
+        for record in self.__log().replay():
+            self.__log_records += 1
+            if record[0] == "set":
+                objects[record[1]] = self.__load(record[1], record[2])
+            elif record[0] == "del":
+                objects.pop(record[1], None)
@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+"""Distances and bounding boxes on the surface of the Earth, used by
+the radius and bounding-box searches of the storage
+"""
+
+from math import asin, cos, degrees, isfinite, radians, sin, sqrt
+
+
+# Mean radius of the Earth, in kilometres
+EARTH_RADIUS_KM = 6371.0088
+
+
+def wrap_longitude(longitude):
+    """Brings a longitude into [-180, 180)
+
+    Args:
+        longitude (float): Longitude in degrees
+
+    Returns:
+        float: The same meridian in [-180, 180)
+    """
+    if -180.0 <= longitude < 180.0:
+        return longitude
+    return (longitude + 180.0) % 360.0 - 180.0
+
+
+def check_point(latitude, longitude):
+    """Validates the coordinates of a point
+
+    Args:
+        latitude (float): Latitude in degrees
+        longitude (float): Longitude in degrees
+
+    Raises:
+        ValueError: If the latitude is outside [-90, 90] or a coordinate
+            is not a finite number
+    """
+    if not -90.0 <= latitude <= 90.0:
+        raise ValueError("invalid latitude: {}".format(latitude))
+    if not isfinite(longitude):
+        raise ValueError("invalid longitude: {}".format(longitude))
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    """Returns the great-circle distance between two points, computed
+    with the haversine formula
+
+    Args:
+        latitude1 (float): Latitude of the first point, in degrees
+        longitude1 (float): Longitude of the first point, in degrees
+        latitude2 (float): Latitude of the second point, in degrees
+        longitude2 (float): Longitude of the second point, in degrees
+
+    Returns:
+        float: The distance in kilometres
+    """
+    phi1, phi2 = radians(latitude1), radians(latitude2)
+    half_phi = (phi2 - phi1) / 2
+    half_lambda = radians(longitude2 - longitude1) / 2
+    h = sin(half_phi) ** 2 + cos(phi1) * cos(phi2) * sin(half_lambda) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(h)))
+
+
+def split_box(south, west, north, east):
+    """Splits a bounding box crossing the antimeridian, Eg: from
+    west=170 to east=-170, into boxes that do not
+
+    Args:
+        south (float): Lowest latitude
+        west (float): Western longitude
+        north (float): Highest latitude
+        east (float): Eastern longitude
+
+    Returns:
+        list: (south, west, north, east) tuples with west <= east and
+        longitudes in [-180, 180]
+    """
+    if east - west >= 360.0:
+        return [(south, -180.0, north, 180.0)]
+    west, east = wrap_longitude(west), wrap_longitude(east)
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def boxes_around(latitude, longitude, radius_km):
+    """Returns the bounding boxes holding every point within a distance
+    of a point. Near the poles the box spans every longitude.
+
+    Args:
+        latitude (float): Latitude of the centre, in degrees
+        longitude (float): Longitude of the centre, in degrees
+        radius_km (float): The distance in kilometres
+
+    Returns:
+        list: (south, west, north, east) tuples, see split_box()
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - degrees(angle)
+    north = latitude + degrees(angle)
+    if south <= -90.0 or north >= 90.0:
+        # The circle covers a pole
+        return [(max(south, -90.0), -180.0, min(north, 90.0), 180.0)]
+    # Widest longitude difference reached by the circle
+    spread = degrees(asin(min(1.0, sin(angle) / cos(radians(latitude)))))
+    return split_box(south, longitude - spread, north, longitude + spread)
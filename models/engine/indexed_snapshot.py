@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+"""Indexed snapshot format of FileStorage, read through mmap so one
+object can be looked up without reading the others
+
+An indexed snapshot is laid out as:
+    HEADER: MAGIC, offset of the index, number of index slots
+    records: key length, data length, key, JSON of the object
+    index: (hash of the key, offset of the record) slots of an open
+        addressing hash table, with offset 0 marking an empty slot
+A lookup reads the header, the slots probed for the key and one record.
+"""
+
+import hashlib
+import mmap
+import struct
+
+
+# First bytes of an indexed snapshot, never found at the start of JSON
+MAGIC = b"\x89HBNI\n"
+
+HEADER = struct.Struct("<6sQQ")
+RECORD = struct.Struct("<II")
+SLOT = struct.Struct("<QQ")
+
+
+def key_hash(key):
+    """Returns the hash of a key stored in the index. Unlike hash(),
+    it is the same in every process.
+
+    Args:
+        key (bytes): The encoded key
+
+    Returns:
+        int: A 64-bit hash
+    """
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def dump(pairs, file):
+    """Writes objects as an indexed snapshot
+
+    Args:
+        pairs: (key, JSON of the object) pairs
+        file: A seekable file opened in binary mode
+    """
+    file.write(bytes(HEADER.size))
+    offset = HEADER.size
+    entries = []
+    for key, text in pairs:
+        key, data = key.encode("utf-8"), text.encode("utf-8")
+        file.write(RECORD.pack(len(key), len(data)))
+        file.write(key)
+        file.write(data)
+        entries.append((key_hash(key), offset))
+        offset += RECORD.size + len(key) + len(data)
+    # Keep the table at most half full so probes stay short
+    slots = 1
+    while slots < 2 * len(entries):
+        slots *= 2
+    table = [(0, 0)] * slots
+    for entry in entries:
+        slot = entry[0] % slots
+        while table[slot][1]:
+            slot = (slot + 1) % slots
+        table[slot] = entry
+    file.write(b"".join(SLOT.pack(*entry) for entry in table))
+    file.seek(0)
+    file.write(HEADER.pack(MAGIC, offset, slots))
+    file.seek(0, 2)
+
+
+def is_indexed(file):
+    """Tells whether a file holds an indexed snapshot, leaving the file
+    at its start
+
+    Args:
+        file: A seekable file opened in binary mode
+
+    Returns:
+        bool: True for an indexed snapshot, False for anything else
+    """
+    start = file.read(len(MAGIC))
+    file.seek(0)
+    return start == MAGIC
+
+
+class IndexedSnapshot:
+    """This class maps an indexed snapshot into memory and reads its
+    records on demand
+    """
+    def __init__(self, path):
+        """Initializes an IndexedSnapshot instance
+
+        Args:
+            path (str): Path to the snapshot
+
+        Raises:
+            ValueError: If the file is not a valid indexed snapshot
+        """
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise ValueError("not an indexed snapshot")
+        magic, self.index, self.slots = HEADER.unpack_from(self.map)
+        if magic != MAGIC or\
+                self.index + self.slots * SLOT.size > len(self.map):
+            self.close()
+            raise ValueError("not an indexed snapshot")
+
+    def get(self, key):
+        """Returns the JSON of one object
+
+        Args:
+            key (str): Key of the object
+
+        Returns:
+            str: The JSON of the object, or None if it is missing
+        """
+        key = key.encode("utf-8")
+        wanted = key_hash(key)
+        slot = wanted % self.slots
+        while True:
+            found, offset = SLOT.unpack_from(
+                self.map, self.index + slot * SLOT.size)
+            if not offset:
+                return None
+            if found == wanted:
+                record_key, data = self.record(offset)
+                if record_key == key:
+                    return data.decode("utf-8")
+            slot = (slot + 1) % self.slots
+
+    def record(self, offset):
+        """Reads the record at an offset
+
+        Args:
+            offset (int): Offset of the record
+
+        Returns:
+            tuple: The encoded key and the encoded JSON of the object
+        """
+        key_length, data_length = RECORD.unpack_from(self.map, offset)
+        start = offset + RECORD.size
+        return (self.map[start:start + key_length],
+                self.map[start + key_length:
+                         start + key_length + data_length])
+
+    def __iter__(self):
+        """Yields every object in the order they were written
+
+        Yields:
+            tuple: The key and the JSON of an object
+        """
+        offset = HEADER.size
+        while offset < self.index:
+            key, data = self.record(offset)
+            yield key.decode("utf-8"), data.decode("utf-8")
+            offset += RECORD.size + len(key) + len(data)
+
+    def close(self):
+        """Unmaps the snapshot
+        """
+        self.map.close()
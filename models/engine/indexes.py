@@ -0,0 +1,664 @@
+#!/usr/bin/python3
+"""Attribute indexes kept by the storage for fast queries
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import datetime
+from heapq import nlargest, nsmallest
+from math import floor, isnan, log
+from operator import itemgetter
+import re
+from models.engine import geo
+
+
+# Words of a text, as matched by tokenize()
+WORD = re.compile(r"\w+")
+
+# Words of a search, a trailing * asking for every word it starts
+SEARCH_TERM = re.compile(r"(\w+)(\*?)")
+
+
+def tokenize(text):
+    """Splits a text into lowercase words
+
+    Args:
+        text (str): The text
+
+    Returns:
+        list: The words in order, Eg: ["great", "view", "great", "food"]
+    """
+    return WORD.findall(text.lower())
+
+
+def normalize(value):
+    """Returns the value used to index and compare an attribute, so
+    that numbers given as strings (as the console's update command
+    stores them) compare equal to real numbers, and datetimes compare
+    equal to their ISO format (as stored in the JSON file)
+
+    Args:
+        value: Value of an attribute
+
+    Returns:
+        The value as a float if it is numeric, the ISO format of a
+        datetime, otherwise the value
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return value
+
+
+class HashIndex:
+    """This class maps the values of one attribute to the keys of the
+    objects holding them, for equality lookups
+    """
+    kind = "hash"
+
+    def __init__(self, attribute):
+        """Initializes a HashIndex instance
+
+        Args:
+            attribute (str): Name of the indexed attribute
+        """
+        self.attribute = attribute
+        # Eg: buckets = {value: {class.id: None}}
+        self.buckets = {}
+        # Eg: values = {class.id: value}
+        self.values = {}
+
+    def add(self, key, obj):
+        """Indexes an object, replacing its previous entry
+
+        Args:
+            key (str): Key of the object
+            obj: The object
+        """
+        self.discard(key)
+        value = normalize(getattr(obj, self.attribute, None))
+        try:
+            self.buckets.setdefault(value, {})[key] = None
+        except TypeError:
+            # Unhashable values such as lists are not indexed
+            return
+        self.values[key] = value
+
+    def discard(self, key):
+        """Removes the entry of an object if it has one
+
+        Args:
+            key (str): Key of the object
+        """
+        if key not in self.values:
+            return
+        value = self.values.pop(key)
+        bucket = self.buckets[value]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[value]
+
+    def build(self, pairs):
+        """Replaces every entry with the entries of some objects
+
+        Args:
+            pairs: (key, object) pairs
+        """
+        self.clear()
+        for key, obj in pairs:
+            self.add(key, obj)
+
+    def clear(self):
+        """Removes every entry
+        """
+        self.buckets.clear()
+        self.values.clear()
+
+    def lookup(self, value):
+        """Returns the keys of the objects whose attribute equals value
+
+        Args:
+            value: The value looked up
+
+        Returns:
+            list: Keys of the matching objects
+        """
+        try:
+            return list(self.buckets.get(normalize(value), ()))
+        except TypeError:
+            return []
+
+
+class SortedIndex:
+    """This class keeps the numeric values of one attribute in sorted
+    order, for equality and range lookups
+    """
+    kind = "sorted"
+
+    def __init__(self, attribute):
+        """Initializes a SortedIndex instance
+
+        Args:
+            attribute (str): Name of the indexed attribute
+        """
+        self.attribute = attribute
+        # Eg: entries = [(value, class.id), ...] in ascending order
+        self.entries = []
+        # Eg: values = {class.id: value}
+        self.values = {}
+
+    def add(self, key, obj):
+        """Indexes an object, replacing its previous entry. Objects
+        whose attribute is not numeric, or is NaN, Eg: "nan", are left
+        out.
+
+        Args:
+            key (str): Key of the object
+            obj: The object
+        """
+        self.discard(key)
+        value = normalize(getattr(obj, self.attribute, None))
+        # NaN compares with nothing, so it could not be found again
+        if not isinstance(value, float) or isnan(value):
+            return
+        insort(self.entries, (value, key))
+        self.values[key] = value
+
+    def discard(self, key):
+        """Removes the entry of an object if it has one
+
+        Args:
+            key (str): Key of the object
+        """
+        if key not in self.values:
+            return
+        entry = (self.values.pop(key), key)
+        del self.entries[bisect_left(self.entries, entry)]
+
+    def build(self, pairs):
+        """Replaces every entry with the entries of some objects,
+        sorting them once rather than inserting them one at a time
+
+        Args:
+            pairs: (key, object) pairs
+        """
+        self.clear()
+        values = self.values
+        attribute = self.attribute
+        for key, obj in pairs:
+            value = normalize(getattr(obj, attribute, None))
+            if isinstance(value, float) and not isnan(value):
+                values[key] = value
+        self.entries = sorted((value, key) for key, value in values.items())
+
+    def clear(self):
+        """Removes every entry
+        """
+        self.entries.clear()
+        self.values.clear()
+
+    def lookup(self, value):
+        """Returns the keys of the objects whose attribute equals value
+
+        Args:
+            value: The value looked up
+
+        Returns:
+            list: Keys of the matching objects
+        """
+        return self.range(value, value)
+
+    def range(self, low=None, high=None, low_inclusive=True,
+              high_inclusive=True):
+        """Returns the keys of the objects whose attribute lies between
+        two bounds, in ascending order of the attribute
+
+        Args:
+            low: Lower bound, or None for no lower bound
+            high: Upper bound, or None for no upper bound
+            low_inclusive (bool): True if low itself matches
+            high_inclusive (bool): True if high itself matches
+
+        Returns:
+            list: Keys of the matching objects
+        """
+        return list(self.scan(low, high, low_inclusive, high_inclusive))
+
+    def scan(self, low=None, high=None, low_inclusive=True,
+             high_inclusive=True, reverse=False):
+        """Yields the keys of the objects whose attribute lies between
+        two bounds one at a time, so a reader can stop early
+
+        Args:
+            low: Lower bound, or None for no lower bound
+            high: Upper bound, or None for no upper bound
+            low_inclusive (bool): True if low itself matches
+            high_inclusive (bool): True if high itself matches
+            reverse (bool): True for descending order of the attribute
+
+        Yields:
+            str: Keys of the matching objects, in ascending order of the
+            attribute, ties by key, or the reverse
+        """
+        value_of = itemgetter(0)
+        start, end = 0, len(self.entries)
+        if low is not None:
+            find = bisect_left if low_inclusive else bisect_right
+            start = find(self.entries, normalize(low), key=value_of)
+        if high is not None:
+            find = bisect_right if high_inclusive else bisect_left
+            end = find(self.entries, normalize(high), key=value_of)
+        positions = range(start, end)
+        for position in reversed(positions) if reverse else positions:
+            yield self.entries[position][1]
+
+
+class GridIndex:
+    """This class keeps the positions given by a latitude and a longitude
+    attribute in the cells of a grid of degrees, for radius and
+    bounding-box lookups that only read the cells they cover. It is
+    declared on the two attributes separated by a comma, Eg:
+    "latitude,longitude".
+    """
+    kind = "grid"
+
+    def __init__(self, attribute, cell_degrees=0.5):
+        """Initializes a GridIndex instance
+
+        Args:
+            attribute (str): Names of the latitude and longitude
+                attributes, Eg: "latitude,longitude"
+            cell_degrees (float): Size of the cells, in degrees
+
+        Raises:
+            ValueError: If attribute does not name two attributes
+        """
+        names = [name.strip() for name in attribute.split(",")]
+        if len(names) != 2 or not all(names):
+            raise ValueError("invalid grid attributes: {}".format(attribute))
+        self.attribute = attribute
+        self.latitude, self.longitude = names
+        self.cell_degrees = cell_degrees
+        # Eg: cells = {(row, column): {class.id: (latitude, longitude)}}
+        self.cells = {}
+        # Eg: values = {class.id: (latitude, longitude)}
+        self.values = {}
+
+    def cell(self, latitude, longitude):
+        """Returns the cell holding a position
+
+        Args:
+            latitude (float): Latitude in degrees
+            longitude (float): Longitude in [-180, 180)
+
+        Returns:
+            tuple: The row and column of the cell
+        """
+        return (floor(latitude / self.cell_degrees),
+                floor(longitude / self.cell_degrees))
+
+    def add(self, key, obj):
+        """Indexes an object, replacing its previous entry. Objects
+        without a valid numeric position are left out.
+
+        Args:
+            key (str): Key of the object
+            obj: The object
+        """
+        self.discard(key)
+        latitude = normalize(getattr(obj, self.latitude, None))
+        longitude = normalize(getattr(obj, self.longitude, None))
+        if not isinstance(latitude, float) or\
+                not isinstance(longitude, float):
+            return
+        try:
+            geo.check_point(latitude, longitude)
+        except ValueError:
+            return
+        position = (latitude, geo.wrap_longitude(longitude))
+        self.cells.setdefault(self.cell(*position), {})[key] = position
+        self.values[key] = position
+
+    def discard(self, key):
+        """Removes the entry of an object if it has one
+
+        Args:
+            key (str): Key of the object
+        """
+        if key not in self.values:
+            return
+        cell = self.cell(*self.values.pop(key))
+        bucket = self.cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self.cells[cell]
+
+    def build(self, pairs):
+        """Replaces every entry with the entries of some objects
+
+        Args:
+            pairs: (key, object) pairs
+        """
+        self.clear()
+        for key, obj in pairs:
+            self.add(key, obj)
+
+    def clear(self):
+        """Removes every entry
+        """
+        self.cells.clear()
+        self.values.clear()
+
+    def lookup(self, value):
+        """Returns the keys of the objects at a position
+
+        Args:
+            value (tuple): The latitude and longitude looked up
+
+        Returns:
+            list: Keys of the matching objects
+        """
+        latitude, longitude = value
+        return self.within(latitude, longitude, latitude, longitude)
+
+    def within(self, south, west, north, east):
+        """Returns the keys of the objects inside a bounding box, bounds
+        included. A box whose west is greater than its east crosses the
+        antimeridian.
+
+        Args:
+            south (float): Lowest latitude
+            west (float): Western longitude
+            north (float): Highest latitude
+            east (float): Eastern longitude
+
+        Returns:
+            list: Keys of the matching objects
+        """
+        return [key for key, _ in self.positions(south, west, north, east)]
+
+    def near(self, latitude, longitude, radius_km, limit=None):
+        """Returns the keys of the objects within a distance of a point,
+        nearest first
+
+        Args:
+            latitude (float): Latitude of the point
+            longitude (float): Longitude of the point
+            radius_km (float): The distance in kilometres
+            limit (int): Only return this many of the nearest objects
+
+        Returns:
+            list: (distance in kilometres, key) tuples, nearest first
+        """
+        found = []
+        distance_km = geo.distance_km
+        for box in geo.boxes_around(latitude, longitude, radius_km):
+            for key, position in self.positions(*box):
+                distance = distance_km(latitude, longitude, *position)
+                if distance <= radius_km:
+                    found.append((distance, key))
+        if limit is not None:
+            return nsmallest(limit, found)
+        found.sort()
+        return found
+
+    def positions(self, south, west, north, east):
+        """Yields the objects inside a bounding box with their position
+
+        Args:
+            south (float): Lowest latitude
+            west (float): Western longitude
+            north (float): Highest latitude
+            east (float): Eastern longitude
+
+        Yields:
+            tuple: The key of an object and its (latitude, longitude)
+        """
+        size = self.cell_degrees
+        for south, west, north, east in geo.split_box(south, west, north,
+                                                      east):
+            (low_row, low_column) = self.cell(south, west)
+            (high_row, high_column) = self.cell(north, east)
+            area = (high_row - low_row + 1) * (high_column - low_column + 1)
+            # Large boxes read the occupied cells rather than every cell
+            if area > len(self.cells):
+                cells = [cell for cell in self.cells
+                         if low_row <= cell[0] <= high_row and
+                         low_column <= cell[1] <= high_column]
+            else:
+                cells = [(row, column)
+                         for row in range(low_row, high_row + 1)
+                         for column in range(low_column, high_column + 1)]
+            for row, column in cells:
+                bucket = self.cells.get((row, column))
+                if not bucket:
+                    continue
+                # Cells inside the box need no check of their objects
+                if south <= row * size and (row + 1) * size <= north and\
+                        west <= column * size and\
+                        (column + 1) * size <= east:
+                    yield from bucket.items()
+                    continue
+                for key, (latitude, longitude) in bucket.items():
+                    if south <= latitude <= north and\
+                            west <= longitude <= east:
+                        yield key, (latitude, longitude)
+
+
+class TextIndex:
+    """This class is an inverted index of the words of one or more text
+    attributes, for ranked full-text searches. It is declared on the
+    attributes separated by commas, Eg: "name,description". Searches
+    match the objects holding every word, or a word starting with a
+    term ending with *, and rank them with BM25.
+    """
+    kind = "text"
+
+    # BM25 parameters: saturation of repeated words and weight of the
+    # length of the text
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, attribute):
+        """Initializes a TextIndex instance
+
+        Args:
+            attribute (str): Names of the indexed attributes,
+                Eg: "name,description"
+
+        Raises:
+            ValueError: If attribute names no attribute
+        """
+        names = [name.strip() for name in attribute.split(",")]
+        if not all(names):
+            raise ValueError("invalid text attributes: {}".format(attribute))
+        self.attribute = attribute
+        self.attributes = names
+        # Eg: postings = {word: {class.id: occurrences}}
+        self.postings = {}
+        # Eg: values = {class.id: {word: occurrences}}
+        self.values = {}
+        # Eg: lengths = {class.id: number of words}
+        self.lengths = {}
+        # Number of words of all the objects
+        self.total = 0
+        # Sorted words for prefix terms, made again after words change
+        self.vocabulary = None
+
+    def add(self, key, obj):
+        """Indexes an object, replacing its previous entry. Attributes
+        that are not strings are left out.
+
+        Args:
+            key (str): Key of the object
+            obj: The object
+        """
+        self.discard(key)
+        words = []
+        for name in self.attributes:
+            value = getattr(obj, name, None)
+            if isinstance(value, str):
+                words.extend(tokenize(value))
+        if not words:
+            return
+        counts = Counter(words)
+        postings = self.postings
+        for word, occurrences in counts.items():
+            try:
+                postings[word][key] = occurrences
+            except KeyError:
+                postings[word] = {key: occurrences}
+                self.vocabulary = None
+        self.values[key] = counts
+        self.lengths[key] = len(words)
+        self.total += len(words)
+
+    def discard(self, key):
+        """Removes the entry of an object if it has one
+
+        Args:
+            key (str): Key of the object
+        """
+        if key not in self.values:
+            return
+        for word in self.values.pop(key):
+            posting = self.postings[word]
+            del posting[key]
+            if not posting:
+                del self.postings[word]
+                self.vocabulary = None
+        self.total -= self.lengths.pop(key)
+
+    def build(self, pairs):
+        """Replaces every entry with the entries of some objects
+
+        Args:
+            pairs: (key, object) pairs
+        """
+        self.clear()
+        for key, obj in pairs:
+            self.add(key, obj)
+
+    def clear(self):
+        """Removes every entry
+        """
+        self.postings.clear()
+        self.values.clear()
+        self.lengths.clear()
+        self.total = 0
+        self.vocabulary = None
+
+    def lookup(self, value):
+        """Returns the keys of the objects holding every word of a text
+
+        Args:
+            value (str): The text looked up
+
+        Returns:
+            list: Keys of the matching objects
+        """
+        return [key for _, key in self.search(str(value))]
+
+    def expand(self, prefix):
+        """Returns the indexed words starting with a prefix
+
+        Args:
+            prefix (str): The prefix, in lowercase
+
+        Returns:
+            list: The words
+        """
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        start = bisect_left(self.vocabulary, prefix)
+        words = []
+        for word in self.vocabulary[start:]:
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+        return words
+
+    def search(self, text, limit=None):
+        """Returns the keys of the objects holding every term of a
+        search, best match first. A term ending with *, Eg: "pool*",
+        matches every word it starts.
+
+        Args:
+            text (str): The search, Eg: "quiet pool*"
+            limit (int): Only return this many of the best matches
+
+        Returns:
+            list: (score, key) tuples, best match first
+        """
+        groups = []
+        for word, star in SEARCH_TERM.findall(text.lower()):
+            words = self.expand(word) if star else [word]
+            groups.append([word for word in words if word in self.postings])
+        if not groups or not all(groups):
+            return []
+        # Start from the term matching the fewest objects
+        groups.sort(key=lambda words: sum(len(self.postings[word])
+                                          for word in words))
+        keys = set()
+        for word in groups[0]:
+            keys.update(self.postings[word])
+        for words in groups[1:]:
+            keys = {key for word in words
+                    for key, _ in self.__matches(word, keys)}
+            if not keys:
+                return []
+        count = len(self.values)
+        average = self.total / count
+        scores = dict.fromkeys(keys, 0.0)
+        for words in groups:
+            for word in words:
+                frequency = len(self.postings[word])
+                rarity = log(1 + (count - frequency + 0.5) /
+                             (frequency + 0.5))
+                for key, occurrences in self.__matches(word, keys):
+                    norm = self.k1 * (1 - self.b + self.b *
+                                      self.lengths[key] / average)
+                    scores[key] += rarity * occurrences * (self.k1 + 1) /\
+                        (occurrences + norm)
+        ranked = ((score, key) for key, score in scores.items())
+        if limit is not None:
+            return nlargest(limit, ranked, key=itemgetter(0))
+        return sorted(ranked, key=itemgetter(0), reverse=True)
+
+    def __matches(self, word, keys):
+        """Yields the objects among keys holding a word, reading the
+        smaller of the two
+
+        Args:
+            word (str): An indexed word
+            keys (set): Keys of the objects
+
+        Yields:
+            tuple: The key of an object and the occurrences of the word
+        """
+        posting = self.postings[word]
+        if len(posting) < len(keys):
+            for key, occurrences in posting.items():
+                if key in keys:
+                    yield key, occurrences
+        else:
+            for key in keys:
+                if key in posting:
+                    yield key, posting[key]
+
+
+# Index classes by the kind name used to declare them
+INDEX_KINDS = {
+    "hash": HashIndex,
+    "sorted": SortedIndex,
+    "grid": GridIndex,
+    "text": TextIndex,
+}
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""Journal class, an append-only log of storage changes
+"""
+
+import json
+import os
+
+
+class Journal:
+    """This class appends change records to a log file kept next to
+    the JSON snapshot and replays them when the storage is reloaded
+
+    Each line of the log is a JSON list holding one change record:
+        ["set", "<class name>.<id>", {<dictionary of the object>}]
+        ["del", "<class name>.<id>"]
+    """
+    def __init__(self, path):
+        """Initializes a Journal instance
+
+        Args:
+            path (str): Path to the log file
+        """
+        self.path = path
+
+    def append(self, records):
+        """Appends change records to the end of the log file, on a new
+        line even if the last one was left without its newline
+
+        Args:
+            records (list): A list of change records
+        """
+        # Nothing to write
+        if not records:
+            return
+        # Encode each record on its own line
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        with open(self.path, "a+b") as file:
+            if file.tell():
+                # Writes still go to the end of the file
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    lines = "\n" + lines
+            file.write(lines.encode("utf-8"))
+
+    def replay(self):
+        """Reads the change records from the log file in the order
+        they were written. A torn line (left behind by a crash in the
+        middle of an append) ends the replay, and the log is truncated
+        to the records before it, so the records appended next are
+        read by the following replay.
+
+        Yields:
+            list: A change record
+        """
+        try:
+            with open(self.path, "rb") as file:
+                # Offset of the end of the last complete record
+                end = 0
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        break
+                    end += len(line)
+                    yield record
+                else:
+                    return
+        except (FileNotFoundError, PermissionError):
+            return
+        try:
+            os.truncate(self.path, end)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Removes the log file once its records have been folded into
+        a new snapshot
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+"""Incremental reading of the top-level pairs of a JSON object
+"""
+
+import json
+
+
+# Characters JSON allows between tokens
+WHITESPACE = " \t\n\r"
+
+
+class JSONObjectStream:
+    """This class reads a file holding one JSON object, Eg:
+    {"<class name>.<id>": {...}, ...}, and yields its pairs one at a
+    time, so only a chunk of the text is held in memory at once
+    """
+    def __init__(self, file, chunk_size=65536):
+        """Initializes a JSONObjectStream instance
+
+        Args:
+            file: A file opened in text mode
+            chunk_size (int): Number of characters read at a time
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def __iter__(self):
+        """Yields the pairs of the JSON object in file order
+
+        Raises:
+            json.JSONDecodeError: If the text is not a JSON object
+
+        Yields:
+            tuple: The key and the decoded value of a pair
+        """
+        self.expect("{")
+        closed = self.peek() == "}"
+        while not closed:
+            key = self.decode()
+            if not isinstance(key, str):
+                self.fail("Expecting property name enclosed in double quotes")
+            self.expect(":")
+            yield key, self.decode()
+            closed = self.peek() == "}"
+            if not closed:
+                self.expect(",")
+        self.pos += 1
+        # Nothing but whitespace may follow the object
+        if self.peek():
+            self.fail("Extra data")
+
+    def read(self):
+        """Appends the next chunk of the file to the buffer
+
+        Returns:
+            bool: False if the end of the file was reached
+        """
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop the characters already parsed
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skips whitespace and returns the next character
+
+        Returns:
+            str: The next character, or "" at the end of the file
+        """
+        while True:
+            while self.pos < len(self.buffer) and\
+                    self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.read():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        """Consumes the next character, which must be char
+
+        Args:
+            char (str): The expected character
+
+        Raises:
+            json.JSONDecodeError: If another character comes next
+        """
+        if self.peek() != char:
+            self.fail("Expecting '{}' delimiter".format(char))
+        self.pos += 1
+
+    def decode(self):
+        """Decodes the next JSON value, reading more of the file until
+        the value is complete
+
+        Raises:
+            json.JSONDecodeError: If the value is invalid
+
+        Returns:
+            The decoded value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value may continue in the next chunk
+                if self.read():
+                    continue
+                raise
+            # A number may continue in the next chunk
+            if end == len(self.buffer) and self.read():
+                continue
+            self.pos = end
+            return value
+
+    def fail(self, message):
+        """Raises a decoding error at the current position
+
+        Args:
+            message (str): Description of the error
+
+        Raises:
+            json.JSONDecodeError: Always
+        """
+        raise json.JSONDecodeError(message, self.buffer, self.pos)
@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+"""FileLock class, the advisory lock of a file shared by several
+processes, and the generation telling them the file changed
+"""
+
+import os
+import struct
+try:
+    import fcntl
+except ImportError:
+    # Systems without fcntl, Eg: Windows, run without locking
+    fcntl = None
+
+
+# Counter of the writes made under the lock, kept in the lock file
+COUNTER = struct.Struct("<Q")
+
+
+class FileLock:
+    """This class holds an exclusive fcntl.flock() lock on a lock file,
+    Eg: file.json.lock next to file.json. Processes writing the file
+    take the lock and bump the counter it holds once the file is
+    replaced, so other processes can tell the file changed even when
+    its mtime, whose resolution may be several milliseconds, did not.
+
+    Usage example:
+        with FileLock("file.json.lock") as lock:
+            ...
+            lock.bump()
+    """
+    def __init__(self, path):
+        """Initializes a FileLock instance
+
+        Args:
+            path (str): Path to the lock file, created if missing
+        """
+        self.path = path
+        # Descriptor of the lock file while the lock is held
+        self.fd = None
+
+    def __enter__(self):
+        """Waits for the lock and takes it
+
+        Returns:
+            FileLock: The lock
+        """
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(self.fd)
+                self.fd = None
+                raise
+        return self
+
+    def __exit__(self, *exc_info):
+        """Releases the lock
+
+        Args:
+            exc_info: The exception raised in the block, if any
+        """
+        # Closing the descriptor releases the lock
+        os.close(self.fd)
+        self.fd = None
+
+    def counter(self):
+        """Returns the number of writes made under the lock
+
+        Returns:
+            int: The counter, 0 if the lock file is missing or new
+        """
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read(COUNTER.size)
+        except FileNotFoundError:
+            return 0
+        return COUNTER.unpack(data)[0] if len(data) == COUNTER.size else 0
+
+    def bump(self):
+        """Records a write. Called while the lock is held.
+        """
+        data = os.pread(self.fd, COUNTER.size, 0)
+        count = COUNTER.unpack(data)[0] if len(data) == COUNTER.size else 0
+        os.pwrite(self.fd, COUNTER.pack(count + 1), 0)
+
+
+def generation(path):
+    """Returns the generation of a file written under FileLock(path +
+    ".lock"): the counter of the lock, then the inode, mtime and size of
+    the file, so writes made without the lock are noticed as well.
+    Read the generation before the file, so a write in between is
+    noticed again by the next check rather than missed.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        tuple: A value that changes every time the file is replaced
+    """
+    counter = FileLock(path + ".lock").counter()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return counter, None
+    return counter, stat.st_ino, stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,396 @@
+#!/usr/bin/python3
+"""ObjectStore class, the dictionary holding the objects of a storage
+"""
+
+from datetime import datetime
+import json
+
+
+class RawRecord(dict):
+    """The dictionary of an object read from a file whose instance has
+    not been built yet. Its keys can also be read as attributes, falling
+    back to the attributes of its class, so indexes and queries can use
+    it without building the instance.
+    """
+    __slots__ = ("cls",)
+
+    def __init__(self, cls, data):
+        """Initializes a RawRecord instance
+
+        Args:
+            cls (type): Class of the object
+            data (dict): Dictionary of the object, as made by to_dict()
+        """
+        super().__init__(data)
+        self.cls = cls
+
+    def __getattr__(self, name):
+        """Returns a value of the record as an attribute
+
+        Args:
+            name (str): Name of the attribute
+
+        Raises:
+            AttributeError: If neither the record nor its class has it
+
+        Returns:
+            The value of the attribute
+        """
+        try:
+            return self[name]
+        except KeyError:
+            return getattr(self.cls, name)
+
+    def build(self):
+        """Builds the instance of the record
+
+        Returns:
+            BaseModel: The instance
+        """
+        return self.cls.from_dict(self)
+
+
+class ObjectStore(dict):
+    """A dictionary of {<class name>.<id>: object} that also keeps the
+    objects grouped by class name, so the objects of one class can be
+    listed or counted without scanning the others, and keeps the
+    attribute indexes of each class up to date
+
+    Values may be RawRecord instances, which are turned into objects the
+    first time they are read. The JSON of each object is cached once
+    encoded, until the object is replaced, removed or refreshed.
+    """
+    def __init__(self, *args, **kwargs):
+        """Initializes an ObjectStore instance
+
+        Args:
+            args: Positional arguments accepted by dict
+            kwargs: Keyword arguments accepted by dict
+        """
+        super().__init__()
+        # Keys of each class in insertion order,
+        # Eg: by_class = {class name: {class.id: None}}
+        self.by_class = {}
+        # Eg: indexes = {class name: {attribute: index}}
+        self.indexes = {}
+        # Number of values that are still RawRecord instances
+        self.unbuilt = 0
+        # Eg: fragments = {class.id: JSON text of the object}
+        self.fragments = {}
+        # Copy of the dictionary made by snapshot(), until it changes
+        self.view = None
+        self.update(*args, **kwargs)
+
+    @staticmethod
+    def class_name(key):
+        """Returns the class name part of a key
+
+        Args:
+            key (str): A key of the form <class name>.<id>
+
+        Returns:
+            str: The class name
+        """
+        return key.split(".", 1)[0]
+
+    def __getitem__(self, key):
+        """Returns an object, building it first if it is a RawRecord
+
+        Args:
+            key (str): Key of the object
+
+        Returns:
+            The object
+        """
+        obj = super().__getitem__(key)
+        if type(obj) is RawRecord:
+            obj = obj.build()
+            super().__setitem__(key, obj)
+            self.unbuilt -= 1
+        return obj
+
+    def __setitem__(self, key, obj):
+        """Adds or replaces an object
+
+        Args:
+            key (str): Key of the object
+            obj: The object or a RawRecord
+        """
+        if type(super().get(key)) is RawRecord:
+            self.unbuilt -= 1
+        if type(obj) is RawRecord:
+            self.unbuilt += 1
+        super().__setitem__(key, obj)
+        self.fragments.pop(key, None)
+        self.view = None
+        name = self.class_name(key)
+        self.by_class.setdefault(name, {})[key] = None
+        for index in self.indexes.get(name, {}).values():
+            index.add(key, obj)
+
+    def __delitem__(self, key):
+        """Removes an object
+
+        Args:
+            key (str): Key of the object
+        """
+        if type(super().get(key)) is RawRecord:
+            self.unbuilt -= 1
+        super().__delitem__(key)
+        self.fragments.pop(key, None)
+        self.view = None
+        name = self.class_name(key)
+        group = self.by_class[name]
+        del group[key]
+        for index in self.indexes.get(name, {}).values():
+            index.discard(key)
+        # Drop classes without objects
+        if not group:
+            del self.by_class[name]
+
+    def __eq__(self, other):
+        """Compares the objects with those of another dictionary
+
+        Args:
+            other: The other dictionary
+
+        Returns:
+            bool: True if both hold the same objects
+        """
+        self.build_all()
+        return super().__eq__(other)
+
+    def __repr__(self):
+        """Returns the representation of the dictionary of objects
+
+        Returns:
+            str: The representation
+        """
+        self.build_all()
+        return super().__repr__()
+
+    def get(self, key, default=None):
+        """Returns an object, or default if the key is missing
+
+        Args:
+            key (str): Key of the object
+            default: Value returned if the key is missing
+
+        Returns:
+            The object or the default value
+        """
+        return self[key] if key in self else default
+
+    def peek(self, key):
+        """Returns an object without building it if it is a RawRecord
+
+        Args:
+            key (str): Key of the object
+
+        Returns:
+            The object or its RawRecord
+        """
+        return super().__getitem__(key)
+
+    def values(self):
+        """Returns a view of all objects
+
+        Returns:
+            dict_values: The objects
+        """
+        self.build_all()
+        return super().values()
+
+    def items(self):
+        """Returns a view of all (key, object) pairs
+
+        Returns:
+            dict_items: The pairs
+        """
+        self.build_all()
+        return super().items()
+
+    def copy(self):
+        """Returns a plain dictionary of all objects
+
+        Returns:
+            dict: A dictionary of {<class name>.<id>: object}
+        """
+        self.build_all()
+        return dict(super().items())
+
+    def pop(self, key, *default):
+        """Removes an object and returns it
+
+        Args:
+            key (str): Key of the object
+            default: Value returned if the key is missing
+
+        Returns:
+            The removed object or the default value
+        """
+        if key in self:
+            obj = self[key]
+            del self[key]
+            return obj
+        return super().pop(key, *default)
+
+    def popitem(self):
+        """Removes the last added object and returns it with its key
+
+        Raises:
+            KeyError: If there are no objects
+
+        Returns:
+            tuple: The key and the object
+        """
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        """Returns the object of a key, adding default if it is missing
+
+        Args:
+            key (str): Key of the object
+            default: Object added if the key is missing
+
+        Returns:
+            The object of the key
+        """
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        """Adds or replaces the objects of a mapping or an iterable of
+        (key, object) pairs
+
+        Args:
+            args: A mapping or an iterable of pairs
+            kwargs: More objects keyed by name
+        """
+        for key, obj in dict(*args, **kwargs).items():
+            self[key] = obj
+
+    def clear(self):
+        """Removes every object
+        """
+        super().clear()
+        self.by_class.clear()
+        self.fragments.clear()
+        self.view = None
+        self.unbuilt = 0
+        for indexes in self.indexes.values():
+            for index in indexes.values():
+                index.clear()
+
+    def snapshot(self):
+        """Returns a plain dictionary of all objects, copied again only
+        after objects were added, replaced or removed, so it can be
+        shared and iterated while the store changes
+
+        Returns:
+            dict: A dictionary of {<class name>.<id>: object}, which must
+            not be changed
+        """
+        if self.view is None:
+            self.view = self.copy()
+        return self.view
+
+    def build_all(self):
+        """Builds the objects of all RawRecord instances
+        """
+        if not self.unbuilt:
+            return
+        for key in self:
+            self[key]
+
+    def records(self):
+        """Yields the dictionary of every object, reusing the RawRecord
+        of objects that were never built
+
+        Yields:
+            tuple: The key and the dictionary of an object
+        """
+        for key in self:
+            yield key, self.record(key)
+
+    def record(self, key):
+        """Returns the dictionary of an object, reusing its RawRecord if
+        it was never built
+
+        Args:
+            key (str): Key of the object
+
+        Returns:
+            dict: The dictionary of the object
+        """
+        obj = super().__getitem__(key)
+        return obj if type(obj) is RawRecord else obj.to_dict()
+
+    def fragment(self, key):
+        """Returns the JSON text of an object, encoding it only if it
+        changed since it was last encoded
+
+        Args:
+            key (str): Key of the object
+
+        Returns:
+            str: The JSON of the dictionary of the object
+        """
+        text = self.fragments.get(key)
+        if text is None:
+            data = self.record(key)
+            # Records of binary snapshots hold datetime instances
+            text = self.fragments[key] = json.dumps(
+                data, default=datetime.isoformat)
+        return text
+
+    def add_index(self, name, index):
+        """Adds an attribute index to a class and indexes the objects
+        the class already has
+
+        Args:
+            name (str): Name of the class
+            index: A HashIndex, SortedIndex or GridIndex
+        """
+        self.indexes.setdefault(name, {})[index.attribute] = index
+        index.build((key, self.peek(key))
+                    for key in self.by_class.get(name, {}))
+
+    def refresh(self, key):
+        """Re-indexes an object after its attributes changed and drops
+        its cached JSON
+
+        Args:
+            key (str): Key of the object
+        """
+        if key not in self:
+            return
+        self.fragments.pop(key, None)
+        for index in self.indexes.get(self.class_name(key), {}).values():
+            index.add(key, self.peek(key))
+
+    def of_class(self, name):
+        """Returns the objects of a class
+
+        Args:
+            name (str): Name of the class
+
+        Returns:
+            dict: A dictionary of {<class name>.<id>: object}
+        """
+        return {key: self[key] for key in self.by_class.get(name, {})}
+
+    def count(self, name):
+        """Counts the objects of a class
+
+        Args:
+            name (str): Name of the class
+
+        Returns:
+            int: Number of objects of the class
+        """
+        return len(self.by_class.get(name, {}))
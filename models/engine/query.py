@@ -0,0 +1,312 @@
+#!/usr/bin/python3
+"""Equality and range queries over the objects of a storage
+"""
+
+from heapq import nlargest, nsmallest
+from itertools import islice
+from math import isnan
+from models.engine.indexes import SortedIndex, TextIndex, normalize
+
+
+# Comparison operators accepted as suffixes of predicate names,
+# Eg: price_by_night__ge=100
+OPERATORS = {
+    "eq": lambda left, right: left == right,
+    "ne": lambda left, right: left != right,
+    "lt": lambda left, right: left < right,
+    "le": lambda left, right: left <= right,
+    "gt": lambda left, right: left > right,
+    "ge": lambda left, right: left >= right,
+}
+
+
+def parse_predicates(predicates):
+    """Splits predicate names into attribute and operator
+
+    Args:
+        predicates (dict): Eg: {"city_id": "1234", "max_guest__gt": 2}
+
+    Raises:
+        ValueError: If a predicate name ends with an unknown operator
+
+    Returns:
+        list: A list of (attribute, operator, value) tuples
+    """
+    parsed = []
+    for name, value in predicates.items():
+        attribute, _, operator = name.rpartition("__")
+        if not attribute:
+            attribute, operator = name, "eq"
+        if operator not in OPERATORS:
+            raise ValueError("unknown operator: {}".format(name))
+        parsed.append((attribute, operator, value))
+    return parsed
+
+
+def matches(obj, attribute, operator, value):
+    """Checks whether an object satisfies one predicate
+
+    Args:
+        obj: The object
+        attribute (str): Name of the attribute compared
+        operator (str): One of the OPERATORS
+        value: The value compared against
+
+    Returns:
+        bool: True if the predicate holds for the object
+    """
+    left = normalize(getattr(obj, attribute, None))
+    try:
+        return OPERATORS[operator](left, normalize(value))
+    except TypeError:
+        # Values of different types never match
+        return False
+
+
+def candidate_keys(indexes, predicates):
+    """Uses the indexes to narrow down the keys that can match
+
+    Args:
+        indexes (dict): Indexes of the class, {attribute: index}
+        predicates (list): (attribute, operator, value) tuples
+
+    Returns:
+        list: Keys of the candidate objects, or None if no index helps
+    """
+    best = None
+    for attribute, operator, value in predicates:
+        index = indexes.get(attribute)
+        # Text indexes match words, not whole values
+        if index is None or operator == "ne" or\
+                isinstance(index, TextIndex):
+            continue
+        if isinstance(index, SortedIndex):
+            # Sorted indexes only hold numbers other than NaN
+            value = normalize(value)
+            if not isinstance(value, float) or isnan(value):
+                continue
+            keys = index.range(**range_bounds(attribute, predicates))
+        elif operator == "eq":
+            keys = index.lookup(value)
+        else:
+            continue
+        # Keep the smallest candidate list
+        if best is None or len(keys) < len(best):
+            best = keys
+    return best
+
+
+def range_bounds(attribute, predicates):
+    """Combines the numeric predicates on one attribute into the
+    tightest range
+
+    Args:
+        attribute (str): Name of the attribute
+        predicates (list): (attribute, operator, value) tuples
+
+    Returns:
+        dict: Keyword arguments for SortedIndex.range()
+    """
+    bounds = {"low": None, "high": None,
+              "low_inclusive": True, "high_inclusive": True}
+    for name, operator, value in predicates:
+        value = normalize(value)
+        # NaN bounds match nothing, matches() rejects their objects
+        if name != attribute or not isinstance(value, float) or\
+                isnan(value):
+            continue
+        if operator in ("eq", "ge", "gt"):
+            inclusive = operator != "gt"
+            if bounds["low"] is None or value > bounds["low"] or\
+                    (value == bounds["low"] and not inclusive):
+                bounds["low"], bounds["low_inclusive"] = value, inclusive
+        if operator in ("eq", "le", "lt"):
+            inclusive = operator != "lt"
+            if bounds["high"] is None or value < bounds["high"] or\
+                    (value == bounds["high"] and not inclusive):
+                bounds["high"], bounds["high_inclusive"] = value, inclusive
+    return bounds
+
+
+def select(store, class_name, predicates):
+    """Returns the objects of a class satisfying every predicate
+
+    Args:
+        store (ObjectStore): The objects of the storage
+        class_name (str): Name of the class
+        predicates (dict): Eg: {"city_id": "1234", "max_guest__gt": 2}
+
+    Raises:
+        ValueError: If a predicate name ends with an unknown operator
+
+    Returns:
+        dict: A dictionary of {<class name>.<id>: object}
+    """
+    parsed = parse_predicates(predicates)
+    keys = candidate_keys(store.indexes.get(class_name, {}), parsed)
+    # Without a usable index, scan the objects of the class only
+    if keys is None:
+        keys = store.by_class.get(class_name, {})
+    result = {}
+    for key in keys:
+        # Objects not built yet are matched on their RawRecord
+        obj = store.peek(key)
+        if all(matches(obj, *predicate) for predicate in parsed):
+            result[key] = store[key]
+    return result
+
+
+def parse_order(order_by):
+    """Splits an ordering into attribute and direction
+
+    Args:
+        order_by (str): Eg: "price_by_night", or "-price_by_night" for
+            descending order, or None
+
+    Returns:
+        tuple: The attribute, or None, and True if descending
+    """
+    if not order_by:
+        return None, False
+    if order_by.startswith("-"):
+        return order_by[1:], True
+    return order_by, False
+
+
+def sort_key(obj, attribute):
+    """Returns the value ordering objects by an attribute: numbers
+    first, then strings, then the other values, NaN included, by their
+    text
+
+    Args:
+        obj: The object
+        attribute (str): Name of the attribute
+
+    Returns:
+        tuple: A rank and a value of that rank
+    """
+    value = normalize(getattr(obj, attribute, None))
+    if isinstance(value, float) and not isnan(value):
+        return 0, value
+    if isinstance(value, str):
+        return 1, value
+    return 2, str(value)
+
+
+def plan(indexes, predicates, order=None, window=None, total=0):
+    """Chooses how to read the objects of a class for a page. When both
+    an index of the predicates and the sorted index of the ordering
+    attribute apply, reading k candidates is compared with reading the
+    objects in order until the page is full, about window * total / k
+    objects if the candidates are spread evenly in the order.
+
+    Args:
+        indexes (dict): Indexes of the class, {attribute: index}
+        predicates (list): (attribute, operator, value) tuples
+        order (str): Attribute ordering the page, or None
+        window (int): Number of objects up to the end of the page, or
+            None for all of them
+        total (int): Number of objects of the class
+
+    Returns:
+        tuple: ("index", keys) to filter the candidates of the most
+        selective index, ("ordered", index) to read the objects in the
+        order of the sorted index of the ordering attribute and stop at
+        the end of the page, or ("scan", None) to filter the objects of
+        the class
+    """
+    keys = candidate_keys(indexes, predicates)
+    index = indexes.get(order) if order is not None else None
+    if isinstance(index, SortedIndex) and\
+            (keys is None or window is not None and
+             window * total < len(keys) ** 2):
+        return "ordered", index
+    if keys is not None:
+        return "index", keys
+    return "scan", None
+
+
+def ordered_keys(store, class_name, index, predicates, descending):
+    """Yields the keys of a class in the order of a sorted index, within
+    the bounds the predicates put on its attribute. Objects whose
+    attribute is not a number, which the index leaves out, come after
+    the numbers, or before them in descending order.
+
+    Args:
+        store (ObjectStore): The objects of the storage
+        class_name (str): Name of the class
+        index (SortedIndex): Index of the ordering attribute
+        predicates (list): (attribute, operator, value) tuples
+        descending (bool): True for descending order
+
+    Yields:
+        str: Keys of the objects
+    """
+    bounds = range_bounds(index.attribute, predicates)
+    keys = index.scan(reverse=descending, **bounds)
+    if bounds["low"] is not None or bounds["high"] is not None:
+        # Only numbers can satisfy the bounds
+        yield from keys
+        return
+    if not descending:
+        yield from keys
+    # Objects left out of the index, sorted once they are reached
+    rest = [key for key in store.by_class.get(class_name, {})
+            if key not in index.values]
+    rest.sort(key=lambda key: (sort_key(store.peek(key), index.attribute),
+                               key),
+              reverse=descending)
+    yield from rest
+    if descending:
+        yield from keys
+
+
+def execute(store, class_name, predicates, order_by=None, limit=None,
+            offset=0):
+    """Returns one page of the objects of a class satisfying every
+    predicate, read as chosen by plan(). The objects are filtered as
+    they are read and the reading stops at the end of the page, so only
+    the page is kept, or when no index gives the order, the objects up
+    to the end of the page. Ties are ordered by key.
+
+    Args:
+        store (ObjectStore): The objects of the storage
+        class_name (str): Name of the class
+        predicates (dict): Eg: {"city_id": "1234", "max_guest__gt": 2}
+        order_by (str): Eg: "price_by_night", "-price_by_night" for
+            descending order, or None for the order of the reading
+        limit (int): Number of objects of the page, or None for all
+        offset (int): Number of matching objects skipped first
+
+    Raises:
+        ValueError: If a predicate name ends with an unknown operator
+
+    Returns:
+        list: The objects of the page
+    """
+    parsed = parse_predicates(predicates)
+    order, descending = parse_order(order_by)
+    window = None if limit is None else offset + limit
+    strategy, source = plan(store.indexes.get(class_name, {}), parsed,
+                            order, window, store.count(class_name))
+    if strategy == "ordered":
+        keys = ordered_keys(store, class_name, source, parsed, descending)
+    elif strategy == "index":
+        keys = source
+    else:
+        keys = store.by_class.get(class_name, {})
+    # Objects not built yet are matched on their RawRecord
+    found = (key for key in keys
+             if all(matches(store.peek(key), *predicate)
+                    for predicate in parsed))
+    if order is not None and strategy != "ordered":
+        def order_key(key):
+            # Value of the ordering attribute, then the key for ties
+            return sort_key(store.peek(key), order), key
+        if window is None:
+            found = sorted(found, key=order_key, reverse=descending)
+        elif descending:
+            found = nlargest(window, found, key=order_key)
+        else:
+            found = nsmallest(window, found, key=order_key)
+    return [store[key] for key in islice(found, offset, window)]
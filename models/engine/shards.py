@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""ShardLayout class, the files of a sharded FileStorage
+"""
+
+import json
+import os
+import zlib
+from models.engine.snapshot import atomic_write
+
+
+class ShardLayout:
+    """This class names the files of a sharded storage: a directory
+    holding one file per class, or per class and hash bucket of the id,
+    Eg: file.json.d/User.0.json, and a manifest recording the number of
+    buckets the files were written with
+    """
+    def __init__(self, directory, buckets=1):
+        """Initializes a ShardLayout instance
+
+        Args:
+            directory (str): Path to the directory of the shards
+            buckets (int): Number of files of each class
+
+        Raises:
+            ValueError: If buckets is less than 1
+        """
+        if buckets < 1:
+            raise ValueError("buckets must be at least 1")
+        self.directory = directory
+        self.buckets = buckets
+        self.manifest = os.path.join(directory, "manifest.json")
+
+    def bucket(self, id):
+        """Returns the bucket of an id. Unlike hash(), it is the same in
+        every process.
+
+        Args:
+            id (str): Id of an object
+
+        Returns:
+            int: The bucket, from 0 to buckets - 1
+        """
+        return zlib.crc32(id.encode("utf-8")) % self.buckets
+
+    def shard(self, key):
+        """Returns the shard of an object
+
+        Args:
+            key (str): Key of the object, <class name>.<id>
+
+        Returns:
+            tuple: The class name and the bucket
+        """
+        name, id = key.split(".", 1)
+        return name, self.bucket(id)
+
+    def path(self, shard):
+        """Returns the path to the file of a shard
+
+        Args:
+            shard (tuple): The class name and the bucket
+
+        Returns:
+            str: Path to the file
+        """
+        return os.path.join(self.directory, "{}.{}.json".format(*shard))
+
+    def current(self):
+        """Tells whether the directory was written with this number of
+        buckets, so single shards can be read and rewritten
+
+        Returns:
+            bool: False if there is no manifest or it differs
+        """
+        try:
+            with open(self.manifest, "r", encoding="utf-8") as file:
+                return json.load(file).get("buckets") == self.buckets
+        except (FileNotFoundError, PermissionError, ValueError):
+            return False
+
+    def write_manifest(self):
+        """Records the number of buckets, once every shard is written
+        """
+        with atomic_write(self.manifest) as file:
+            json.dump({"buckets": self.buckets}, file)
+
+    def existing(self):
+        """Lists the shards found in the directory, whatever number of
+        buckets they were written with
+
+        Returns:
+            list: Paths to the files of the shards
+        """
+        try:
+            names = sorted(os.listdir(self.directory))
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+        return [os.path.join(self.directory, name) for name in names
+                if name.endswith(".json") and name != "manifest.json"]
+
+    def remove_stale(self, shards):
+        """Removes the files of shards not in a set, Eg: files left by
+        another number of buckets
+
+        Args:
+            shards (set): Paths to the files to keep
+        """
+        for path in self.existing():
+            if path not in shards:
+                os.remove(path)
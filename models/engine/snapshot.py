@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""Crash-safe snapshot writes, in the calling thread or in a background
+writer thread
+"""
+
+from contextlib import contextmanager
+import os
+import threading
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """Opens a temporary file next to path and, when the block exits
+    without an error, syncs it to disk and renames it over path. A crash
+    in the middle of the write leaves the previous file untouched.
+
+    Usage example:
+        with atomic_write("file.json") as file:
+            file.write(text)
+
+    Args:
+        path (str): Path of the file to replace
+        mode (str): "w" for text or "wb" for bytes
+
+    Yields:
+        The temporary file
+    """
+    temp_path = path + ".tmp"
+    encoding = None if "b" in mode else "utf-8"
+    try:
+        with open(temp_path, mode, encoding=encoding) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        # Leave no partial file behind
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    sync_directory(path)
+
+
+def sync_directory(path):
+    """Syncs the directory of a file, so a rename in it is durable.
+    Systems that can not open a directory are skipped.
+
+    Args:
+        path (str): Path of the file
+    """
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class BackgroundWriter:
+    """This class writes snapshots in a daemon thread. A snapshot
+    submitted while another one is being written replaces any snapshot
+    still waiting, or is merged into it, so a burst of saves ends in a
+    single write of the latest state.
+    """
+    def __init__(self, write, merge=None):
+        """Initializes a BackgroundWriter instance
+
+        Args:
+            write (callable): Called in the thread with each snapshot
+            merge (callable): Called with the waiting snapshot and a new
+                one to fold them into one. By default the new one wins.
+        """
+        self.write = write
+        self.merge = merge
+        self.condition = threading.Condition()
+        # The snapshot waiting to be written, if any
+        self.waiting = None
+        self.has_waiting = False
+        # True while the thread is writing a snapshot
+        self.busy = False
+        # Error raised by the last write, reported by flush()
+        self.error = None
+        self.thread = None
+
+    def submit(self, snapshot):
+        """Queues a snapshot, replacing or merging the one waiting, and
+        returns at once
+
+        Args:
+            snapshot: The data passed to write
+        """
+        with self.condition:
+            if self.has_waiting and self.merge is not None:
+                snapshot = self.merge(self.waiting, snapshot)
+            self.waiting = snapshot
+            self.has_waiting = True
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="snapshot-writer", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def flush(self):
+        """Waits until every submitted snapshot is written
+
+        Raises:
+            Exception: The error raised by a failed write, once
+        """
+        with self.condition:
+            self.condition.wait_for(
+                lambda: not self.has_waiting and not self.busy)
+            error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def run(self):
+        """Writes the waiting snapshots until the program exits
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.has_waiting)
+                snapshot, self.waiting = self.waiting, None
+                self.has_waiting = False
+                self.busy = True
+            try:
+                self.write(snapshot)
+            except Exception as error:
+                self.error = error
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
@@ -0,0 +1,461 @@
+#!/usr/bin/python3
+"""SQLiteStorage class
+"""
+
+import json
+import sqlite3
+from models.amenity import Amenity
+from models.base_model import BaseModel
+from models.city import City
+from models.engine import query
+from models.engine.base_storage import BaseStorage
+from models.engine.indexes import INDEX_KINDS, SEARCH_TERM, GridIndex
+from models.engine.indexes import normalize
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+# SQL operators of the query operators that can be pushed to SQLite
+SQL_OPERATORS = {
+    "eq": "=",
+    "lt": "<",
+    "le": "<=",
+    "gt": ">",
+    "ge": ">=",
+}
+
+
+class SQLiteStorage(BaseStorage):
+    """This class stores instances in an SQLite database with one table
+    per class. Each row holds the id of an object and the JSON of its
+    dictionary, so a lookup, an update or a delete only touches one row.
+    """
+    # Create all available classes
+    __all_classes = {
+        "Amenity": Amenity,
+        "BaseModel": BaseModel,
+        "City": City,
+        "Place": Place,
+        "Review": Review,
+        "State": State,
+        "User": User,
+    }
+
+    # Attribute indexes of each class: {class name: {attribute: kind}}
+    __indexes = {
+        "Amenity": {"name": "text"},
+        "City": {"state_id": "hash"},
+        "Place": {
+            "city_id": "hash",
+            "user_id": "hash",
+            "price_by_night": "sorted",
+            "latitude": "sorted",
+            "longitude": "sorted",
+            "name,description": "text",
+        },
+        "Review": {"place_id": "hash", "user_id": "hash", "text": "text"},
+    }
+
+    def __init__(self, path="hbnb.db"):
+        """Initializes a SQLiteStorage instance
+
+        Args:
+            path (str): Path to the database file
+        """
+        self.__path = path
+        self.__connection = None
+        # Objects read or added so far: {class.id: object}
+        self.__objects = {}
+        # Keys changed since they were last written: {class.id: op}
+        self.__pending = {}
+
+    def all(self, cls=None):
+        """Returns the objects of the storage
+
+        Args:
+            cls (type or str): Only return the objects of this class
+
+        Returns:
+            dict: A dictionary of {<class name>.<id>: object}
+        """
+        names = self.__all_classes if cls is None else [self.class_name(cls)]
+        result = {}
+        for name in names:
+            if name in self.__all_classes:
+                result.update(self.__select(name, "", []))
+        return result
+
+    def new(self, obj):
+        """Adds a new object to the storage
+
+        Args:
+            obj: The new object
+        """
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        self.__objects[key] = obj
+        self.__pending[key] = "set"
+
+    def touch(self, obj):
+        """Marks an object as modified so the next save persists it
+
+        Args:
+            obj: The modified object
+        """
+        key = "{}.{}".format(obj.__class__.__name__, getattr(obj, "id", ""))
+        # Objects being built or not stored are not tracked
+        if self.__objects.get(key) is obj:
+            self.__pending[key] = "set"
+
+    def delete(self, obj=None):
+        """Deletes an object from the storage
+
+        Args:
+            obj: The object to be deleted. Nothing happens if it is None
+        """
+        if obj is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        self.__objects.pop(key, None)
+        self.__pending[key] = "del"
+
+    def get(self, cls, id):
+        """Returns one object
+
+        Args:
+            cls (type or str): The class or name of the class
+            id (str): Id of the object
+
+        Returns:
+            The object, or None if it does not exist
+        """
+        name = self.class_name(cls)
+        if name not in self.__all_classes:
+            return None
+        result = self.__select(name, "WHERE id = ?", [id])
+        return result.get("{}.{}".format(name, id))
+
+    def count(self, cls=None):
+        """Counts all objects, or only the objects of a class
+
+        Args:
+            cls (type or str): The class or name of the class
+
+        Returns:
+            int: Number of objects
+        """
+        names = self.__all_classes if cls is None else [self.class_name(cls)]
+        self.__flush()
+        total = 0
+        for name in names:
+            if name in self.__all_classes:
+                total += self.__execute(
+                    'SELECT COUNT(*) FROM "{}"'.format(name)).fetchone()[0]
+        return total
+
+    def query(self, cls, **predicates):
+        """Returns the objects of a class matching every predicate.
+        Predicates that can use the JSON expression indexes are run by
+        SQLite and every predicate is checked again on the objects.
+
+        Args:
+            cls (type or str): The class or name of the class
+            predicates: Eg: city_id="1234", price_by_night__ge=100
+
+        Raises:
+            ValueError: If a predicate uses an unknown operator
+
+        Returns:
+            dict: A dictionary of the matching objects
+        """
+        name = self.class_name(cls)
+        parsed = query.parse_predicates(predicates)
+        if name not in self.__all_classes:
+            return {}
+        clauses, params = [], []
+        for attribute, operator, value in parsed:
+            clause = self.__clause(name, attribute, operator, value)
+            if clause:
+                clauses.append(clause)
+                params.append(normalize(value))
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+        return {key: obj for key, obj in
+                self.__select(name, where, params).items()
+                if all(query.matches(obj, *predicate)
+                       for predicate in parsed)}
+
+    def search(self, cls, text, limit=None):
+        """Returns the objects of a class whose text attributes hold
+        every term of a search, best match first, as ranked by the BM25
+        function of the FTS5 table of the class. A term ending with *,
+        Eg: "pool*", matches every word it starts.
+
+        Args:
+            cls (type or str): The class or name of the class
+            text (str): The search, Eg: "quiet pool*"
+            limit (int): Only return this many of the best matches
+
+        Raises:
+            ValueError: If the class has no text index or the limit is
+                negative
+
+        Returns:
+            list: The matching objects, best match first
+        """
+        if limit is not None and limit < 0:
+            raise ValueError("invalid limit: {}".format(limit))
+        name = self.class_name(cls)
+        if "text" not in self.__indexes.get(name, {}).values():
+            raise ValueError("no text index on {}".format(name))
+        # Quote the words, so none is read as an FTS5 operator
+        terms = ['"{}"{}'.format(word, star)
+                 for word, star in SEARCH_TERM.findall(text.lower())]
+        if not terms:
+            return []
+        self.__flush()
+        rows = self.__execute(
+            'SELECT row.id, row.data FROM "{0}_search" '
+            'JOIN "{0}" AS row ON row.rowid = "{0}_search".rowid '
+            'WHERE "{0}_search" MATCH ? ORDER BY bm25("{0}_search") '
+            'LIMIT ?'.format(name),
+            (" ".join(terms), -1 if limit is None else limit))
+        return list(self.__objects_of(name, rows).values())
+
+    def add_index(self, cls, attribute, kind="hash"):
+        """Declares an attribute index on a class
+
+        Args:
+            cls (type or str): The class or name of the class
+            attribute (str): Name of the attribute
+            kind (str): "hash", "sorted", "grid" or "text". A grid index,
+                Eg: on "latitude,longitude", becomes a sorted index on
+                each attribute, which within() and near() range over. A
+                text index, Eg: on "name,description", is an FTS5 table
+                kept up to date by triggers; a class has at most one.
+
+        Raises:
+            ValueError: If kind or attribute can not be indexed
+        """
+        if kind == "grid":
+            # Check that two attributes are named
+            GridIndex(attribute)
+            for name in attribute.split(","):
+                self.add_index(cls, name.strip(), "sorted")
+            return
+        if kind == "text":
+            names = attribute.split(",")
+        else:
+            names = [attribute]
+        if kind not in INDEX_KINDS or\
+                not all(name.isidentifier() for name in names):
+            raise ValueError("unknown index kind: {}".format(kind))
+        name = self.class_name(cls)
+        self.__indexes.setdefault(name, {})[attribute] = kind
+        self.__create_index(name, attribute, kind)
+
+    def save(self):
+        """Writes the changes made since the last save and commits them.
+        Inside a batch() block the commit is deferred to the end of the
+        block.
+        """
+        if self.defer_save():
+            return
+        self.__flush()
+        if self.__connection is not None:
+            self.__connection.commit()
+
+    def reload(self):
+        """Opens the database in WAL mode and creates the missing
+        tables and indexes. Objects are read from the database when
+        they are accessed.
+        """
+        if self.__connection is not None:
+            self.__connection.close()
+        self.__connection = sqlite3.connect(self.__path)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__objects.clear()
+        self.__pending.clear()
+        for name in self.__all_classes:
+            self.__execute('CREATE TABLE IF NOT EXISTS "{}" '
+                           '(id TEXT PRIMARY KEY, data TEXT NOT NULL)'
+                           .format(name))
+        for name, attributes in self.__indexes.items():
+            for attribute, kind in attributes.items():
+                self.__create_index(name, attribute, kind)
+        self.__connection.commit()
+
+    def close(self):
+        """Commits the pending changes and closes the database
+        """
+        if self.__connection is not None:
+            self.save()
+            self.__connection.close()
+            self.__connection = None
+
+    def __execute(self, sql, params=()):
+        """Runs one SQL statement, opening the database if needed
+
+        Args:
+            sql (str): The statement
+            params: Its parameters
+
+        Returns:
+            sqlite3.Cursor: The cursor of the statement
+        """
+        if self.__connection is None:
+            self.reload()
+        return self.__connection.execute(sql, params)
+
+    def __flush(self):
+        """Writes the pending changes to the open transaction, so the
+        following reads see them
+        """
+        for key, operation in self.__pending.items():
+            name, id = key.split(".", 1)
+            if operation == "set":
+                data = json.dumps(self.__objects[key].to_dict())
+                # Update rows in place, so their rowid and the triggers
+                # of the full-text tables follow them
+                self.__execute('INSERT INTO "{}" (id, data) VALUES (?, ?) '
+                               'ON CONFLICT(id) DO UPDATE SET '
+                               'data = excluded.data'.format(name),
+                               (id, data))
+            else:
+                self.__execute('DELETE FROM "{}" WHERE id = ?'
+                               .format(name), (id,))
+        self.__pending.clear()
+
+    def __select(self, name, where, params):
+        """Returns the objects of the rows of a class matching a WHERE
+        clause, reusing the objects already read
+
+        Args:
+            name (str): Name of the class
+            where (str): The WHERE clause, or ""
+            params (list): Parameters of the clause
+
+        Returns:
+            dict: A dictionary of {<class name>.<id>: object}
+        """
+        self.__flush()
+        rows = self.__execute('SELECT id, data FROM "{}" {} ORDER BY rowid'
+                              .format(name, where), params)
+        return self.__objects_of(name, rows)
+
+    def __objects_of(self, name, rows):
+        """Returns the objects of rows of a class, reusing the objects
+        already read
+
+        Args:
+            name (str): Name of the class
+            rows: The (id, data) rows, in the order to keep
+
+        Returns:
+            dict: A dictionary of {<class name>.<id>: object}
+        """
+        result = {}
+        for id, data in rows:
+            key = "{}.{}".format(name, id)
+            obj = self.__objects.get(key)
+            if obj is None:
+                obj = self.__all_classes[name].from_dict(json.loads(data))
+                self.__objects[key] = obj
+            result[key] = obj
+        return result
+
+    def __clause(self, name, attribute, operator, value):
+        """Returns the SQL condition of a predicate, or None when the
+        predicate has to be checked on the objects only
+
+        Args:
+            name (str): Name of the class
+            attribute (str): Name of the attribute
+            operator (str): The query operator
+            value: The value compared against
+
+        Returns:
+            str: The condition, with one parameter
+        """
+        if operator not in SQL_OPERATORS or not attribute.isidentifier():
+            return None
+        # Rows without the attribute hold the class default, which SQL
+        # can not see, so leave predicates it satisfies to Python
+        cls = self.__all_classes[name]
+        if query.matches(cls, attribute, operator, value):
+            return None
+        value = normalize(value)
+        if isinstance(value, float):
+            expression = self.__expression(attribute, "sorted")
+        elif isinstance(value, str):
+            expression = self.__expression(attribute, "hash")
+        else:
+            return None
+        return "{} {} ?".format(expression, SQL_OPERATORS[operator])
+
+    @staticmethod
+    def __expression(attribute, kind):
+        """Returns the SQL expression reading an attribute of a row
+
+        Args:
+            attribute (str): Name of the attribute
+            kind (str): "sorted" to read it as a number, otherwise "hash"
+
+        Returns:
+            str: The expression
+        """
+        expression = "json_extract(data, '$.{}')".format(attribute)
+        if kind == "sorted":
+            expression = "CAST({} AS REAL)".format(expression)
+        return expression
+
+    def __create_index(self, name, attribute, kind):
+        """Creates the expression index of an attribute, or the
+        full-text table of a text index
+
+        Args:
+            name (str): Name of the class
+            attribute (str): Name of the attribute, or of the attributes
+                of a text index separated by commas
+            kind (str): "hash", "sorted" or "text"
+        """
+        if kind == "text":
+            self.__create_search(name, attribute.split(","))
+            return
+        self.__execute('CREATE INDEX IF NOT EXISTS "{0}_{1}_{2}" '
+                       'ON "{0}" ({3})'.format(
+                           name, attribute, kind,
+                           self.__expression(attribute, kind)))
+
+    def __create_search(self, name, attributes):
+        """Creates the FTS5 table of the words of some attributes of a
+        class, Eg: Place_search, fills it from the rows and adds the
+        triggers keeping it up to date. Its rows have the rowid of the
+        rows of the class. Nothing happens if the table exists.
+
+        Args:
+            name (str): Name of the class
+            attributes (list): Names of the attributes
+        """
+        table = "{}_search".format(name)
+        if self.__execute('SELECT 1 FROM sqlite_master WHERE name = ?',
+                          (table,)).fetchone():
+            return
+        # Text of the attributes of a row, joined by spaces
+        words = " || ' ' || ".join(
+            "coalesce(json_extract({{0}}.data, '$.{}'), '')".format(
+                attribute.strip()) for attribute in attributes)
+        self.__execute('CREATE VIRTUAL TABLE "{}" USING fts5(words)'
+                       .format(table))
+        self.__execute('INSERT INTO "{0}" (rowid, words) '
+                       'SELECT rowid, {1} FROM "{2}"'.format(
+                           table, words.format('"{}"'.format(name)), name))
+        insert = 'INSERT INTO "{}" (rowid, words) VALUES (new.rowid, {});'\
+            .format(table, words.format("new"))
+        delete = 'DELETE FROM "{}" WHERE rowid = old.rowid;'.format(table)
+        for event, body in [("INSERT", insert), ("DELETE", delete),
+                            ("UPDATE", delete + " " + insert)]:
+            self.__execute('CREATE TRIGGER "{0}_{1}" AFTER {1} ON "{2}" '
+                           'BEGIN {3} END'.format(table, event.lower(),
+                                                  name, body))
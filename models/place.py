@@ -4,6 +4,7 @@
 
 
 from models.base_model import BaseModel
+from models.relationships import HasMany, HasManyIds
 
 
 class Place(BaseModel):
@@ -24,3 +25,5 @@ class Place(BaseModel):
     latitude = 0.0
     longitude = 0.0
     amenity_ids = []
+    reviews = HasMany("Review", "place_id", on_delete="cascade")
+    amenities = HasManyIds("Amenity", "amenity_ids")
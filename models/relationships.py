@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+"""Relationship accessors of the models, Eg: state.cities, reading the
+related objects through the attribute indexes of the storage, and the
+deletion of an object with its dependents
+"""
+
+import models
+
+
+# What deleting an object does to the objects related by a HasMany:
+# delete them too, refuse to delete it, or clear their foreign key
+ON_DELETE = ("cascade", "restrict", "nullify")
+
+
+class RestrictError(ValueError):
+    """Raised when an object can not be deleted because a relationship
+    with the "restrict" policy still has related objects
+    """
+
+
+class HasMany:
+    """Descriptor listing the objects of another class whose foreign key
+    holds the id of the instance, Eg: State.cities lists the cities whose
+    state_id is the id of the state. The storage keeps a hash index on
+    the foreign key, updated by new(), by changes of the attribute and by
+    delete(), so only the related objects are read.
+
+    The on_delete policy, one of ON_DELETE, tells what delete() does to
+    the related objects. It can be changed on the class, Eg:
+    State.cities.on_delete = "restrict".
+    """
+    def __init__(self, class_name, foreign_key, on_delete="nullify"):
+        """Initializes a HasMany instance
+
+        Args:
+            class_name (str): Name of the related class
+            foreign_key (str): Attribute of the related class holding
+                the id of the instance
+            on_delete (str): Policy applied when the instance is deleted
+
+        Raises:
+            ValueError: If on_delete is not a known policy
+        """
+        if on_delete not in ON_DELETE:
+            raise ValueError("unknown on_delete policy: {}".format(
+                on_delete))
+        self.class_name = class_name
+        self.foreign_key = foreign_key
+        self.on_delete = on_delete
+
+    def __get__(self, obj, owner=None):
+        """Returns the related objects
+
+        Args:
+            obj: The instance, or None when read from the class
+            owner (type): The class
+
+        Returns:
+            list: The related objects, or the HasMany instance when read
+            from the class
+        """
+        if obj is None:
+            return self
+        return list(models.storage.query(
+            self.class_name, **{self.foreign_key: obj.id}).values())
+
+
+class HasManyIds:
+    """Descriptor listing the objects of another class whose ids are
+    held in a list attribute of the instance, Eg: Place.amenities lists
+    the amenities of place.amenity_ids. Assigning an object of the
+    related class adds its id to the list.
+    """
+    def __init__(self, class_name, ids):
+        """Initializes a HasManyIds instance
+
+        Args:
+            class_name (str): Name of the related class
+            ids (str): Attribute of the instance holding the list of ids
+        """
+        self.class_name = class_name
+        self.ids = ids
+
+    def __get__(self, obj, owner=None):
+        """Returns the related objects that still exist
+
+        Args:
+            obj: The instance, or None when read from the class
+            owner (type): The class
+
+        Returns:
+            list: The related objects, or the HasManyIds instance when
+            read from the class
+        """
+        if obj is None:
+            return self
+        related = (models.storage.get(self.class_name, id)
+                   for id in getattr(obj, self.ids))
+        return [other for other in related if other is not None]
+
+    def __set__(self, obj, other):
+        """Adds the id of an object to the list of the instance. Objects
+        of other classes and ids already listed are ignored.
+
+        Args:
+            obj: The instance
+            other: An object of the related class
+        """
+        if type(other).__name__ != self.class_name:
+            return
+        ids = getattr(obj, self.ids)
+        if other.id not in ids:
+            # Assign a new list, so the change is tracked and the list
+            # declared on the class is left alone
+            setattr(obj, self.ids, ids + [other.id])
+
+
+def relationships(cls):
+    """Returns the HasMany relationships of a class and its bases
+
+    Args:
+        cls (type): The class
+
+    Returns:
+        list: The HasMany instances
+    """
+    found = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, HasMany):
+                found[name] = value
+    return list(found.values())
+
+
+def delete(obj):
+    """Deletes an object from the storage with its dependents, following
+    the on_delete policy of each relationship: dependents of "cascade"
+    relationships are deleted in turn, those of "nullify" relationships
+    get an empty foreign key, and dependents of "restrict" relationships
+    prevent the deletion. The dependents are found through the indexes
+    of the foreign keys, so only they are read, and every change is
+    written by a single save.
+
+    Args:
+        obj: The object to delete
+
+    Raises:
+        RestrictError: If a "restrict" relationship has dependents not
+            deleted with the object. Nothing is changed then.
+
+    Returns:
+        int: Number of objects deleted
+    """
+    doomed, nullified, restricted = {}, [], []
+    pending = [obj]
+    # Plan every change first, so a refusal leaves the storage intact
+    while pending:
+        current = pending.pop()
+        key = "{}.{}".format(type(current).__name__, current.id)
+        if key in doomed:
+            continue
+        doomed[key] = current
+        for relationship in relationships(type(current)):
+            dependents = relationship.__get__(current)
+            if relationship.on_delete == "cascade":
+                pending.extend(dependents)
+            elif relationship.on_delete == "nullify":
+                nullified.extend((other, relationship.foreign_key)
+                                 for other in dependents)
+            else:
+                restricted.extend((current, other) for other in dependents)
+    for current, other in restricted:
+        if "{}.{}".format(type(other).__name__, other.id) not in doomed:
+            raise RestrictError("{} {} has a {} {}".format(
+                type(current).__name__, current.id,
+                type(other).__name__, other.id))
+    with models.storage.batch():
+        for other, foreign_key in nullified:
+            if "{}.{}".format(type(other).__name__, other.id) not in doomed:
+                setattr(other, foreign_key, "")
+        for current in doomed.values():
+            models.storage.delete(current)
+        models.storage.save()
+    return len(doomed)
@@ -4,6 +4,7 @@
 
 
 from models.base_model import BaseModel
+from models.relationships import HasMany
 
 
 class State(BaseModel):
@@ -14,3 +15,4 @@ class State(BaseModel):
         BaseModel (class): Parent class
     """
     name = ""
+    cities = HasMany("City", "state_id", on_delete="cascade")
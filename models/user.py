@@ -4,6 +4,7 @@
 
 
 from models.base_model import BaseModel
+from models.relationships import HasMany
 
 
 class User(BaseModel):
@@ -17,3 +18,5 @@ class User(BaseModel):
     password = ""
     first_name = ""
     last_name = ""
+    places = HasMany("Place", "user_id", on_delete="cascade")
+    reviews = HasMany("Review", "user_id", on_delete="cascade")
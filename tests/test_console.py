@@ -8,10 +8,12 @@ import json
 from os import remove
 import sys
 import unittest
-from unittest.mock import create_autospec
+from unittest.mock import create_autospec, patch
 from uuid import UUID
 from console import HBNBCommand
 import models
+from models.city import City
+from models.state import State
 
 
 class TestHBNBCommand(unittest.TestCase):
@@ -224,6 +226,17 @@ class TestHBNBCommand(unittest.TestCase):
         self.assertFalse(self.console.onecmd("all City"))
         # Check for the update
         self.assertTrue("'first_name': 'John'" in self.out.getvalue())
+        # Clear StringIO object
+        self.clear_stringio()
+        # Test that an invalid timestamp is refused and not saved
+        input_ = "update City " + str_id + " created_at foo"
+        self.assertFalse(self.console.onecmd(input_))
+        self.assertEqual(self.out.getvalue(),
+                         "** invalid timestamp: foo **\n")
+        self.clear_stringio()
+        self.assertFalse(self.console.onecmd("show City " + str_id))
+        self.assertIn("'created_at': datetime.datetime(",
+                      self.out.getvalue())
 
     def test_update_alt_syntax(self):
         """Test the alternative syntax for update command
@@ -261,6 +274,44 @@ class TestHBNBCommand(unittest.TestCase):
         error_msg = "*** Unknown syntax: " + user_input + "\n"
         self.assertEqual(self.out.getvalue(), error_msg)
 
+    def test_update_dict_single_save(self):
+        """Test that updating from a dictionary writes the file once
+        """
+        self.assertFalse(self.console.onecmd("create City"))
+        str_id = self.out.getvalue()[:-1]
+        self.clear_stringio()
+        user_input = "City.update(" + str_id +\
+            ", {'name': 'Accra', 'state_id': 'GH', 'code': 233})"
+        with patch.object(models.storage, "compact") as compact:
+            self.assertIsNone(self.console.onecmd(user_input))
+        self.assertEqual(compact.call_count, 1)
+        self.assertIsNone(self.console.onecmd("City.show(" + str_id + ")"))
+        self.assertIn("'state_id': 'GH'", self.out.getvalue())
+        self.assertIn("'code': '233'", self.out.getvalue())
+
+    def test_run_batch(self):
+        """Tests that batch mode runs every command and writes the
+        storage once, or once per flush_every commands
+        """
+        script = StringIO("create User\n\ncreate City\nUser.count()\n")
+        with patch.object(models.storage, "compact") as compact:
+            self.assertEqual(self.console.run_batch(script)[0], 4)
+        self.assertEqual(compact.call_count, 1)
+        output = self.out.getvalue().split("\n")
+        self.assertEqual(len(output), 4)
+        self.assertEqual(output[2], "1")
+        self.clear_stringio()
+        script = StringIO("create State\n" * 5)
+        with patch.object(models.storage, "compact") as compact:
+            self.console.run_batch(script, flush_every=2)
+        self.assertEqual(compact.call_count, 3)
+        # quit stops the batch
+        script = StringIO("create Place\nquit\ncreate Place\n")
+        self.assertEqual(self.console.run_batch(script)[0], 2)
+        self.assertEqual(models.storage.count("Place"), 1)
+        with open("file.json", "r", encoding="utf-8") as file:
+            self.assertEqual(len(json.load(file)), 8)
+
     def test_count(self):
         """Tests the count command
         """
@@ -279,6 +330,171 @@ class TestHBNBCommand(unittest.TestCase):
         # Ascertain number of City instances
         self.assertEqual(no_of_instances, 3)
 
+    def test_query(self):
+        """Tests the query command
+        """
+        # Test no argument and invalid class
+        self.assertIsNone(self.console.onecmd("query"))
+        self.assertEqual(self.out.getvalue(), "** class name missing **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("query John"))
+        self.assertEqual(self.out.getvalue(), "** class doesn't exist **\n")
+        self.clear_stringio()
+        # Create two cities and set the state of one
+        self.assertFalse(self.console.onecmd("create City"))
+        str_id = self.out.getvalue()[:-1]
+        self.assertFalse(self.console.onecmd("create City"))
+        self.assertFalse(self.console.onecmd(
+            "update City " + str_id + " state_id 'abc'"))
+        self.clear_stringio()
+        # Query the cities of the state
+        self.assertIsNone(self.console.onecmd("query City state_id=abc"))
+        self.assertIn(str_id, self.out.getvalue())
+        self.assertEqual(self.out.getvalue().count("[City]"), 1)
+        self.clear_stringio()
+        # Test invalid predicates
+        self.assertIsNone(self.console.onecmd("query City state_id"))
+        self.assertEqual(self.out.getvalue(),
+                         "** invalid predicate: state_id **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("query City name__like=a"))
+        self.assertEqual(self.out.getvalue(),
+                         "** unknown operator: name__like **\n")
+
+    def test_where(self):
+        """Tests the where command and the <class>.where() syntax
+        """
+        # Test no argument and invalid class
+        self.assertIsNone(self.console.onecmd("where"))
+        self.assertEqual(self.out.getvalue(), "** class name missing **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("John.where(name=a)"))
+        self.assertEqual(self.out.getvalue(), "** class doesn't exist **\n")
+        self.clear_stringio()
+        # Create three places with a price and a name
+        ids = []
+        for price, name in [(30, "Loft"), (10, "Flat, top floor"),
+                            (20, "Cabin")]:
+            self.assertFalse(self.console.onecmd("create Place"))
+            ids.append(self.out.getvalue()[:-1])
+            self.assertFalse(self.console.onecmd(
+                "update Place {} price_by_night {}".format(ids[-1], price)))
+            self.assertFalse(self.console.onecmd(
+                'update Place {} name "{}"'.format(ids[-1], name)))
+            self.clear_stringio()
+
+        def found(line):
+            # Ids of the places printed by a command, in order
+            self.clear_stringio()
+            self.assertIsNone(self.console.onecmd(line))
+            output = self.out.getvalue()
+            return sorted((output.index(id), id) for id in ids
+                          if id in output)
+        self.assertEqual(
+            [id for _, id in found(
+                "Place.where(price_by_night>=20, order_by=price_by_night)")],
+            [ids[2], ids[0]])
+        self.assertEqual(
+            [id for _, id in found("Place.where(order_by=-price_by_night, "
+                                   "limit=2, offset=1)")],
+            [ids[2], ids[1]])
+        self.assertEqual(
+            [id for _, id in found('where Place name="Flat, top floor"')],
+            [ids[1]])
+        self.assertEqual(
+            [id for _, id in found("Place.where(name != Loft, "
+                                   "price_by_night<15)")],
+            [ids[1]])
+        self.assertEqual(found("Place.where(price_by_night>100)"), [])
+        # Test invalid conditions and options
+        for line, error in [
+                ("Place.where(price_by_night)",
+                 "** invalid condition: price_by_night **"),
+                ("Place.where(limit=ten)", "** invalid limit: ten **"),
+                ("Place.where(name__like=a)",
+                 "** unknown operator: name__like **"),
+                ("Place.where(name=a", "*** Unknown syntax: "
+                 "Place.where(name=a")]:
+            self.clear_stringio()
+            self.assertIsNone(self.console.onecmd(line))
+            self.assertEqual(self.out.getvalue(), error + "\n")
+
+    def test_search(self):
+        """Tests the search command
+        """
+        # Test no argument, invalid class and missing terms
+        self.assertIsNone(self.console.onecmd("search"))
+        self.assertEqual(self.out.getvalue(), "** class name missing **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("search John pool"))
+        self.assertEqual(self.out.getvalue(), "** class doesn't exist **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("search Review"))
+        self.assertEqual(self.out.getvalue(),
+                         "** search terms missing **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("search User john"))
+        self.assertEqual(self.out.getvalue(), "** no text index on User **\n")
+        self.clear_stringio()
+        # Create a review and search its words
+        self.assertFalse(self.console.onecmd("create Review"))
+        str_id = self.out.getvalue()[:-1]
+        self.assertFalse(self.console.onecmd(
+            'update Review ' + str_id + ' text "Don\'t miss the pool"'))
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("search Review don't po*"))
+        self.assertIn(str_id, self.out.getvalue())
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("search Review lake"))
+        self.assertEqual(self.out.getvalue(), "[]\n")
+
+    def test_near_within(self):
+        """Tests the near and within commands
+        """
+        # Test no argument, invalid class and missing coordinates
+        for command in ["near", "within"]:
+            self.assertIsNone(self.console.onecmd(command))
+            self.assertEqual(self.out.getvalue(),
+                             "** class name missing **\n")
+            self.clear_stringio()
+            self.assertIsNone(self.console.onecmd(command + " John 1 2 3"))
+            self.assertEqual(self.out.getvalue(),
+                             "** class doesn't exist **\n")
+            self.clear_stringio()
+            self.assertIsNone(self.console.onecmd(command + " Place 1 2"))
+            self.assertEqual(self.out.getvalue(),
+                             "** coordinates missing **\n")
+            self.clear_stringio()
+        # Create a place in Paris
+        self.assertFalse(self.console.onecmd("create Place"))
+        str_id = self.out.getvalue()[:-1]
+        self.assertFalse(self.console.onecmd(
+            "update Place " + str_id + " latitude 48.8566"))
+        self.assertFalse(self.console.onecmd(
+            "update Place " + str_id + " longitude 2.3522"))
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("near Place 48.86 2.35 10 5"))
+        self.assertIn(str_id, self.out.getvalue())
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("near Place 51.5 -0.13 10"))
+        self.assertEqual(self.out.getvalue(), "[]\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("within Place 48 2 49 3"))
+        self.assertIn(str_id, self.out.getvalue())
+        self.clear_stringio()
+        # Test invalid numbers
+        self.assertIsNone(self.console.onecmd("near Place 48 2 ten"))
+        self.assertEqual(self.out.getvalue(), "** invalid number: ten **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("near Place 48 2 10 1.5"))
+        self.assertEqual(self.out.getvalue(), "** invalid number: 1.5 **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("near Place 95 2 10"))
+        self.assertEqual(self.out.getvalue(), "** invalid latitude: 95.0 **\n")
+        self.clear_stringio()
+        self.assertIsNone(self.console.onecmd("within Place 1 2 3 4 5"))
+        self.assertEqual(self.out.getvalue(), "** too many arguments **\n")
+
     def test_show(self):
         """Test show command
         """
@@ -375,6 +591,23 @@ class TestHBNBCommand(unittest.TestCase):
         # Confirm if the output contains the City id
         self.assertTrue(str_id not in self.out.getvalue())
 
+    def test_destroy_dependents(self):
+        """Test that destroy deletes the dependents of an object, or
+        refuses when a relationship restricts it
+        """
+        state, city = State(), City()
+        city.state_id = state.id
+        self.assertIsNone(self.console.onecmd("destroy State " + state.id))
+        self.assertIsNone(models.storage.get(City, city.id))
+        state, city = State(), City()
+        city.state_id = state.id
+        with patch.object(State.cities, "on_delete", "restrict"):
+            self.assertIsNone(
+                self.console.onecmd("destroy State " + state.id))
+        self.assertEqual(self.out.getvalue(), "** State {} has a City {} **\n"
+                         .format(state.id, city.id))
+        self.assertIs(models.storage.get(State, state.id), state)
+
 
 if __name__ == "__main__":
     unittest.main()
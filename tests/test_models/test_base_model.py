@@ -3,10 +3,13 @@
 """
 
 
+import asyncio
 from datetime import datetime
+import os
 import unittest
+from unittest.mock import patch
 import models
-from models.base_model import BaseModel
+from models.base_model import BaseModel, SHAPES
 
 
 class TestBaseModel(unittest.TestCase):
@@ -76,6 +79,16 @@ class TestBaseModel(unittest.TestCase):
         # Compare orignal updated_at with new time
         self.assertNotEqual(prev_updated_at, base_model.updated_at)
 
+    def test_asave(self):
+        """Test the asave method of the BaseModel class
+        """
+        base_model = BaseModel()
+        prev_updated_at = base_model.updated_at
+        with patch.object(models.storage, "asave") as asave:
+            asyncio.run(base_model.asave())
+        self.assertNotEqual(prev_updated_at, base_model.updated_at)
+        asave.assert_awaited_once_with()
+
     def test_to_dict(self):
         """Test the to_dict() method of BaseModel class
         """
@@ -91,6 +104,169 @@ class TestBaseModel(unittest.TestCase):
         # Assert the to_dict return value
         self.assertEqual(basemodel_dict, base_model.to_dict())
 
+    def test_from_dict(self):
+        """Test that from_dict() builds the same instance as the
+        constructor, without adding it to the storage
+        """
+        data = BaseModel().to_dict()
+        data["name"] = "Kumasi"
+        with patch.object(models.storage, "touch") as touch:
+            base_model = BaseModel.from_dict(data)
+        touch.assert_not_called()
+        self.assertEqual(base_model.to_dict(), BaseModel(**data).to_dict())
+        self.assertIsInstance(base_model.created_at, datetime)
+        self.assertNotIn("__class__", base_model.__dict__)
+        self.assertEqual(data["__class__"], "BaseModel")
+        # Timestamps may already be datetime instances
+        data["updated_at"] = base_model.updated_at
+        self.assertEqual(BaseModel.from_dict(data).updated_at,
+                         base_model.updated_at)
+
+    def test_lazy_timestamps(self):
+        """Test that timestamps read from storage stay in their ISO
+        format until they are read
+        """
+        created_at = "2024-01-02T03:04:05.000006"
+        base_model = BaseModel.from_dict(
+            {"id": "1", "created_at": created_at, "updated_at": 0})
+        self.assertIs(base_model.to_dict()["created_at"], created_at)
+        self.assertEqual(base_model.to_dict()["updated_at"],
+                         "1970-01-01T00:00:00")
+        self.assertIn("datetime.datetime(2024, 1, 2, 3, 4, 5, 6)",
+                      str(base_model))
+        self.assertEqual(base_model.created_at,
+                         datetime(2024, 1, 2, 3, 4, 5, 6))
+        # A new instance reads the clock once
+        base_model = BaseModel()
+        self.assertEqual(base_model.created_at, base_model.updated_at)
+        del base_model.updated_at
+        with self.assertRaises(AttributeError):
+            base_model.to_dict()
+        models.storage.delete(base_model)
+
+    def test_invalid_timestamps(self):
+        """Test that assigned timestamps are checked and converted,
+        while from_dict() keeps them as stored
+        """
+        base_model = BaseModel()
+        base_model.created_at = "2024-01-02T03:04:05"
+        self.assertEqual(base_model.__dict__["created_at"],
+                         datetime(2024, 1, 2, 3, 4, 5))
+        for value in ["foo", None, 1.5, True, [2024]]:
+            with self.assertRaises(ValueError):
+                base_model.updated_at = value
+        self.assertIsInstance(base_model.to_dict()["updated_at"], str)
+        with self.assertRaises(ValueError):
+            BaseModel(id="1", created_at="foo")
+        models.storage.delete(base_model)
+
+
+class TestCompactModel(unittest.TestCase):
+    """Compact model test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Declare the same model as a regular and a compact class
+        """
+        class Room(BaseModel):
+            """A regular model"""
+            name = ""
+            beds = 0
+
+        with patch.dict(os.environ, {"HBNB_COMPACT_MODELS": "1"}):
+            class CompactRoom(BaseModel):
+                """A compact model"""
+                name = ""
+                beds = 0
+
+        self.regular = Room
+        self.compact = CompactRoom
+        self.kwargs = {
+            "id": "1", "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat(),
+            "name": "Blue", "Country": "Ghana", "beds": 2,
+        }
+
+    def test_declared_fields(self):
+        """Test that declared attributes live in slots
+        """
+        self.assertIn("_v_name", self.compact.__slots__)
+        self.assertEqual(set(self.compact.__fields__),
+                         {"id", "created_at", "updated_at", "name", "beds"})
+        # Reading from the class still returns the default
+        self.assertEqual(self.compact.name, "")
+        self.assertFalse(hasattr(self.compact, "id"))
+
+    def test_same_output(self):
+        """Test that __str__ and to_dict() match the regular model
+        """
+        regular = self.regular(**self.kwargs)
+        compact = self.compact(**self.kwargs)
+        self.assertEqual(str(regular).replace("Room", ""),
+                         str(compact).replace("CompactRoom", ""))
+        regular_dict = regular.to_dict()
+        compact_dict = compact.to_dict()
+        del regular_dict["__class__"], compact_dict["__class__"]
+        self.assertEqual(list(regular_dict.items()),
+                         list(compact_dict.items()))
+
+    def test_attributes(self):
+        """Test setting, reading and deleting attributes
+        """
+        room = self.compact()
+        self.assertEqual(room.beds, 0)
+        self.assertEqual(list(room.__dict__),
+                         ["id", "created_at", "updated_at"])
+        room.beds = 3
+        room.color = "red"
+        self.assertEqual(room.beds, 3)
+        self.assertEqual(room.color, "red")
+        self.assertEqual(list(room.__dict__),
+                         ["id", "created_at", "updated_at", "beds", "color"])
+        del room.beds
+        del room.color
+        self.assertEqual(room.beds, 0)
+        with self.assertRaises(AttributeError):
+            room.color
+        with self.assertRaises(AttributeError):
+            del room.name
+        models.storage.delete(room)
+
+    def test_from_dict(self):
+        """Test that from_dict() builds a compact instance like the
+        constructor does
+        """
+        data = self.regular(**self.kwargs).to_dict()
+        room = self.compact.from_dict(data)
+        self.assertEqual(list(room.to_dict().items()),
+                         list(self.compact(**self.kwargs).to_dict().items()))
+        self.assertEqual(room.Country, "Ghana")
+        self.assertIs(room._shape, self.compact(**self.kwargs)._shape)
+        # Unset declared attributes still show the default
+        data = {"id": "2", "created_at": self.kwargs["created_at"],
+                "updated_at": self.kwargs["updated_at"]}
+        room = self.compact.from_dict(data)
+        self.assertEqual(room.beds, 0)
+        with self.assertRaises(ValueError):
+            room.created_at = "foo"
+        self.assertIsNone(room._extras)
+        # Timestamps are converted when first read
+        self.assertEqual(room._v_created_at, self.kwargs["created_at"])
+        self.assertEqual(room.created_at.isoformat(),
+                         self.kwargs["created_at"])
+        self.assertIsInstance(room._v_created_at, datetime)
+
+    def test_shared_shapes(self):
+        """Test that instances setting attributes in the same order
+        share one tuple of names
+        """
+        first = self.compact(**self.kwargs)
+        second = self.compact(**self.kwargs)
+        self.assertIs(first._shape, second._shape)
+        self.assertIs(SHAPES[first._shape], first._shape)
+
 
 if __name__ == "__main__":
     unittest.main()
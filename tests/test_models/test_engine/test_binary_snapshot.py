@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+"""Unit tests for the binary_snapshot module
+"""
+
+
+from datetime import datetime
+from io import BytesIO
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from models.engine import binary_snapshot
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    """binary_snapshot test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    pairs = [
+        ("User.1", {"id": "1", "created_at": "2024-01-02T03:04:05.000006",
+                    "updated_at": datetime(2024, 1, 2, 3, 4, 5),
+                    "__class__": "User", "email": "a@b.c"}),
+        ("Place.2", {"id": "2", "created_at": "yesterday",
+                     "__class__": "Place", "price_by_night": 120,
+                     "latitude": 5.6, "amenity_ids": ["a", "b"],
+                     "rules": {"pets": False}, "note": None}),
+    ]
+
+    def tearDown(self):
+        """Delete the test files if they exist
+        """
+        for path in ("test_file.json", "test_file.bin"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def dump(self):
+        """Dumps the test pairs to a binary buffer
+
+        Returns:
+            BytesIO: The buffer, at its start
+        """
+        file = BytesIO()
+        binary_snapshot.dump(self.pairs, file)
+        file.seek(0)
+        return file
+
+    def test_round_trip(self):
+        """Test that loading gives back the dumped objects, with
+        timestamps as datetime instances
+        """
+        loaded = dict(binary_snapshot.load(self.dump()))
+        self.assertEqual(list(loaded), ["User.1", "Place.2"])
+        user = loaded["User.1"]
+        self.assertEqual(user["created_at"],
+                         datetime(2024, 1, 2, 3, 4, 5, 6))
+        self.assertEqual(user["updated_at"], datetime(2024, 1, 2, 3, 4, 5))
+        self.assertEqual(user["email"], "a@b.c")
+        # Strings that are not ISO timestamps are kept as they are
+        self.assertEqual(loaded["Place.2"], self.pairs[1][1])
+
+    def test_to_micros(self):
+        """Test the conversion of timestamps to integers
+        """
+        self.assertEqual(binary_snapshot.to_micros("1970-01-01T00:00:01"),
+                         1000000)
+        self.assertEqual(binary_snapshot.to_micros(datetime(1970, 1, 1)), 0)
+        self.assertIsNone(binary_snapshot.to_micros("1970-01-01 00:00:01"))
+        self.assertIsNone(binary_snapshot.to_micros(12))
+
+    def test_smaller_than_json(self):
+        """Test that repeated keys are stored once
+        """
+        pairs = [("User.{}".format(number),
+                  {"id": str(number), "__class__": "User",
+                   "created_at": "2024-01-02T03:04:05.000006",
+                   "updated_at": "2024-01-02T03:04:05.000006",
+                   "first_name": "Ama"})
+                 for number in range(100)]
+        file = BytesIO()
+        binary_snapshot.dump(pairs, file)
+        self.assertLess(len(file.getvalue()),
+                        len(json.dumps(dict(pairs))) / 2)
+
+    def test_invalid(self):
+        """Test that other data is rejected
+        """
+        with self.assertRaises(ValueError):
+            list(binary_snapshot.load(BytesIO(b'{"a": 1}')))
+        with self.assertRaises(ValueError):
+            list(binary_snapshot.load(BytesIO(binary_snapshot.MAGIC)))
+        file = self.dump()
+        data = file.getvalue()[:-10]
+        with self.assertRaises(ValueError):
+            list(binary_snapshot.load(BytesIO(data)))
+
+    def test_read_detects_format(self):
+        """Test that read() accepts both formats
+        """
+        self.assertTrue(binary_snapshot.is_binary(self.dump()))
+        text = BytesIO(b'{"City.1": {"id": "1"}}')
+        self.assertFalse(binary_snapshot.is_binary(text))
+        self.assertEqual(list(binary_snapshot.read(text)),
+                         [("City.1", {"id": "1"})])
+        self.assertEqual(len(list(binary_snapshot.read(self.dump()))), 2)
+
+    def test_convert(self):
+        """Test converting JSON to binary and back
+        """
+        original = {"User.1": dict(self.pairs[0][1]),
+                    "Place.2": self.pairs[1][1]}
+        original["User.1"]["updated_at"] = "2024-01-02T03:04:05"
+        with open("test_file.json", "w", encoding="utf-8") as file:
+            json.dump(original, file)
+        self.assertEqual(
+            binary_snapshot.convert("test_file.json", "test_file.bin"),
+            "binary")
+        with open("test_file.bin", "rb") as file:
+            self.assertTrue(binary_snapshot.is_binary(file))
+        self.assertEqual(
+            binary_snapshot.convert("test_file.bin", "test_file.json"),
+            "json")
+        with open("test_file.json", "r", encoding="utf-8") as file:
+            self.assertEqual(json.load(file), original)
+
+    def test_convert_script(self):
+        """Test that convert_snapshot.py converts without reading or
+        migrating the storage file of the working directory
+        """
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))))
+        live = b'{"User.1": {"id": "1", "__class__": "User"}}'
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "file.json"), "wb") as file:
+                file.write(live)
+            with open(os.path.join(directory, "test_file.json"), "w",
+                      encoding="utf-8") as file:
+                json.dump({"City.2": {"id": "2", "__class__": "City"}},
+                          file)
+            env = dict(os.environ, PYTHONPATH=root, HBNB_STORAGE_SHARDS="2")
+            result = subprocess.run(
+                [sys.executable, os.path.join(root, "convert_snapshot.py"),
+                 "test_file.json", "test_file.bin"],
+                cwd=directory, env=env, capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(result.stderr, "")
+            self.assertEqual(result.stdout,
+                             "wrote binary snapshot test_file.bin\n")
+            with open(os.path.join(directory, "test_file.bin"), "rb") as file:
+                self.assertEqual(list(binary_snapshot.read(file)),
+                                 [("City.2", {"id": "2",
+                                              "__class__": "City"})])
+            # The live storage was neither read nor migrated to shards
+            with open(os.path.join(directory, "file.json"), "rb") as file:
+                self.assertEqual(file.read(), live)
+            self.assertFalse(os.path.exists(
+                os.path.join(directory, "file.json.d")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,14 +3,23 @@
 """
 
 
+import asyncio
 import json
+import multiprocessing
 import os
+import shutil
+import sys
+import threading
 import unittest
 from datetime import datetime
+from unittest.mock import patch
+import models
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
+from models.engine import binary_snapshot
 from models.engine.file_storage import FileStorage
+from models.engine.snapshot import atomic_write
 from models.place import Place
 from models.review import Review
 from models.state import State
@@ -27,13 +36,28 @@ class TestFileStorage(unittest.TestCase):
         """Set up resources and  configurations needed for the
         test cases
         """
-        # Create an instance of the FileStorage class
-        self.test_storage = FileStorage()
+        # Create models.storage now: its first access reloads file.json
+        # into the objects every FileStorage shares
+        models.storage
+        # Create an instance of the FileStorage class using the test
+        # file, to avoid modifying the actual JSON file of the program
+        self.test_storage = self.make_storage()
         # Reset the __objects attribute before each test
         FileStorage._FileStorage__objects = {}
-        # Set the FileStorage __file_path attribute to avoid
-        # modifying the actual JSON file used for the program
-        self.test_storage._FileStorage__file_path = "test_file.json"
+
+    @staticmethod
+    def make_storage(**kwargs):
+        """Creates a FileStorage using the test file
+
+        Args:
+            kwargs: Keyword arguments of FileStorage, Eg: shards=2
+
+        Returns:
+            FileStorage: The storage
+        """
+        storage = FileStorage(**kwargs)
+        storage._FileStorage__file_path = "test_file.json"
+        return storage
 
     def tearDown(self):
         """Clean up any resources or configurations to prepare for
@@ -42,6 +66,14 @@ class TestFileStorage(unittest.TestCase):
         # Delete the JSON file used for the tests if it exists
         if os.path.exists("test_file.json"):
             os.remove("test_file.json")
+        # Delete the journal used for the tests if it exists
+        if os.path.exists("test_file.json.log"):
+            os.remove("test_file.json.log")
+        # Delete the lock file of shared mode if it exists
+        if os.path.exists("test_file.json.lock"):
+            os.remove("test_file.json.lock")
+        # Delete the shards used for the tests if they exist
+        shutil.rmtree("test_file.json.d", ignore_errors=True)
 
     def test_all(self):
         """Test the all() method for the FileStorage class
@@ -315,6 +347,798 @@ class TestFileStorage(unittest.TestCase):
         self.test_storage.reload()
         self.assertNotIn("Place." + place.id, self.test_storage.all())
 
+    def test_delete(self):
+        """Test the delete() method
+        """
+        user = User()
+        self.test_storage.new(user)
+        self.test_storage.delete(user)
+        self.assertNotIn("User." + user.id, self.test_storage.all())
+        # Deleting None or a missing object does nothing
+        self.test_storage.delete(None)
+        self.test_storage.delete(user)
+
+    def test_all_count_class(self):
+        """Test all() and count() restricted to one class
+        """
+        users = [User(), User()]
+        city = City()
+        for obj in users + [city]:
+            self.test_storage.new(obj)
+        self.assertEqual(self.test_storage.count(), 3)
+        self.assertEqual(self.test_storage.count(User), 2)
+        self.assertEqual(self.test_storage.count("City"), 1)
+        self.assertEqual(self.test_storage.count(Review), 0)
+        self.assertEqual(set(self.test_storage.all(User).values()),
+                         set(users))
+        self.assertEqual(self.test_storage.all("City"),
+                         {"City." + city.id: city})
+        # Deleting through the dictionary keeps the classes in sync
+        del self.test_storage.all()["City." + city.id]
+        self.assertEqual(self.test_storage.count(City), 0)
+
+    def test_query(self):
+        """Test query() on indexed attributes kept up to date by new(),
+        touch() and delete()
+        """
+        timestamp = datetime.isoformat(datetime.now())
+        cheap = Place(id="1", created_at=timestamp, updated_at=timestamp,
+                      city_id="c1", price_by_night=50)
+        dear = Place(id="2", created_at=timestamp, updated_at=timestamp,
+                     city_id="c1", price_by_night=200)
+        self.test_storage.new(cheap)
+        self.test_storage.new(dear)
+        self.assertEqual(self.test_storage.query(Place, city_id="c1"),
+                         {"Place.1": cheap, "Place.2": dear})
+        self.assertEqual(
+            self.test_storage.query("Place", price_by_night__lt=100),
+            {"Place.1": cheap})
+        # An update is picked up once the object is touched
+        dear.price_by_night = "80"
+        self.test_storage.touch(dear)
+        self.assertEqual(
+            len(self.test_storage.query(Place, price_by_night__lt=100)), 2)
+        self.test_storage.delete(cheap)
+        self.assertEqual(self.test_storage.query(Place, city_id="c1"),
+                         {"Place.2": dear})
+        with self.assertRaises(ValueError):
+            self.test_storage.query(Place, city_id__like="c")
+
+    def test_add_index(self):
+        """Test declaring an index on an attribute
+        """
+        place = Place()
+        place.max_guest = 4
+        self.test_storage.new(place)
+        self.test_storage.add_index(Place, "max_guest", "sorted")
+        self.assertEqual(self.test_storage.query(Place, max_guest__ge=3),
+                         {"Place." + place.id: place})
+        with self.assertRaises(ValueError):
+            self.test_storage.add_index(Place, "name", "btree")
+        del FileStorage._FileStorage__indexes["Place"]["max_guest"]
+
+    def test_places_near(self):
+        """Test radius and bounding-box searches kept up to date by new(),
+        touch() and delete(), and that lazy mode only builds the places
+        found
+        """
+        paris, london, suva = Place(), Place(), Place()
+        for place, latitude, longitude in [(paris, 48.8566, 2.3522),
+                                           (london, 51.5074, -0.1278),
+                                           (suva, -18.1416, 178.4419)]:
+            place.latitude, place.longitude = latitude, longitude
+            self.test_storage.new(place)
+        self.assertEqual(self.test_storage.places_near(48.86, 2.35, 10),
+                         [paris])
+        self.assertEqual(self.test_storage.places_near(51, 0, 400),
+                         [london, paris])
+        self.assertEqual(self.test_storage.places_near(51, 0, 400, 1),
+                         [london])
+        self.assertEqual(
+            self.test_storage.places_within(-20, 170, -10, -170),
+            {"Place." + suva.id: suva})
+        # A move is picked up once the place is saved
+        london.latitude, london.longitude = "48.85", "2.34"
+        london.save()
+        self.assertEqual(len(self.test_storage.places_near(48.86, 2.35, 10)),
+                         2)
+        self.test_storage.delete(paris)
+        self.assertEqual(self.test_storage.places_near(48.86, 2.35, 10),
+                         [london])
+        with self.assertRaises(ValueError):
+            self.test_storage.places_near(95, 0, 10)
+        with self.assertRaises(ValueError):
+            self.test_storage.places_near(0, 0, -1)
+        self.test_storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = self.make_storage(lazy=True)
+        storage.reload()
+        self.assertEqual(
+            [place.id for place in storage.places_near(48.86, 2.35, 10)],
+            [london.id])
+        self.assertEqual(storage.all().unbuilt, 1)
+
+    def test_indexes_built_by_query(self):
+        """Test that reload() leaves the indexes of a class to its first
+        query, which builds them from every object at once
+        """
+        places = []
+        for price in (300, 100, 200):
+            place = Place()
+            place.price_by_night = price
+            self.test_storage.new(place)
+            places.append(place)
+        self.test_storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.test_storage.reload()
+        objects = FileStorage._FileStorage__objects
+        self.assertNotIn("Place", objects.indexes)
+        self.assertEqual(
+            [place.id for place in self.test_storage.where(
+                Place, {"price_by_night__ge": 150}, "price_by_night")],
+            [places[2].id, places[0].id])
+        index = objects.indexes["Place"]["price_by_night"]
+        self.assertEqual([value for value, _ in index.entries],
+                         [100.0, 200.0, 300.0])
+        self.assertIn("city_id", objects.indexes["Place"])
+        self.assertNotIn("name,description", objects.indexes["Place"])
+
+    def test_where(self):
+        """Test ordered pages of the objects matching predicates
+        """
+        places = []
+        for number in range(6):
+            place = Place()
+            place.city_id = "c{}".format(number % 2)
+            place.price_by_night = number * 10
+            self.test_storage.new(place)
+            places.append(place)
+        self.assertEqual(
+            self.test_storage.where(Place, {"city_id": "c1"},
+                                    "-price_by_night", limit=2),
+            [places[5], places[3]])
+        self.assertEqual(
+            self.test_storage.where("Place", {"price_by_night__ge": 10},
+                                    "price_by_night", limit=2, offset=1),
+            [places[2], places[3]])
+        self.assertEqual(len(self.test_storage.where(Place)), 6)
+        self.assertEqual(self.test_storage.where(User, {"email": "a"}), [])
+        for limit, offset in [(-1, 0), (1, -1), ("1", 0)]:
+            with self.assertRaises(ValueError):
+                self.test_storage.where(Place, {}, None, limit, offset)
+        with self.assertRaises(ValueError):
+            self.test_storage.where(Place, {"city_id__like": "c"})
+
+    def test_search(self):
+        """Test ranked full-text searches with an index built by the
+        first search and kept up to date by touch() and delete()
+        """
+        quiet, noisy, other = Review(), Review(), Review()
+        quiet.text = "Quiet room with a pool, a great pool"
+        noisy.text = "Noisy pool"
+        other.text = "Quiet street"
+        for review in (quiet, noisy, other):
+            self.test_storage.new(review)
+        objects = FileStorage._FileStorage__objects
+        self.assertNotIn("text", objects.indexes.get("Review", {}))
+        self.assertEqual(self.test_storage.search(Review, "quiet pool"),
+                         [quiet])
+        self.assertIn("text", objects.indexes["Review"])
+        self.assertEqual(len(self.test_storage.search("Review", "qui*")), 2)
+        self.assertEqual(self.test_storage.search(Review, "pool", 1),
+                         [noisy])
+        # Equality queries do not read the text index
+        self.assertEqual(self.test_storage.query(Review, text="Noisy pool"),
+                         {"Review." + noisy.id: noisy})
+        noisy.text = "Silent"
+        noisy.save()
+        self.test_storage.delete(other)
+        self.assertEqual(self.test_storage.search(Review, "pool"), [quiet])
+        self.assertEqual(self.test_storage.search(Review, "quiet"), [quiet])
+        place = Place()
+        place.name, place.description = "Loft", "Pool table"
+        self.test_storage.new(place)
+        self.assertEqual(self.test_storage.search(Place, "loft pool"),
+                         [place])
+        with self.assertRaises(ValueError):
+            self.test_storage.search(User, "john")
+        with self.assertRaises(ValueError):
+            self.test_storage.search(Review, "pool", -1)
+
+    def test_places_near_without_grid(self):
+        """Test that searches fall back to range queries without a grid
+        index
+        """
+        place = Place()
+        place.latitude, place.longitude = 10, 179.9
+        self.test_storage.new(place)
+        indexes = FileStorage._FileStorage__indexes["Place"]
+        with patch.dict(indexes):
+            del indexes["latitude,longitude"]
+            self.assertEqual(self.test_storage.places_near(10, -179.9, 30),
+                             [place])
+            self.assertEqual(self.test_storage.places_near(10, 179, 30), [])
+            self.assertEqual(len(self.test_storage.places_within(
+                0, 170, 20, -170)), 1)
+
+    def test_lazy_reload(self):
+        """Test that lazy mode builds objects on first access only and
+        writes untouched ones back unchanged
+        """
+        timestamp = datetime.isoformat(datetime.now())
+        for number in range(3):
+            self.test_storage.new(City(id=str(number), created_at=timestamp,
+                                       updated_at=timestamp, state_id="s1"))
+        self.test_storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = self.make_storage(lazy=True)
+        storage.reload()
+        objects = storage.all()
+        self.assertEqual(objects.unbuilt, 3)
+        self.assertEqual(storage.count(City), 3)
+        # Queries only build the objects they return
+        self.assertEqual(list(storage.query(City, id="1")), ["City.1"])
+        self.assertEqual(objects.unbuilt, 2)
+        self.assertEqual(len(storage.query(City, state_id="s1")), 3)
+        self.assertEqual(objects.unbuilt, 0)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        city = storage.all().get("City.2")
+        # Building an object does not mark it as changed
+        self.assertEqual(FileStorage._FileStorage__pending, {})
+        city.name = "Accra"
+        storage.save()
+        with open("test_file.json", "r", encoding="utf-8") as file:
+            saved = json.load(file)
+        self.assertEqual(saved["City.2"]["name"], "Accra")
+        self.assertEqual(saved["City.0"]["created_at"], timestamp)
+
+    def test_batch(self):
+        """Test that saves inside batch() blocks are deferred to the end
+        of the outermost block
+        """
+        user = User()
+        self.test_storage.new(user)
+        with self.test_storage.batch() as storage:
+            self.assertIs(storage, self.test_storage)
+            self.test_storage.save()
+            with self.test_storage.batch():
+                self.test_storage.save()
+            self.assertFalse(os.path.exists("test_file.json"))
+        self.assertTrue(os.path.exists("test_file.json"))
+        os.remove("test_file.json")
+        # A block without saves writes nothing
+        with self.test_storage.batch():
+            pass
+        self.assertFalse(os.path.exists("test_file.json"))
+        # The deferred save still runs when the block raises
+        with self.assertRaises(KeyError):
+            with self.test_storage.batch():
+                self.test_storage.save()
+                raise KeyError
+        self.assertTrue(os.path.exists("test_file.json"))
+
+    def test_dirty_tracking(self):
+        """Test that setting an attribute marks the object as changed and
+        that save() only encodes the changed objects again
+        """
+        users = [User() for _ in range(3)]
+        for user in users:
+            self.test_storage.new(user)
+        self.test_storage.save()
+        users[1].first_name = "Ama"
+        with patch.object(User, "to_dict", autospec=True,
+                          side_effect=User.to_dict) as to_dict:
+            self.test_storage.save()
+        self.assertEqual(to_dict.call_count, 1)
+        self.assertIs(to_dict.call_args[0][0], users[1])
+        FileStorage._FileStorage__objects = {}
+        self.test_storage.reload()
+        key = "User." + users[1].id
+        self.assertEqual(self.test_storage.all()[key].first_name, "Ama")
+        # Attributes set on an object that is not stored are ignored
+        User(id="loose").first_name = "Kofi"
+        self.assertNotIn("User.loose", self.test_storage.all())
+
+    def test_background_save(self):
+        """Test that background mode writes the file in the writer
+        thread and that flush() waits for the write
+        """
+        storage = self.make_storage(background=True)
+        users = [User() for _ in range(3)]
+        for user in users:
+            storage.new(user)
+            storage.save()
+        storage.flush()
+        with open("test_file.json", "r", encoding="utf-8") as file:
+            saved = json.load(file)
+        self.assertEqual(set(saved), {"User." + user.id for user in users})
+        self.assertFalse(os.path.exists("test_file.json.tmp"))
+
+    def test_binary_format(self):
+        """Test that binary mode writes a binary snapshot and that
+        reload() reads both formats
+        """
+        user = User()
+        user.first_name = "Esi"
+        self.test_storage.new(user)
+        self.test_storage.save()
+        # A JSON file is read by a binary storage and written back binary
+        storage = self.make_storage(file_format="binary")
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        storage.save()
+        with open("test_file.json", "rb") as file:
+            self.assertTrue(binary_snapshot.is_binary(file))
+        for reader in (self.test_storage, storage):
+            FileStorage._FileStorage__objects = {}
+            reader.reload()
+            loaded = reader.all()["User." + user.id]
+            self.assertEqual(loaded.to_dict(), user.to_dict())
+        # Records of lazy mode are written back as JSON
+        lazy = self.make_storage(lazy=True)
+        FileStorage._FileStorage__objects = {}
+        lazy.reload()
+        lazy.save()
+        with open("test_file.json", "r", encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["User." + user.id],
+                             user.to_dict())
+
+    def test_indexed_format(self):
+        """Test that get() reads single objects of an indexed snapshot
+        and that other methods load the rest
+        """
+        storage = self.make_storage(file_format="indexed")
+        users = [User() for _ in range(20)]
+        for user in users:
+            storage.new(user)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        objects = FileStorage._FileStorage__objects
+        self.assertEqual(dict.__len__(objects), 0)
+        user = storage.get(User, users[3].id)
+        self.assertEqual(user.to_dict(), users[3].to_dict())
+        self.assertIsNone(storage.get(User, "missing"))
+        self.assertEqual(dict.__len__(objects), 1)
+        # A changed object is kept when the others are loaded
+        user.first_name = "Yaw"
+        self.assertEqual(storage.count(User), 20)
+        self.assertIs(storage.get(User, users[3].id), user)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.test_storage.reload()
+        self.assertEqual(self.test_storage.count(User), 20)
+        key = "User." + users[3].id
+        self.assertEqual(self.test_storage.all()[key].first_name, "Yaw")
+        with self.assertRaises(ValueError):
+            FileStorage(file_format="xml")
+
+    def test_indexed_format_delete(self):
+        """Test that an object deleted after get() read it from an
+        indexed snapshot is not read back by get() or the next save
+        """
+        storage = self.make_storage(file_format="indexed")
+        users = [User() for _ in range(3)]
+        for user in users:
+            storage.new(user)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        storage.delete(storage.get(User, users[0].id))
+        self.assertIsNone(storage.get(User, users[0].id))
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertIsNone(storage.get(User, users[0].id))
+        self.assertEqual(storage.count(User), 2)
+
+    def test_shards_save(self):
+        """Test that a sharded save only rewrites the files holding
+        changed objects
+        """
+        storage = self.make_storage(shards=2)
+        users = [User() for _ in range(10)]
+        city = City()
+        for obj in users + [city]:
+            storage.new(obj)
+        storage.save()
+        self.assertFalse(os.path.exists("test_file.json"))
+        layout = storage._FileStorage__layout()
+        expected = {"{}.{}.json".format(type(obj).__name__,
+                                        layout.bucket(obj.id))
+                    for obj in users + [city]}
+        self.assertEqual(set(os.listdir("test_file.json.d")),
+                         expected | {"manifest.json"})
+        city.name = "Tema"
+        with patch("models.engine.file_storage.atomic_write",
+                   wraps=atomic_write) as write:
+            storage.save()
+        self.assertEqual([call[0][0] for call in write.call_args_list],
+                         [layout.path(("City", layout.bucket(city.id)))])
+
+    def test_shards_reload(self):
+        """Test that a sharded reload only reads the shards in use
+        """
+        storage = self.make_storage(shards=4)
+        users = [User() for _ in range(20)]
+        city = City()
+        for obj in users + [city]:
+            storage.new(obj)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        in_memory = FileStorage._FileStorage__objects
+        self.assertEqual(dict.__len__(in_memory), 0)
+        # get() reads the shard of the id only
+        user = storage.get(User, users[0].id)
+        self.assertEqual(user.to_dict(), users[0].to_dict())
+        layout = storage._FileStorage__layout()
+        bucket = layout.bucket(users[0].id)
+        self.assertEqual(dict.__len__(in_memory), len(
+            [obj for obj in users if layout.bucket(obj.id) == bucket]))
+        self.assertEqual(storage.count(City), 1)
+        self.assertEqual(storage.count(User), 20)
+        self.assertEqual(len(storage.all()), 21)
+        # Deleting and creating only rewrite loaded shards
+        storage.delete(user)
+        storage.new(City())
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 21)
+        self.assertIsNone(storage.get(User, users[0].id))
+
+    def test_shards_migration(self):
+        """Test that the single file is moved into shards and that
+        shards written with another number of buckets are rewritten
+        """
+        users = [User() for _ in range(6)]
+        for user in users:
+            self.test_storage.new(user)
+        self.test_storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = self.make_storage(shards=3)
+        storage.reload()
+        self.assertEqual(storage.count(User), 6)
+        layout = storage._FileStorage__layout()
+        self.assertTrue(layout.current())
+        self.assertEqual(set(os.listdir("test_file.json.d")),
+                         {"User.{}.json".format(layout.bucket(user.id))
+                          for user in users} | {"manifest.json"})
+        FileStorage._FileStorage__objects = {}
+        storage = self.make_storage(shards=1)
+        storage.reload()
+        self.assertEqual(storage.count(User), 6)
+        storage.save()
+        self.assertEqual(sorted(os.listdir("test_file.json.d")),
+                         ["User.0.json", "manifest.json"])
+        with self.assertRaises(ValueError):
+            FileStorage(journal=True, shards=2)
+
+    @staticmethod
+    def in_process(target, *args):
+        """Runs a function in a forked process, like another console
+
+        Args:
+            target (callable): The function
+            args: Arguments of the function
+
+        Returns:
+            multiprocessing.Process: The started process
+        """
+        process = multiprocessing.get_context("fork").Process(
+            target=target, args=args)
+        process.start()
+        return process
+
+    def test_shared_sync(self):
+        """Test that shared mode picks up the objects another process
+        saved, keeping the objects that did not change and the changes
+        not saved yet
+        """
+        storage = self.make_storage(shared=True)
+        users = [User() for _ in range(3)]
+        for user in users:
+            storage.new(user)
+        storage.save()
+
+        def other():
+            storage = self.make_storage(shared=True)
+            storage.get(User, users[0].id).first_name = "Yaw"
+            storage.get(User, users[1].id).first_name = "Abena"
+            storage.delete(storage.get(User, users[2].id))
+            storage.new(City(id="accra", created_at=0, updated_at=0))
+            storage.save()
+
+        users[1].first_name = "Adwoa"
+        process = self.in_process(other)
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(storage.get(User, users[0].id).first_name, "Yaw")
+        # Changes not saved here win over the file
+        self.assertIs(storage.get(User, users[1].id), users[1])
+        self.assertEqual(users[1].first_name, "Adwoa")
+        self.assertIsNone(storage.get(User, users[2].id))
+        self.assertIsNotNone(storage.get(City, "accra"))
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get(User, users[1].id).first_name, "Adwoa")
+        self.assertEqual(storage.count(), 3)
+        with self.assertRaises(ValueError):
+            FileStorage(shared=True, journal=True)
+
+    def test_shared_processes(self):
+        """Test that processes saving one file at once lose no update
+        """
+        def worker(number):
+            storage = self.make_storage(shared=True)
+            for item in range(20):
+                user = User(id="{}-{}".format(number, item),
+                            created_at=0, updated_at=0)
+                storage.new(user)
+                storage.save()
+                if item % 4 == 3:
+                    storage.delete(user)
+                    storage.save()
+
+        processes = [self.in_process(worker, number)
+                     for number in range(4)]
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        storage = self.make_storage(shared=True)
+        storage.reload()
+        self.assertEqual(set(storage.all(User)), {
+            "User.{}-{}".format(number, item)
+            for number in range(4) for item in range(20) if item % 4 != 3})
+
+    def test_threadsafe_batch(self):
+        """Test that a batch() block open in one thread does not defer
+        the saves of another
+        """
+        storage = self.make_storage(threadsafe=True)
+        opened, done = threading.Event(), threading.Event()
+
+        def hold():
+            # Keep a batch open until the other thread saved
+            with storage.batch():
+                opened.set()
+                done.wait(5)
+        thread = threading.Thread(target=hold)
+        thread.start()
+        try:
+            opened.wait(5)
+            user = User()
+            storage.new(user)
+            storage.save()
+            with open("test_file.json", "r", encoding="utf-8") as file:
+                self.assertIn("User." + user.id, json.load(file))
+        finally:
+            done.set()
+            thread.join()
+
+    def test_threadsafe_stress(self):
+        """Test that reader and writer threads using one thread-safe
+        storage at once neither fail nor lose an update
+        """
+        storage = self.make_storage(threadsafe=True)
+        errors = []
+        kept = set()
+        done = threading.Event()
+
+        def writer():
+            try:
+                for item in range(20):
+                    place = Place()
+                    place.price_by_night = item
+                    place.save()
+                    if item % 5 == 4:
+                        storage.delete(place)
+                        storage.save()
+                    else:
+                        kept.add("Place." + place.id)
+            except Exception as error:
+                errors.append(error)
+
+        def reader():
+            try:
+                while not done.is_set():
+                    for obj in storage.all().values():
+                        obj.to_dict()
+                    for obj in storage.all(Place).values():
+                        str(obj)
+                    storage.count(Place)
+                    for obj in storage.query(
+                            Place, price_by_night__ge=10).values():
+                        self.assertGreaterEqual(obj.price_by_night, 10)
+            except Exception as error:
+                errors.append(error)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        try:
+            with patch("models.storage", storage):
+                writers = [threading.Thread(target=writer)
+                           for _ in range(4)]
+                readers = [threading.Thread(target=reader)
+                           for _ in range(4)]
+                for thread in writers + readers:
+                    thread.start()
+                for thread in writers:
+                    thread.join()
+                done.set()
+                for thread in readers:
+                    thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+        self.assertEqual(set(storage.all(Place)), kept)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(set(storage.all(Place)), kept)
+
+    def test_asave(self):
+        """Test that asave() calls made at once write the file once or
+        twice, yielding to the event loop while objects are encoded
+        """
+        users = [User() for _ in range(1200)]
+        for user in users:
+            self.test_storage.new(user)
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        async def main():
+            task = asyncio.create_task(ticker())
+            await asyncio.sleep(0)
+            ticks.clear()
+            await asyncio.gather(*(self.test_storage.asave()
+                                   for _ in range(10)))
+            task.cancel()
+
+        with patch("models.engine.file_storage.atomic_write",
+                   wraps=atomic_write) as write:
+            asyncio.run(main())
+        self.assertIn(write.call_count, (1, 2))
+        # The loop ran between the slices of 500 objects
+        self.assertGreaterEqual(len(ticks), 3)
+        FileStorage._FileStorage__objects = {}
+        self.test_storage.reload()
+        self.assertEqual(self.test_storage.count(User), 1200)
+
+    def test_asave_changes(self):
+        """Test that changes and saves made while asave() runs are kept,
+        and that errors reach every caller
+        """
+        users = [User() for _ in range(3)]
+        for user in users:
+            self.test_storage.new(user)
+
+        async def main():
+            save = asyncio.ensure_future(self.test_storage.asave())
+            await asyncio.sleep(0)
+            users[0].first_name = "Kwame"
+            self.test_storage.save()
+            users[1].first_name = "Akua"
+            await save
+            self.assertIs(await self.test_storage.aget(User, users[0].id),
+                          users[0])
+            self.assertIsNone(await self.test_storage.aget(User, "0"))
+
+        asyncio.run(main())
+        with open("test_file.json", "r", encoding="utf-8") as file:
+            saved = json.load(file)
+        self.assertEqual(saved["User." + users[0].id]["first_name"],
+                         "Kwame")
+        self.assertEqual(saved["User." + users[1].id]["first_name"],
+                         "Akua")
+        with patch("models.engine.file_storage.atomic_write",
+                   side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                asyncio.run(self.test_storage.asave())
+
+    def test_journal_crash_restart(self):
+        """Test that changes saved after restarting from a crash in the
+        middle of an append survive the next restart
+        """
+        storage = self.make_storage(journal=True, compact_threshold=4)
+        first = User()
+        storage.new(first)
+        storage.save()
+        # A crash tears the next record
+        with open("test_file.json.log", "a", encoding="utf-8") as file:
+            file.write('["set", "User.x", {"id"')
+        # Restart, then save a new user
+        FileStorage._FileStorage__objects = {}
+        storage = self.make_storage(journal=True, compact_threshold=4)
+        storage.reload()
+        second = User()
+        storage.new(second)
+        storage.save()
+        # Restart again
+        FileStorage._FileStorage__objects = {}
+        storage = self.make_storage(journal=True, compact_threshold=4)
+        storage.reload()
+        self.assertEqual(set(storage.all()),
+                         {"User." + first.id, "User." + second.id})
+
+    def test_journal_crash_compaction(self):
+        """Test that a crash after compaction wrote the JSON file, and
+        before it cleared the log, does not bring back older records
+        """
+        storage = self.make_storage(journal=True, compact_threshold=2)
+        user = User()
+        storage.new(user)
+        storage.save()
+        user.first_name = "v1"
+        storage.save()
+        # The next save goes past the threshold and compacts
+        user.first_name = "v2"
+        storage.touch(user)
+        with patch("models.engine.file_storage.Journal.clear",
+                   side_effect=OSError("crash")):
+            with self.assertRaises(OSError):
+                storage.save()
+        self.assertTrue(os.path.exists("test_file.json"))
+        # Restart
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get(User, user.id).first_name, "v2")
+
+    def test_journal_save(self):
+        """Test that journal mode appends changes instead of rewriting
+        the JSON file
+        """
+        storage = self.make_storage(journal=True, compact_threshold=4)
+        user = User()
+        storage.new(user)
+        storage.save()
+        # The object went to the log, not the JSON file
+        self.assertFalse(os.path.exists("test_file.json"))
+        self.assertTrue(os.path.exists("test_file.json.log"))
+        # Update and delete are recorded too, without calling touch()
+        user.first_name = "James"
+        storage.save()
+        city = City()
+        storage.new(city)
+        storage.delete(city)
+        storage.save()
+        # Reload from the log only
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        objects = storage.all()
+        self.assertEqual(objects["User." + user.id].first_name, "James")
+        self.assertNotIn("City." + city.id, objects)
+
+    def test_journal_compaction(self):
+        """Test that the log is folded into the JSON file once it grows
+        past the compaction threshold
+        """
+        storage = self.make_storage(journal=True, compact_threshold=4)
+        users = [User() for _ in range(3)]
+        for user in users:
+            storage.new(user)
+        storage.save()
+        self.assertFalse(os.path.exists("test_file.json"))
+        # Two more records go past the threshold of 4
+        storage.touch(users[0])
+        storage.touch(users[1])
+        storage.save()
+        self.assertTrue(os.path.exists("test_file.json"))
+        self.assertFalse(os.path.exists("test_file.json.log"))
+        # Changes after compaction land in the log again
+        storage.delete(users[2])
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertIn("User." + users[0].id, storage.all())
+        self.assertNotIn("User." + users[2].id, storage.all())
+
 
 if __name__ == "__main__":
     unittest.main()
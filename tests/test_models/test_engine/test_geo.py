@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""Unit tests for the geo module
+"""
+
+
+import unittest
+from models.engine import geo
+
+
+class TestGeo(unittest.TestCase):
+    """distance_km(), split_box() and boxes_around() test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def test_distance(self):
+        """Test great-circle distances between known points
+        """
+        # Paris to London
+        self.assertAlmostEqual(
+            geo.distance_km(48.8566, 2.3522, 51.5074, -0.1278), 343.6,
+            delta=0.5)
+        # One degree of longitude on the equator, across the antimeridian
+        self.assertAlmostEqual(geo.distance_km(0, 179.5, 0, -179.5),
+                               111.2, delta=0.1)
+        self.assertEqual(geo.distance_km(10, 20, 10, 20), 0)
+
+    def test_check_point(self):
+        """Test that invalid coordinates are refused
+        """
+        geo.check_point(90, 540)
+        for latitude, longitude in [(91, 0), (float("nan"), 0),
+                                    (0, float("inf"))]:
+            with self.assertRaises(ValueError):
+                geo.check_point(latitude, longitude)
+        self.assertEqual(geo.wrap_longitude(190), -170)
+        self.assertEqual(geo.wrap_longitude(-180), -180)
+
+    def test_split_box(self):
+        """Test that boxes crossing the antimeridian are split
+        """
+        self.assertEqual(geo.split_box(0, 10, 1, 20), [(0, 10, 1, 20)])
+        self.assertEqual(geo.split_box(0, 170, 1, -170),
+                         [(0, 170, 1, 180), (0, -180, 1, -170)])
+        self.assertEqual(geo.split_box(0, 175, 1, 185),
+                         [(0, 175, 1, 180), (0, -180, 1, -175)])
+        self.assertEqual(geo.split_box(0, -200, 1, 200),
+                         [(0, -180, 1, 180)])
+
+    def test_boxes_around(self):
+        """Test that the boxes hold the circle
+        """
+        (south, west, north, east), = geo.boxes_around(60, 10, 100)
+        # The circle touches the northern bound and the eastern meridian
+        self.assertAlmostEqual(north - 60, 0.899, places=3)
+        self.assertAlmostEqual(60 - south, 0.899, places=3)
+        closest = min(geo.distance_km(60, 10, 59 + step / 1000, east)
+                      for step in range(2000))
+        self.assertAlmostEqual(closest, 100, delta=0.01)
+        self.assertAlmostEqual(west, 20 - east)
+        self.assertEqual(len(geo.boxes_around(0, 179.9, 50)), 2)
+        # A circle covering the pole spans every longitude
+        (_, west, north, east), = geo.boxes_around(89.5, 0, 100)
+        self.assertEqual((west, north, east), (-180, 90, 180))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""Unit tests for the indexed_snapshot module
+"""
+
+
+import json
+import os
+import unittest
+from models.engine import indexed_snapshot
+from models.engine.indexed_snapshot import IndexedSnapshot
+
+
+class TestIndexedSnapshot(unittest.TestCase):
+    """indexed_snapshot test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Write a test snapshot
+        """
+        self.pairs = [("User.{}".format(number),
+                       json.dumps({"id": str(number), "name": "é" * number}))
+                      for number in range(50)]
+        with open("test_file.json", "wb") as file:
+            indexed_snapshot.dump(self.pairs, file)
+        self.snapshot = IndexedSnapshot("test_file.json")
+
+    def tearDown(self):
+        """Close and delete the test snapshot
+        """
+        self.snapshot.close()
+        os.remove("test_file.json")
+
+    def test_get(self):
+        """Test looking up single objects
+        """
+        for key, text in self.pairs:
+            self.assertEqual(self.snapshot.get(key), text)
+        self.assertIsNone(self.snapshot.get("User.50"))
+        self.assertIsNone(self.snapshot.get("City.1"))
+
+    def test_iter(self):
+        """Test that iterating yields every object in order
+        """
+        self.assertEqual(list(self.snapshot), self.pairs)
+
+    def test_is_indexed(self):
+        """Test the detection of the format
+        """
+        with open("test_file.json", "rb") as file:
+            self.assertTrue(indexed_snapshot.is_indexed(file))
+            self.assertEqual(file.tell(), 0)
+
+    def test_empty(self):
+        """Test a snapshot without objects
+        """
+        with open("test_file.json", "wb") as file:
+            indexed_snapshot.dump([], file)
+        snapshot = IndexedSnapshot("test_file.json")
+        self.assertIsNone(snapshot.get("User.1"))
+        self.assertEqual(list(snapshot), [])
+        snapshot.close()
+
+    def test_invalid(self):
+        """Test that other files are rejected
+        """
+        for data in (b"", b'{"User.1": {}}', indexed_snapshot.MAGIC):
+            with open("test_file.json", "wb") as file:
+                file.write(data)
+            with self.assertRaises(ValueError):
+                IndexedSnapshot("test_file.json")
+
+
+if __name__ == "__main__":
+    unittest.main()
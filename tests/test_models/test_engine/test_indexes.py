@@ -0,0 +1,270 @@
+#!/usr/bin/python3
+"""Unit tests for the attribute indexes
+"""
+
+
+import unittest
+from models.engine.indexes import GridIndex, HashIndex, SortedIndex
+from models.engine.indexes import TextIndex, normalize, tokenize
+
+
+class Thing:
+    """A plain object with a few attributes
+    """
+    def __init__(self, **kwargs):
+        """Sets the given attributes
+        """
+        self.__dict__.update(kwargs)
+
+
+class TestNormalize(unittest.TestCase):
+    """normalize() test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def test_normalize(self):
+        """Test that numeric values compare as floats
+        """
+        self.assertEqual(normalize(3), 3.0)
+        self.assertEqual(normalize("3"), 3.0)
+        self.assertEqual(normalize("abc"), "abc")
+        self.assertIs(normalize(True), True)
+        self.assertEqual(normalize([1]), [1])
+
+
+class TestHashIndex(unittest.TestCase):
+    """HashIndex class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def test_add_lookup_discard(self):
+        """Test adding, looking up, re-indexing and discarding
+        """
+        index = HashIndex("state_id")
+        city = Thing(state_id="s1")
+        index.add("City.1", city)
+        index.add("City.2", Thing(state_id="s2"))
+        self.assertEqual(index.lookup("s1"), ["City.1"])
+        # Re-adding moves the object to its new value
+        city.state_id = "s2"
+        index.add("City.1", city)
+        self.assertEqual(index.lookup("s1"), [])
+        self.assertEqual(sorted(index.lookup("s2")), ["City.1", "City.2"])
+        index.discard("City.2")
+        index.discard("City.3")
+        self.assertEqual(index.lookup("s2"), ["City.1"])
+
+    def test_unhashable(self):
+        """Test that unhashable values are left out
+        """
+        index = HashIndex("amenity_ids")
+        index.add("Place.1", Thing(amenity_ids=[]))
+        self.assertEqual(index.values, {})
+        self.assertEqual(index.lookup([]), [])
+
+
+class TestSortedIndex(unittest.TestCase):
+    """SortedIndex class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Index five objects by price
+        """
+        self.index = SortedIndex("price")
+        for price in [50, 10, "30", 40, 20]:
+            self.index.add("Place.{}".format(price), Thing(price=price))
+        self.index.add("Place.x", Thing(price="free"))
+
+    def test_range(self):
+        """Test range lookups with inclusive and exclusive bounds
+        """
+        self.assertEqual(self.index.range(20, 40),
+                         ["Place.20", "Place.30", "Place.40"])
+        self.assertEqual(self.index.range(20, 40, False, False),
+                         ["Place.30"])
+        self.assertEqual(self.index.range(high=20), ["Place.10", "Place.20"])
+        self.assertEqual(self.index.range(low=45), ["Place.50"])
+        self.assertEqual(self.index.lookup("30"), ["Place.30"])
+        # Non numeric values are not indexed
+        self.assertNotIn("Place.x", self.index.values)
+
+    def test_discard(self):
+        """Test that discarded objects leave the index
+        """
+        self.index.discard("Place.30")
+        self.assertEqual(self.index.range(20, 40), ["Place.20", "Place.40"])
+        self.index.clear()
+        self.assertEqual(self.index.range(), [])
+
+    def test_nan(self):
+        """Test that NaN values are left out, so replacing one leaves
+        the other entries alone
+        """
+        for value in ["nan", "NaN", float("nan")]:
+            self.index.add("Place.30", Thing(price=value))
+            self.assertNotIn("Place.30", self.index.values)
+        self.index.add("Place.30", Thing(price=35))
+        self.assertEqual(self.index.range(), ["Place.10", "Place.20",
+                                              "Place.30", "Place.40",
+                                              "Place.50"])
+
+    def test_build(self):
+        """Test that build() replaces the entries with those of the
+        objects given, sorted as add() keeps them
+        """
+        self.index.build([("Place.2", Thing(price="20")),
+                          ("Place.1", Thing(price=20)),
+                          ("Place.3", Thing(price=5)),
+                          ("Place.4", Thing(price="nan")),
+                          ("Place.5", Thing(price="free"))])
+        self.assertEqual(self.index.range(), ["Place.3", "Place.1",
+                                              "Place.2"])
+        self.index.discard("Place.1")
+        self.index.add("Place.6", Thing(price=10))
+        self.assertEqual(self.index.range(high=15), ["Place.3", "Place.6"])
+
+
+class TestGridIndex(unittest.TestCase):
+    """GridIndex class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Index a few cities by position
+        """
+        self.index = GridIndex("latitude,longitude")
+        for key, latitude, longitude in [
+                ("Place.paris", 48.8566, 2.3522),
+                ("Place.versailles", "48.8049", "2.1204"),
+                ("Place.london", 51.5074, -0.1278),
+                ("Place.suva", -18.1416, 178.4419),
+                ("Place.apia", -13.8507, -171.7514),
+                ("Place.pole", 90, 0)]:
+            self.index.add(key, Thing(latitude=latitude,
+                                      longitude=longitude))
+        self.index.add("Place.x", Thing(latitude="north", longitude=0))
+        self.index.add("Place.y", Thing(latitude=100, longitude=0))
+
+    def test_near(self):
+        """Test radius lookups, nearest first
+        """
+        near = self.index.near(48.86, 2.35, 20)
+        self.assertEqual([key for _, key in near],
+                         ["Place.paris", "Place.versailles"])
+        self.assertAlmostEqual(near[1][0], 17.9, delta=0.1)
+        self.assertEqual(self.index.near(48.86, 2.35, 1000, limit=1),
+                         [near[0]])
+        self.assertEqual(len(self.index.near(48.86, 2.35, 400)), 3)
+        # Across the antimeridian and around the pole
+        self.assertEqual([key for _, key in self.index.near(-16, 180, 1000)],
+                         ["Place.suva", "Place.apia"])
+        self.assertEqual([key for _, key in self.index.near(89, 120, 200)],
+                         ["Place.pole"])
+        self.assertEqual(len(self.index.near(0, 0, 30000)), 6)
+
+    def test_within(self):
+        """Test bounding-box lookups and invalid positions
+        """
+        self.assertEqual(sorted(self.index.within(48, 2, 49, 3)),
+                         ["Place.paris", "Place.versailles"])
+        self.assertEqual(sorted(self.index.within(-20, 170, -10, -170)),
+                         ["Place.apia", "Place.suva"])
+        self.assertEqual(self.index.lookup((48.8566, 2.3522)),
+                         ["Place.paris"])
+        self.assertEqual(len(self.index.within(-90, -180, 90, 180)), 6)
+        self.assertNotIn("Place.x", self.index.values)
+        self.assertNotIn("Place.y", self.index.values)
+        with self.assertRaises(ValueError):
+            GridIndex("latitude")
+
+    def test_discard(self):
+        """Test that moved and discarded objects leave their cell
+        """
+        self.index.add("Place.paris", Thing(latitude=51.5, longitude=0))
+        self.assertEqual(self.index.within(48, 2, 49, 3),
+                         ["Place.versailles"])
+        self.index.discard("Place.paris")
+        self.index.discard("Place.versailles")
+        self.assertEqual(self.index.within(48, -1, 52, 3),
+                         ["Place.london"])
+        self.index.clear()
+        self.assertEqual(self.index.cells, {})
+
+
+class TestTextIndex(unittest.TestCase):
+    """TextIndex class and tokenize() test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Index the name and description of a few places
+        """
+        self.index = TextIndex("name, description")
+        for key, name, description in [
+                ("Place.1", "Pool house", "A quiet house with a pool"),
+                ("Place.2", "Loft", "Quiet loft, pool table, pool bar"),
+                ("Place.3", "Cabin", "Quiet cabin by the lake"),
+                ("Place.4", "Flat", 42)]:
+            self.index.add(key, Thing(name=name, description=description))
+
+    def test_tokenize(self):
+        """Test that texts are split into lowercase words
+        """
+        self.assertEqual(tokenize("Great view, GREAT food!"),
+                         ["great", "view", "great", "food"])
+        self.assertEqual(tokenize(" .,"), [])
+
+    def test_search(self):
+        """Test ranked searches holding every term
+        """
+        self.assertEqual(
+            sorted(key for _, key in self.index.search("quiet")),
+            ["Place.1", "Place.2", "Place.3"])
+        # The word the loft repeats ranks it first
+        self.assertEqual([key for _, key in self.index.search("POOL")],
+                         ["Place.2", "Place.1"])
+        self.assertEqual(self.index.lookup("quiet pool"),
+                         ["Place.2", "Place.1"])
+        self.assertEqual(self.index.search("pool lake"), [])
+        self.assertEqual(self.index.search("pool", limit=1),
+                         self.index.search("pool")[:1])
+        self.assertEqual(self.index.search("?!"), [])
+        # Only the text attributes are indexed
+        self.assertEqual(self.index.lookup("flat"), ["Place.4"])
+        self.assertEqual(self.index.lookup("42"), [])
+
+    def test_prefix(self):
+        """Test terms matching the words they start
+        """
+        self.assertEqual(sorted(self.index.lookup("ca* qui*")), ["Place.3"])
+        self.assertEqual(len(self.index.lookup("l*")), 2)
+        self.assertEqual(self.index.lookup("z*"), [])
+        # New words are found once added
+        self.index.add("Place.5", Thing(name="Zen loft"))
+        self.assertEqual(self.index.lookup("ze*"), ["Place.5"])
+
+    def test_discard(self):
+        """Test that changed and discarded objects leave their words
+        """
+        self.index.add("Place.2", Thing(name="Loft", description="Noisy"))
+        self.assertEqual(self.index.lookup("pool"), ["Place.1"])
+        self.index.discard("Place.1")
+        self.index.discard("Place.6")
+        self.assertEqual(self.index.lookup("pool"), [])
+        self.assertNotIn("pool", self.index.postings)
+        self.assertEqual(self.index.lookup("po*"), [])
+        self.assertEqual(self.index.total, 9)
+        self.index.clear()
+        self.assertEqual(self.index.lookup("quiet"), [])
+        with self.assertRaises(ValueError):
+            TextIndex("name,")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""Unit tests for the Journal class
+"""
+
+
+import os
+import unittest
+from models.engine.journal import Journal
+
+
+class TestJournal(unittest.TestCase):
+    """Journal class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Set up a journal writing to a test log file
+        """
+        self.journal = Journal("test_file.json.log")
+
+    def tearDown(self):
+        """Delete the test log file if it exists
+        """
+        if os.path.exists("test_file.json.log"):
+            os.remove("test_file.json.log")
+
+    def test_append_replay(self):
+        """Test that appended records are replayed in order
+        """
+        self.journal.append([["set", "User.1", {"id": "1"}]])
+        self.journal.append([["del", "User.1"], ["set", "City.2", {}]])
+        self.assertEqual(list(self.journal.replay()), [
+            ["set", "User.1", {"id": "1"}],
+            ["del", "User.1"],
+            ["set", "City.2", {}],
+        ])
+
+    def test_replay_missing_file(self):
+        """Test that replaying a missing log yields nothing
+        """
+        self.assertEqual(list(self.journal.replay()), [])
+
+    def test_replay_torn_line(self):
+        """Test that a torn trailing line ends the replay
+        """
+        self.journal.append([["del", "User.1"]])
+        with open("test_file.json.log", "a", encoding="utf-8") as file:
+            file.write('["set", "User.2", {"id"')
+        self.assertEqual(list(self.journal.replay()), [["del", "User.1"]])
+        # The torn line is cut off, so the next records stay readable
+        self.journal.append([["del", "User.3"]])
+        self.assertEqual(list(self.journal.replay()),
+                         [["del", "User.1"], ["del", "User.3"]])
+
+    def test_append_after_missing_newline(self):
+        """Test that append() starts on a new line when the last record
+        lost its newline
+        """
+        with open("test_file.json.log", "w", encoding="utf-8") as file:
+            file.write('["del", "User.1"]')
+        self.journal.append([["del", "User.2"]])
+        self.assertEqual(list(self.journal.replay()),
+                         [["del", "User.1"], ["del", "User.2"]])
+
+    def test_clear(self):
+        """Test that clear() removes the log file
+        """
+        self.journal.append([["del", "User.1"]])
+        self.journal.clear()
+        self.assertFalse(os.path.exists("test_file.json.log"))
+        # Clearing a missing log does not raise
+        self.journal.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""Unit tests for the JSONObjectStream class
+"""
+
+
+from io import StringIO
+import json
+import unittest
+from models.engine.json_stream import JSONObjectStream
+
+
+class TestJSONObjectStream(unittest.TestCase):
+    """JSONObjectStream class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def stream(self, text, chunk_size=4):
+        """Reads the pairs of a JSON text in small chunks
+
+        Args:
+            text (str): The JSON text
+            chunk_size (int): Number of characters read at a time
+
+        Returns:
+            list: The pairs of the object
+        """
+        return list(JSONObjectStream(StringIO(text), chunk_size))
+
+    def test_pairs(self):
+        """Test that pairs split across chunks are decoded in order
+        """
+        data = {
+            "User.1": {"id": "1", "first_name": "Jo\"hn", "age": 12345},
+            "City.2": {"id": "2", "list": [1, 2.5, None, True]},
+            "Place.3": {},
+        }
+        text = json.dumps(data, indent=2)
+        for chunk_size in [1, 3, 7, 65536]:
+            self.assertEqual(self.stream(text, chunk_size),
+                             list(data.items()))
+
+    def test_empty(self):
+        """Test an empty object with surrounding whitespace
+        """
+        self.assertEqual(self.stream("  {  }\n"), [])
+
+    def test_invalid(self):
+        """Test that invalid texts raise JSONDecodeError
+        """
+        for text in ["", "Trying to create an invalid JSON file", "[]",
+                     '{"a": 1', '{"a" 1}', '{1: 2}', '{"a": 1,}',
+                     '{"a": {"b": }}', '{"a": 1} x', '{} x']:
+            with self.assertRaises(json.JSONDecodeError):
+                self.stream(text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""Unit tests for the locking module
+"""
+
+
+import fcntl
+import os
+import unittest
+from models.engine.locking import FileLock, generation
+
+
+class TestLocking(unittest.TestCase):
+    """FileLock and generation() test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def tearDown(self):
+        """Delete the test files
+        """
+        for path in ("test_file.json", "test_file.json.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_lock(self):
+        """Test that the lock excludes other holders until released
+        """
+        with FileLock("test_file.json.lock") as lock:
+            self.assertIsNotNone(lock.fd)
+            fd = os.open("test_file.json.lock", os.O_RDWR)
+            try:
+                with self.assertRaises(BlockingIOError):
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            finally:
+                os.close(fd)
+        self.assertIsNone(lock.fd)
+        fd = os.open("test_file.json.lock", os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        finally:
+            os.close(fd)
+
+    def test_counter(self):
+        """Test that bump() counts the writes made under the lock
+        """
+        lock = FileLock("test_file.json.lock")
+        self.assertEqual(lock.counter(), 0)
+        for _ in range(2):
+            with lock:
+                lock.bump()
+        self.assertEqual(lock.counter(), 2)
+
+    def test_generation(self):
+        """Test that the generation changes with the counter and with
+        writes made without the lock
+        """
+        self.assertEqual(generation("test_file.json"), (0, None))
+        with open("test_file.json", "w", encoding="utf-8") as file:
+            file.write("{}")
+        first = generation("test_file.json")
+        self.assertEqual(first, generation("test_file.json"))
+        with FileLock("test_file.json.lock") as lock:
+            lock.bump()
+        second = generation("test_file.json")
+        self.assertNotEqual(first, second)
+        with open("test_file.json", "a", encoding="utf-8") as file:
+            file.write(" ")
+        self.assertNotEqual(second, generation("test_file.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""Unit tests for the ObjectStore class
+"""
+
+
+import unittest
+from models.engine.object_store import ObjectStore, RawRecord
+from models.user import User
+
+
+class TestObjectStore(unittest.TestCase):
+    """ObjectStore class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Set up a store holding objects of two classes
+        """
+        self.store = ObjectStore({"User.1": "u1", "City.1": "c1"})
+        self.store["User.2"] = "u2"
+
+    def test_is_dict(self):
+        """Test that the store behaves like a dictionary
+        """
+        self.assertIsInstance(self.store, dict)
+        self.assertEqual(self.store,
+                         {"User.1": "u1", "City.1": "c1", "User.2": "u2"})
+
+    def test_of_class(self):
+        """Test that objects are grouped by class name
+        """
+        self.assertEqual(self.store.of_class("User"),
+                         {"User.1": "u1", "User.2": "u2"})
+        self.assertEqual(self.store.of_class("City"), {"City.1": "c1"})
+        self.assertEqual(self.store.of_class("Place"), {})
+        self.assertEqual(self.store.count("User"), 2)
+        self.assertEqual(self.store.count("Place"), 0)
+
+    def test_removal(self):
+        """Test that every way of removing objects updates the groups
+        """
+        del self.store["User.1"]
+        self.assertEqual(self.store.count("User"), 1)
+        self.assertEqual(self.store.pop("User.2"), "u2")
+        self.assertEqual(self.store.pop("User.2", None), None)
+        self.assertNotIn("User", self.store.by_class)
+        self.assertEqual(self.store.popitem(), ("City.1", "c1"))
+        self.assertEqual(self.store.by_class, {})
+        self.store.setdefault("State.1", "s1")
+        self.store.clear()
+        self.assertEqual(self.store.count("State"), 0)
+        with self.assertRaises(KeyError):
+            self.store.pop("User.1")
+
+    def test_snapshot(self):
+        """Test that snapshot() is copied again only after a change
+        """
+        view = self.store.snapshot()
+        self.assertEqual(view, self.store)
+        self.assertIsNot(view, self.store)
+        self.assertIs(self.store.snapshot(), view)
+        self.store["User.3"] = "u3"
+        self.assertNotIn("User.3", view)
+        view = self.store.snapshot()
+        self.assertIn("User.3", view)
+        del self.store["User.3"]
+        self.assertIsNot(self.store.snapshot(), view)
+
+
+class TestRawRecord(unittest.TestCase):
+    """RawRecord and lazy building test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Set up a store holding one object not built yet
+        """
+        self.record = RawRecord(User, {
+            "id": "1", "created_at": "2024-02-11T14:40:55.976349",
+            "updated_at": "2024-02-11T14:40:55.976349",
+            "first_name": "John", "__class__": "User"})
+        self.store = ObjectStore({"User.1": self.record})
+
+    def test_attributes(self):
+        """Test reading values of the record as attributes
+        """
+        self.assertEqual(self.record.first_name, "John")
+        # Missing values fall back to the class attributes
+        self.assertEqual(self.record.email, "")
+        with self.assertRaises(AttributeError):
+            self.record.nothing
+
+    def test_build_on_access(self):
+        """Test that the object is built the first time it is read
+        """
+        self.assertEqual(self.store.unbuilt, 1)
+        self.assertIs(self.store.peek("User.1"), self.record)
+        self.assertEqual(self.store.count("User"), 1)
+        user = self.store["User.1"]
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.first_name, "John")
+        self.assertEqual(self.store.unbuilt, 0)
+        self.assertIs(self.store.get("User.1"), user)
+
+    def test_build_all(self):
+        """Test that listing the objects builds them
+        """
+        self.assertIsInstance(list(self.store.values())[0], User)
+        self.assertEqual(self.store.unbuilt, 0)
+        self.store["User.2"] = RawRecord(User, {"id": "2"})
+        del self.store["User.2"]
+        self.assertEqual(self.store.unbuilt, 0)
+
+    def test_records(self):
+        """Test that records() reuses the dictionaries not built yet
+        """
+        self.assertIs(dict(self.store.records())["User.1"], self.record)
+        user = self.store["User.1"]
+        self.assertEqual(dict(self.store.records())["User.1"],
+                         user.to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
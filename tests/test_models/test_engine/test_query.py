@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+"""Unit tests for the query module
+"""
+
+
+import unittest
+from unittest.mock import patch
+from models.engine import query
+from models.engine.indexes import HashIndex, SortedIndex
+from models.engine.object_store import ObjectStore
+from models.place import Place
+
+
+class TestQuery(unittest.TestCase):
+    """Query test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Set up a store of places in two cities
+        """
+        self.store = ObjectStore()
+        self.store.add_index("Place", HashIndex("city_id"))
+        self.store.add_index("Place", SortedIndex("price_by_night"))
+        for number in range(10):
+            place = Place(id=str(number), city_id="c{}".format(number % 2),
+                          price_by_night=number * 10, max_guest=number)
+            self.store["Place." + place.id] = place
+
+    def test_parse_predicates(self):
+        """Test splitting predicate names into attribute and operator
+        """
+        self.assertEqual(
+            query.parse_predicates({"city_id": "c1", "max_guest__gt": 2}),
+            [("city_id", "eq", "c1"), ("max_guest", "gt", 2)])
+        with self.assertRaises(ValueError):
+            query.parse_predicates({"max_guest__near": 2})
+
+    def test_range_bounds(self):
+        """Test combining predicates into the tightest range
+        """
+        predicates = [("price", "gt", 10), ("price", "ge", 20),
+                      ("price", "lt", 50), ("price", "le", 50)]
+        self.assertEqual(query.range_bounds("price", predicates),
+                         {"low": 20.0, "high": 50.0,
+                          "low_inclusive": True, "high_inclusive": False})
+
+    def test_select(self):
+        """Test selecting objects with indexed and unindexed predicates
+        """
+        result = query.select(self.store, "Place", {"city_id": "c1"})
+        self.assertEqual(sorted(result), ["Place.1", "Place.3", "Place.5",
+                                          "Place.7", "Place.9"])
+        result = query.select(self.store, "Place", {
+            "city_id": "c0", "price_by_night__ge": 20,
+            "price_by_night__lt": 60})
+        self.assertEqual(sorted(result), ["Place.2", "Place.4"])
+        result = query.select(self.store, "Place", {"max_guest__ne": 0,
+                                                    "max_guest__le": 2})
+        self.assertEqual(sorted(result), ["Place.1", "Place.2"])
+        self.assertEqual(query.select(self.store, "City", {}), {})
+
+    def test_candidate_keys(self):
+        """Test that the smallest candidate list is used
+        """
+        indexes = self.store.indexes["Place"]
+        keys = query.candidate_keys(indexes, [
+            ("city_id", "eq", "c0"), ("price_by_night", "le", 10)])
+        self.assertEqual(keys, ["Place.0", "Place.1"])
+        self.assertIsNone(query.candidate_keys(indexes, [
+            ("max_guest", "eq", 1), ("city_id", "ne", "c0")]))
+
+
+    def ids(self, *args, **kwargs):
+        """Runs query.execute() on the places
+
+        Args:
+            args: Positional arguments after the class name
+            kwargs: Keyword arguments of query.execute()
+
+        Returns:
+            list: Ids of the places of the page
+        """
+        return [place.id for place in
+                query.execute(self.store, "Place", *args, **kwargs)]
+
+    def test_plan(self):
+        """Test the choice between index, ordered index and scan
+        """
+        indexes = self.store.indexes["Place"]
+        predicates = [("city_id", "eq", "c1")]
+        self.assertEqual(query.plan(indexes, predicates)[0], "index")
+        self.assertEqual(query.plan(indexes, [])[0], "scan")
+        self.assertEqual(query.plan(indexes, [], "max_guest")[0], "scan")
+        self.assertEqual(query.plan(indexes, [], "price_by_night"),
+                         ("ordered", indexes["price_by_night"]))
+        # Five of ten places fill a page of two after reading about
+        # four places in order, fewer than the five candidates
+        self.assertEqual(
+            query.plan(indexes, predicates, "price_by_night", 2, 10)[0],
+            "ordered")
+        self.assertEqual(
+            query.plan(indexes, predicates, "price_by_night", 3, 10)[0],
+            "index")
+        self.assertEqual(
+            query.plan(indexes, predicates, "price_by_night")[0], "index")
+
+    def test_execute(self):
+        """Test ordered pages with and without an index of the order
+        """
+        self.assertEqual(self.ids({"city_id": "c1"}, "-price_by_night",
+                                  limit=2, offset=1), ["7", "5"])
+        self.assertEqual(self.ids({"city_id": "c0"}, "max_guest",
+                                  limit=2), ["0", "2"])
+        self.assertEqual(self.ids({"max_guest__ge": 7}, "-max_guest"),
+                         ["9", "8", "7"])
+        self.assertEqual(self.ids({}, limit=3, offset=8), ["8", "9"])
+        self.assertEqual(self.ids({}, limit=0), [])
+        self.assertEqual(self.ids({"price_by_night__gt": 65},
+                                  "price_by_night"), ["7", "8", "9"])
+        # Values that are not numbers come after the numbers, ties by key
+        self.store["Place.1"].price_by_night = "free"
+        self.store["Place.2"].price_by_night = "ask"
+        self.store["Place.3"].price_by_night = 0
+        for key in ("Place.1", "Place.2", "Place.3"):
+            self.store.refresh(key)
+        self.assertEqual(self.ids({}, "price_by_night")[:2], ["0", "3"])
+        self.assertEqual(self.ids({}, "price_by_night")[-2:], ["2", "1"])
+        self.assertEqual(self.ids({}, "-price_by_night", limit=3),
+                         ["1", "2", "9"])
+        self.assertEqual(self.ids({}, "name", limit=2), ["0", "1"])
+
+    def test_nan(self):
+        """Test that a price changed to "nan" and back keeps queries and
+        ordered pages correct
+        """
+        place = self.store["Place.3"]
+        place.price_by_night = "nan"
+        self.store.refresh("Place.3")
+        self.assertEqual(self.ids({}, "price_by_night")[-1], "3")
+        self.assertEqual(self.ids({"price_by_night__ge": float("nan")}), [])
+        place.price_by_night = 35
+        self.store.refresh("Place.3")
+        self.assertEqual(len(query.select(self.store, "Place",
+                                          {"price_by_night__ge": 0})), 10)
+        self.assertEqual(self.ids({}, "price_by_night"),
+                         ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"])
+
+    def test_execute_stops(self):
+        """Test that a page read in index order stops at its end
+        """
+        with patch("models.engine.query.matches",
+                   wraps=query.matches) as matches:
+            self.assertEqual(self.ids({"max_guest__ne": 1},
+                                      "price_by_night", limit=2),
+                             ["0", "2"])
+        self.assertEqual(matches.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
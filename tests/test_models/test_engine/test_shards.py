@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""Unit tests for the ShardLayout class
+"""
+
+
+import os
+import shutil
+import unittest
+from models.engine.shards import ShardLayout
+
+
+class TestShardLayout(unittest.TestCase):
+    """ShardLayout class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Set up a layout in a test directory
+        """
+        self.layout = ShardLayout("test_file.json.d", 4)
+
+    def tearDown(self):
+        """Delete the test directory if it exists
+        """
+        shutil.rmtree("test_file.json.d", ignore_errors=True)
+
+    def test_bucket(self):
+        """Test that buckets are stable and in range
+        """
+        buckets = {self.layout.bucket(str(number)) for number in range(100)}
+        self.assertEqual(buckets, {0, 1, 2, 3})
+        self.assertEqual(self.layout.bucket("abc"),
+                         ShardLayout("other", 4).bucket("abc"))
+        self.assertEqual(ShardLayout("other").bucket("abc"), 0)
+        with self.assertRaises(ValueError):
+            ShardLayout("other", 0)
+
+    def test_shard_path(self):
+        """Test the shard and file of a key
+        """
+        shard = self.layout.shard("User.1.5")
+        self.assertEqual(shard, ("User", self.layout.bucket("1.5")))
+        self.assertEqual(self.layout.path(("User", 2)),
+                         os.path.join("test_file.json.d", "User.2.json"))
+
+    def test_manifest(self):
+        """Test that the manifest records the number of buckets
+        """
+        self.assertFalse(self.layout.current())
+        os.mkdir("test_file.json.d")
+        self.layout.write_manifest()
+        self.assertTrue(self.layout.current())
+        self.assertFalse(ShardLayout("test_file.json.d", 2).current())
+
+    def test_existing(self):
+        """Test listing and removing shard files
+        """
+        self.assertEqual(self.layout.existing(), [])
+        os.mkdir("test_file.json.d")
+        self.layout.write_manifest()
+        for shard in (("User", 0), ("City", 3)):
+            with open(self.layout.path(shard), "w", encoding="utf-8") as file:
+                file.write("{}")
+        keep = self.layout.path(("User", 0))
+        self.assertEqual(self.layout.existing(),
+                         [self.layout.path(("City", 3)), keep])
+        self.layout.remove_stale({keep})
+        self.assertEqual(self.layout.existing(), [keep])
+
+
+if __name__ == "__main__":
+    unittest.main()
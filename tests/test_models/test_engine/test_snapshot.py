@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""Unit tests for the snapshot module
+"""
+
+
+import os
+import threading
+import unittest
+from models.engine.snapshot import BackgroundWriter, atomic_write
+
+
+class TestAtomicWrite(unittest.TestCase):
+    """atomic_write test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def tearDown(self):
+        """Delete the test files if they exist
+        """
+        for path in ("test_file.json", "test_file.json.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_replace(self):
+        """Test that the file is replaced when the block succeeds
+        """
+        with atomic_write("test_file.json") as file:
+            file.write("{}")
+        with atomic_write("test_file.json") as file:
+            file.write('{"a": 1}')
+        with open("test_file.json", "r", encoding="utf-8") as file:
+            self.assertEqual(file.read(), '{"a": 1}')
+        self.assertFalse(os.path.exists("test_file.json.tmp"))
+
+    def test_binary(self):
+        """Test writing bytes
+        """
+        with atomic_write("test_file.json", "wb") as file:
+            file.write(b"\x00\x01")
+        with open("test_file.json", "rb") as file:
+            self.assertEqual(file.read(), b"\x00\x01")
+
+    def test_error_keeps_file(self):
+        """Test that a failed write leaves the previous file untouched
+        """
+        with atomic_write("test_file.json") as file:
+            file.write("{}")
+        with self.assertRaises(ValueError):
+            with atomic_write("test_file.json") as file:
+                file.write('{"a": ')
+                raise ValueError
+        with open("test_file.json", "r", encoding="utf-8") as file:
+            self.assertEqual(file.read(), "{}")
+        self.assertFalse(os.path.exists("test_file.json.tmp"))
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    """BackgroundWriter class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def test_coalesce(self):
+        """Test that snapshots submitted during a write are folded into
+        one write of the latest snapshot
+        """
+        written = []
+        started, release = threading.Event(), threading.Event()
+
+        def write(snapshot):
+            started.set()
+            release.wait()
+            written.append(snapshot)
+
+        writer = BackgroundWriter(write)
+        writer.submit(1)
+        started.wait()
+        for snapshot in (2, 3, 4):
+            writer.submit(snapshot)
+        release.set()
+        writer.flush()
+        self.assertEqual(written, [1, 4])
+
+    def test_flush_error(self):
+        """Test that flush() reports a failed write once
+        """
+        def write(snapshot):
+            raise OSError("disk full")
+
+        writer = BackgroundWriter(write)
+        writer.submit(1)
+        with self.assertRaises(OSError):
+            writer.flush()
+        writer.flush()
+
+    def test_flush_idle(self):
+        """Test that flush() returns at once when nothing was submitted
+        """
+        BackgroundWriter(print).flush()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+"""Unit tests for the SQLiteStorage class
+"""
+
+
+import os
+import unittest
+from models.base_model import BaseModel
+from models.city import City
+from models.engine.base_storage import BaseStorage
+from models.engine.sqlite_storage import SQLiteStorage
+from models.place import Place
+from models.review import Review
+from models.user import User
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    """SQLiteStorage class test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Open a storage on a test database
+        """
+        self.storage = SQLiteStorage("test_file.db")
+        self.storage.reload()
+
+    def tearDown(self):
+        """Close the storage and delete the test database
+        """
+        self.storage.close()
+        for suffix in ["", "-wal", "-shm"]:
+            if os.path.exists("test_file.db" + suffix):
+                os.remove("test_file.db" + suffix)
+
+    def reopen(self):
+        """Closes the storage and opens the test database again
+
+        Returns:
+            SQLiteStorage: A storage without any object in memory
+        """
+        self.storage.close()
+        self.storage = SQLiteStorage("test_file.db")
+        self.storage.reload()
+        return self.storage
+
+    def test_interface(self):
+        """Test that SQLiteStorage is a storage engine
+        """
+        self.assertIsInstance(self.storage, BaseStorage)
+        with self.assertRaises(TypeError):
+            BaseStorage()
+
+        # An engine missing a required method fails when it is created
+        class Incomplete(SQLiteStorage):
+            reload = BaseStorage.reload
+
+        with self.assertRaises(TypeError):
+            Incomplete("test_file.db")
+
+    def test_new_save_get(self):
+        """Test that saved objects are read back from the database
+        """
+        user = User()
+        self.storage.new(user)
+        self.storage.new(City())
+        self.assertIs(self.storage.get(User, user.id), user)
+        self.storage.save()
+        storage = self.reopen()
+        loaded = storage.get("User", user.id)
+        self.assertIsInstance(loaded, User)
+        self.assertEqual(loaded.to_dict(), user.to_dict())
+        self.assertIsNone(storage.get(User, "1234"))
+        self.assertIsNone(storage.get("John", "1234"))
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(storage.count(User), 1)
+        self.assertEqual(list(storage.all(User)), ["User." + user.id])
+        self.assertEqual(len(storage.all()), 2)
+
+    def test_update_delete(self):
+        """Test that touched objects are rewritten and deleted ones
+        removed
+        """
+        user = User()
+        base = BaseModel()
+        self.storage.new(user)
+        self.storage.new(base)
+        self.storage.save()
+        user.first_name = "James"
+        self.storage.touch(user)
+        self.storage.delete(base)
+        self.storage.delete(None)
+        self.storage.save()
+        storage = self.reopen()
+        self.assertEqual(storage.get(User, user.id).first_name, "James")
+        self.assertIsNone(storage.get(BaseModel, base.id))
+        self.assertEqual(storage.count(), 1)
+
+    def test_unsaved_changes(self):
+        """Test that changes are dropped unless saved
+        """
+        self.storage.new(User())
+        self.assertEqual(self.storage.count(User), 1)
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 0)
+
+    def test_query(self):
+        """Test queries pushed to SQLite and checked on the objects
+        """
+        places = []
+        for number in range(6):
+            place = Place()
+            place.city_id = "c{}".format(number % 2)
+            place.price_by_night = number * 10
+            self.storage.new(place)
+            places.append(place)
+        # Numbers set through the console are strings
+        places[5].price_by_night = "50"
+        self.storage.save()
+        storage = self.reopen()
+        result = storage.query(Place, city_id="c1", price_by_night__ge=20)
+        self.assertEqual(sorted(result),
+                         sorted("Place." + p.id for p in places[3::2]))
+        result = storage.query(Place, price_by_night__lt=15)
+        self.assertEqual(len(result), 2)
+        # The class default matches objects that never set the attribute
+        self.storage.new(Place())
+        self.assertEqual(len(self.storage.query(Place, name="")), 7)
+        self.assertEqual(self.storage.query("John", name=""), {})
+        with self.assertRaises(ValueError):
+            self.storage.query(Place, name__like="a")
+
+    def test_add_index(self):
+        """Test declaring an expression index
+        """
+        place = Place()
+        place.max_guest = 4
+        self.storage.new(place)
+        self.storage.add_index(Place, "max_guest", "sorted")
+        self.assertEqual(list(self.storage.query(Place, max_guest__gt=3)),
+                         ["Place." + place.id])
+        with self.assertRaises(ValueError):
+            self.storage.add_index(Place, "name", "btree")
+        del SQLiteStorage._SQLiteStorage__indexes["Place"]["max_guest"]
+        # A grid index becomes sorted indexes on both attributes
+        self.storage.add_index(Place, "max_guest,number_rooms", "grid")
+        attributes = SQLiteStorage._SQLiteStorage__indexes["Place"]
+        self.assertEqual(attributes.pop("max_guest"), "sorted")
+        self.assertEqual(attributes.pop("number_rooms"), "sorted")
+        with self.assertRaises(ValueError):
+            self.storage.add_index(Place, "max_guest", "grid")
+
+    def test_where(self):
+        """Test ordered pages of the objects found by query()
+        """
+        places = []
+        for number in range(6):
+            place = Place()
+            place.city_id = "c{}".format(number % 2)
+            place.price_by_night = number * 10
+            self.storage.new(place)
+            places.append(place)
+        self.assertEqual(
+            self.storage.where(Place, {"city_id": "c1"},
+                               "-price_by_night", limit=2),
+            [places[5], places[3]])
+        self.assertEqual(
+            self.storage.where(Place, {"price_by_night__ge": 10},
+                               "price_by_night", limit=2, offset=1),
+            [places[2], places[3]])
+        with self.assertRaises(ValueError):
+            self.storage.where(Place, {}, limit=-1)
+
+    def test_search(self):
+        """Test ranked full-text searches kept up to date by triggers
+        """
+        quiet, noisy, other = Review(), Review(), Review()
+        quiet.text = "Quiet room with a pool, a great pool"
+        noisy.text = "Noisy pool"
+        other.text = "Quiet street"
+        for review in (quiet, noisy, other):
+            self.storage.new(review)
+        self.assertEqual(self.storage.search(Review, "quiet pool"), [quiet])
+        self.assertEqual(len(self.storage.search("Review", "qui*")), 2)
+        self.assertEqual(len(self.storage.search(Review, "pool", 1)), 1)
+        # Words are quoted rather than read as FTS5 operators
+        self.assertEqual(self.storage.search(Review, 'NOT "pool'), [])
+        noisy.text = "Silent"
+        self.storage.touch(noisy)
+        self.storage.delete(other)
+        self.storage.save()
+        storage = self.reopen()
+        self.assertEqual([review.id for review in
+                          storage.search(Review, "pool")], [quiet.id])
+        self.assertEqual([review.id for review in
+                          storage.search(Review, "silent")], [noisy.id])
+        self.assertEqual(storage.search(Review, "street"), [])
+        with self.assertRaises(ValueError):
+            storage.search(User, "john")
+
+    def test_places_near(self):
+        """Test radius and bounding-box searches run as range queries
+        """
+        paris, london, suva = Place(), Place(), Place()
+        for place, latitude, longitude in [(paris, 48.8566, 2.3522),
+                                           (london, "51.5074", "-0.1278"),
+                                           (suva, -18.1416, 178.4419)]:
+            place.latitude, place.longitude = latitude, longitude
+            self.storage.new(place)
+        self.storage.save()
+        storage = self.reopen()
+        near = storage.places_near(51, 0, 400)
+        self.assertEqual([place.id for place in near], [london.id, paris.id])
+        self.assertEqual(len(storage.places_near(51, 0, 400, limit=1)), 1)
+        self.assertEqual(list(storage.places_within(-20, 170, -10, -170)),
+                         ["Place." + suva.id])
+        with self.assertRaises(ValueError):
+            storage.places_within(-100, 0, 0, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+"""Unit tests for the relationships module
+"""
+
+
+import json
+import os
+import unittest
+from unittest.mock import patch
+from models.amenity import Amenity
+from models.city import City
+from models.engine import query
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.relationships import HasMany, HasManyIds, RestrictError
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+class TestRelationships(unittest.TestCase):
+    """HasMany, HasManyIds and delete() test cases
+
+    Args:
+        unittest (module): Module for unit tests
+    """
+    def setUp(self):
+        """Use an empty storage that is never written to file.json
+        """
+        self.storage = FileStorage()
+        self.storage._FileStorage__file_path = "test_file.json"
+        self.patcher = patch("models.storage", self.storage)
+        self.patcher.start()
+        # Reset the objects once the patch created models.storage,
+        # whose first access reloads file.json
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """Restore the storage of the models and delete the test file
+        """
+        self.patcher.stop()
+        if os.path.exists("test_file.json"):
+            os.remove("test_file.json")
+
+    def test_has_many(self):
+        """Test that state.cities follows new, changed and deleted
+        cities
+        """
+        self.assertIsInstance(State.cities, HasMany)
+        ghana, togo = State(), State()
+        accra, kumasi, lome = City(), City(), City()
+        accra.state_id = kumasi.state_id = ghana.id
+        lome.state_id = togo.id
+        self.assertEqual(set(ghana.cities), {accra, kumasi})
+        self.assertEqual(togo.cities, [lome])
+        kumasi.state_id = togo.id
+        self.assertEqual(ghana.cities, [accra])
+        self.assertEqual(set(togo.cities), {kumasi, lome})
+        self.storage.delete(lome)
+        self.assertEqual(togo.cities, [kumasi])
+        self.assertNotIn("cities", ghana.to_dict())
+
+    def test_models(self):
+        """Test the relationships of users, cities and places
+        """
+        user, city = User(), City()
+        place = Place()
+        place.user_id, place.city_id = user.id, city.id
+        review = Review()
+        review.place_id, review.user_id = place.id, user.id
+        self.assertEqual(user.places, [place])
+        self.assertEqual(user.reviews, [review])
+        self.assertEqual(city.places, [place])
+        self.assertEqual(place.reviews, [review])
+        self.assertEqual(Place().reviews, [])
+
+    def test_index_lookup(self):
+        """Test that only the related objects are read
+        """
+        place = Place()
+        for _ in range(20):
+            Review().place_id = "other"
+        for _ in range(3):
+            Review().place_id = place.id
+        with patch("models.engine.query.matches",
+                   wraps=query.matches) as matches:
+            self.assertEqual(len(place.reviews), 3)
+        self.assertEqual(matches.call_count, 3)
+
+    def test_has_many_ids(self):
+        """Test that place.amenities lists and adds amenities
+        """
+        self.assertIsInstance(Place.amenities, HasManyIds)
+        place = Place()
+        wifi, pool = Amenity(), Amenity()
+        self.assertEqual(place.amenities, [])
+        place.amenities = wifi
+        place.amenities = pool
+        place.amenities = wifi
+        place.amenities = User()
+        self.assertEqual(place.amenity_ids, [wifi.id, pool.id])
+        self.assertEqual(place.amenities, [wifi, pool])
+        # The list declared on the class is left alone
+        self.assertEqual(Place.amenity_ids, [])
+        self.assertIn("Place." + place.id,
+                      FileStorage._FileStorage__pending)
+        self.storage.delete(pool)
+        self.assertEqual(place.amenities, [wifi])
+
+    def tree(self):
+        """Creates a state with a city, a place of a user in the city
+        and a review of the place
+
+        Returns:
+            tuple: The state, city, user, place and review
+        """
+        state, city, user, place = State(), City(), User(), Place()
+        city.state_id = state.id
+        place.city_id, place.user_id = city.id, user.id
+        review = Review()
+        review.place_id, review.user_id = place.id, user.id
+        return state, city, user, place, review
+
+    def test_delete_cascade(self):
+        """Test that deleting a state deletes its cities, their places
+        and their reviews with one save, reading only the dependents
+        """
+        state, city, user, place, review = self.tree()
+        other = City()
+        other.state_id = "other"
+        with patch.object(self.storage, "compact") as compact,\
+                patch("models.engine.query.matches",
+                      wraps=query.matches) as matches:
+            self.assertEqual(state.delete(), 4)
+        self.assertEqual(compact.call_count, 1)
+        # One call per dependent found, and none for the other city
+        self.assertEqual(matches.call_count, 3)
+        self.assertEqual(set(self.storage.all()),
+                         {"User." + user.id, "City." + other.id})
+        self.assertEqual(user.reviews, [])
+
+    def test_delete_restrict(self):
+        """Test that a "restrict" relationship with dependents prevents
+        the deletion and changes nothing
+        """
+        state, city, user, place, review = self.tree()
+        with patch.object(Place.reviews, "on_delete", "restrict"):
+            with self.assertRaises(RestrictError):
+                state.delete()
+            self.assertEqual(self.storage.count(), 5)
+            self.assertFalse(os.path.exists("test_file.json"))
+            review.delete()
+            self.assertEqual(state.delete(), 3)
+        # A dependent deleted along with the object does not count
+        state, city, user, place, review = self.tree()
+        with patch.object(User.reviews, "on_delete", "restrict"):
+            self.assertEqual(user.delete(), 3)
+
+    def test_delete_nullify(self):
+        """Test that a "nullify" relationship clears the foreign key of
+        the dependents
+        """
+        state, city, user, place, review = self.tree()
+        with patch.object(User.places, "on_delete", "nullify"):
+            self.assertEqual(user.delete(), 2)
+        self.assertEqual(place.user_id, "")
+        self.assertIs(self.storage.get(Place, place.id), place)
+        with open("test_file.json", "r", encoding="utf-8") as file:
+            saved = json.load(file)
+        self.assertEqual(saved["Place." + place.id]["user_id"], "")
+        self.assertNotIn("User." + user.id, saved)
+        with self.assertRaises(ValueError):
+            HasMany("City", "state_id", on_delete="ignore")
+
+
+if __name__ == "__main__":
+    unittest.main()